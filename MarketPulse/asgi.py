@@ -4,4 +4,27 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'MarketPulse.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after Django is set up: handlers use the ORM and settings
+from apps.alerts.streaming import trigger_websocket  # noqa: E402
+from apps.stocks.streaming import quote_websocket  # noqa: E402
+
+websocket_routes = {
+    "/ws/quotes/": quote_websocket,
+    "/ws/triggers/": trigger_websocket,
+}
+
+
+async def application(scope, receive, send):
+    """
+    Route WebSocket connections to their handlers; everything else (HTTP,
+    including SSE streams, and lifespan) goes to Django.
+    """
+    if scope["type"] == "websocket":
+        handler = websocket_routes.get(scope["path"])
+        if handler is None:
+            await send({"type": "websocket.close", "code": 4404})
+            return
+        return await handler(scope, receive, send)
+    return await django_application(scope, receive, send)
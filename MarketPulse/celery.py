@@ -1,5 +1,9 @@
 import os
 from celery import Celery
+from kombu import Queue
+
+# Connects the publish hook stamping tasks with their enqueue time
+from . import pipeline  # noqa: F401
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "MarketPulse.settings")
 
@@ -7,6 +11,35 @@ app = Celery("MarketPulse")
 
 app.config_from_object("django.conf:settings", namespace="CELERY")
 
+# One queue per workload, so a burst in one never delays the others. Each
+# queue has its own worker service (see docker-compose.yml):
+#   ingest       threads, concurrency 16, prefetch 4  (market data HTTP calls)
+#   alerts       prefork, concurrency 2,  prefetch 1  (CPU/DB-heavy batches)
+#   notify       threads, concurrency 8,  prefetch 4  (SMTP/webhook I/O)
+#   maintenance  prefork, concurrency 1,  prefetch 1  (long cleanup deletes)
+# A worker started without -Q consumes all of them.
+app.conf.task_queues = [
+    Queue("ingest"),
+    Queue("alerts"),
+    Queue("notify"),
+    Queue("maintenance"),
+]
+app.conf.task_default_queue = "maintenance"
+app.conf.task_routes = {
+    "apps.stocks.tasks.fetch_single_stock_data": {"queue": "ingest"},
+    "apps.stocks.tasks.fetch_stock_data_batch": {"queue": "ingest"},
+    "apps.stocks.tasks.cleanup_old_price_data": {"queue": "maintenance"},
+    "apps.alerts.tasks.process_alerts": {"queue": "alerts"},
+    "apps.alerts.tasks.process_alert_shard": {"queue": "alerts"},
+    "apps.alerts.tasks.process_threshold_alert": {"queue": "alerts"},
+    "apps.alerts.tasks.process_duration_alert": {"queue": "alerts"},
+    "apps.alerts.tasks.dispatch_notifications": {"queue": "notify"},
+    "apps.alerts.tasks.send_alert_notification": {"queue": "notify"},
+    "apps.alerts.tasks.send_email_notification": {"queue": "notify"},
+    "apps.alerts.tasks.send_console_notification": {"queue": "notify"},
+    "apps.alerts.tasks.cleanup_old_alert_data": {"queue": "maintenance"},
+}
+
 app.autodiscover_tasks()
 
 
@@ -0,0 +1,205 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+
+
+def parse_fieldset(value):
+    """
+    Parse a comma-separated list of (optionally dotted) field paths into a tree.
+
+    ``"symbol,latest_price.price"`` becomes
+    ``{"symbol": True, "latest_price": {"price": True}}`` where ``True``
+    selects the whole field. Returns None when no paths are given.
+    """
+    if not value:
+        return None
+
+    tree = {}
+    for path in value.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        node = tree
+        for index, part in enumerate(parts):
+            if index == len(parts) - 1:
+                node[part] = True
+                break
+            child = node.get(part)
+            if child is True:
+                break
+            node = node.setdefault(part, {})
+    return tree or None
+
+
+def prune_dict(data, include=None, exclude=None):
+    """
+    Apply an include/exclude field tree to a plain dict value.
+    """
+    result = {}
+    for key, value in data.items():
+        sub_include = True if include is None else include.get(key)
+        sub_exclude = None if exclude is None else exclude.get(key)
+        if sub_include is None or sub_exclude is True:
+            continue
+        if isinstance(value, dict) and (
+            isinstance(sub_include, dict) or isinstance(sub_exclude, dict)
+        ):
+            value = prune_dict(
+                value,
+                sub_include if isinstance(sub_include, dict) else None,
+                sub_exclude,
+            )
+        result[key] = value
+    return result
+
+
+class SparseFieldsetSerializerMixin:
+    """
+    Serializer mixin that drops fields not selected through the ``fields`` and
+    ``exclude`` trees passed in the serializer context.
+
+    Nested serializers using the mixin are pruned recursively; dict values
+    (e.g. from SerializerMethodField) are pruned after representation.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._sparse_subtrees = {}
+        include = self.context.get("fields")
+        exclude = self.context.get("exclude")
+        if include or exclude:
+            self.apply_fieldset(include, exclude)
+
+    def apply_fieldset(self, include=None, exclude=None):
+        self._sparse_subtrees = {}
+
+        for name in list(self.fields):
+            if include is not None and name not in include:
+                self.fields.pop(name)
+            elif exclude is not None and exclude.get(name) is True:
+                self.fields.pop(name)
+
+        for name, field in self.fields.items():
+            sub_include = include.get(name) if include is not None else None
+            sub_exclude = exclude.get(name) if exclude is not None else None
+            sub_include = sub_include if isinstance(sub_include, dict) else None
+            sub_exclude = sub_exclude if isinstance(sub_exclude, dict) else None
+            if sub_include is None and sub_exclude is None:
+                continue
+
+            target = field
+            if isinstance(field, serializers.ListSerializer):
+                target = field.child
+            if isinstance(target, SparseFieldsetSerializerMixin):
+                target.apply_fieldset(sub_include, sub_exclude)
+            else:
+                self._sparse_subtrees[name] = (sub_include, sub_exclude)
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for name, (include, exclude) in self._sparse_subtrees.items():
+            value = data.get(name)
+            if isinstance(value, dict):
+                data[name] = prune_dict(value, include, exclude)
+        return data
+
+
+def only_paths(serializer, model, prefix=""):
+    """
+    Collect the ``.only()`` paths and ``select_related()`` relations needed to
+    render the (already pruned) fields of a model serializer.
+    """
+    paths = []
+    related = []
+
+    for field in serializer.fields.values():
+        if field.write_only or field.source == "*":
+            continue
+
+        current_model = model
+        current_prefix = prefix
+        parts = field.source.split(".")
+        for index, part in enumerate(parts):
+            try:
+                model_field = current_model._meta.get_field(part)
+            except FieldDoesNotExist:
+                break
+            if not model_field.concrete or model_field.many_to_many:
+                break
+
+            path = f"{current_prefix}{part}"
+            paths.append(path)
+            if not model_field.is_relation:
+                break
+
+            is_last = index == len(parts) - 1
+            if is_last and not isinstance(field, serializers.BaseSerializer):
+                break
+
+            related.append(path)
+            current_model = model_field.related_model
+            current_prefix = f"{path}__"
+            if is_last:
+                nested_paths, nested_related = only_paths(
+                    field, current_model, current_prefix
+                )
+                paths.extend(nested_paths)
+                related.extend(nested_related)
+
+    return paths, related
+
+
+class SparseFieldsetViewMixin:
+    """
+    View mixin that reads ``?fields=`` and ``?exclude=`` on safe requests,
+    passes them to the serializer and narrows the queryset to the columns
+    the response actually renders.
+    """
+
+    fields_param = "fields"
+    exclude_param = "exclude"
+
+    def get_fieldset(self):
+        if not hasattr(self, "_fieldset"):
+            include = exclude = None
+            if self.request is not None and self.request.method == "GET":
+                params = self.request.query_params
+                include = parse_fieldset(params.get(self.fields_param))
+                exclude = parse_fieldset(params.get(self.exclude_param))
+            self._fieldset = (include, exclude)
+        return self._fieldset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["fields"], context["exclude"] = self.get_fieldset()
+        return context
+
+    def field_subtree(self, name):
+        """
+        Return True if a top-level field is fully rendered, its sub-field tree
+        if only partially rendered, or None if it is dropped.
+        """
+        include, exclude = self.get_fieldset()
+        selected = True if include is None else include.get(name)
+        excluded = None if exclude is None else exclude.get(name)
+        if selected is None or excluded is True:
+            return None
+        return selected
+
+    def wants_field(self, *names):
+        return any(self.field_subtree(name) is not None for name in names)
+
+    def sparse_queryset(self, queryset):
+        """
+        Restrict the queryset with ``.only()``/``select_related()`` when a
+        fieldset was requested.
+        """
+        include, exclude = self.get_fieldset()
+        if include is None and exclude is None:
+            return queryset
+
+        serializer = self.get_serializer()
+        paths, related = only_paths(serializer, queryset.model)
+        # Relations are re-derived from the rendered fields; joins for pruned
+        # nested serializers would conflict with the deferred foreign keys.
+        queryset = queryset.select_related(None)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*paths) if paths else queryset.only("pk")
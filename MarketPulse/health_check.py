@@ -2,6 +2,8 @@ from django.http import JsonResponse
 from django.db import connection
 from django.conf import settings
 
+from .pipeline import pipeline_status, skipped_counts, trigger_latencies
+
 try:
     import redis
 except Exception:
@@ -43,6 +45,7 @@ def health(request):
             )
             client.ping()
             payload["redis"] = "ok"
+            payload["skipped_cycles"] = skipped_counts()
         else:
             payload["redis"] = "unavailable"
     except Exception:
@@ -51,3 +54,28 @@ def health(request):
         http_status = 503
 
     return JsonResponse(payload, status=http_status)
+
+
+def pipeline_health(request):
+    """Backlog of the task pipeline: depth and oldest task age per queue,
+    plus each alert worker's tick-to-trigger latency percentiles.
+
+    Returns 503 when a queue is overloaded (the pipeline is shedding work)
+    or Redis cannot be read.
+    """
+    try:
+        queues = pipeline_status()
+        payload = {
+            "status": "healthy",
+            "queues": queues,
+            "skipped_cycles": skipped_counts(),
+            "trigger_latency": trigger_latencies(),
+        }
+    except Exception:
+        return JsonResponse({"status": "error", "redis": "error"}, status=503)
+
+    http_status = 200
+    if any(stats["overloaded"] for stats in queues.values()):
+        payload["status"] = "degraded"
+        http_status = 503
+    return JsonResponse(payload, status=http_status)
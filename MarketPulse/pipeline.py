@@ -0,0 +1,212 @@
+"""
+Redis leases that keep periodic tasks from overlapping.
+
+Beat fires its schedule whether or not the previous cycle finished. A task
+wrapped in ``single_flight`` first takes a lease with ``SET lease:<name>
+<token> NX PX <ttl>``. If another run holds it, the cycle is skipped and
+counted in the ``pipeline:skipped`` hash. With ``coalesce`` the skipped
+cycle instead leaves a pending flag, and the running cycle runs once more
+before it releases the lease, so a burst of cycles collapses into one extra
+run.
+
+A lease expires on its own if its worker dies mid-cycle, and only the
+holder's token can extend or release it. When Redis is unavailable the task
+runs unguarded, as it did before leases existed.
+
+The pipeline also watches its own backlog. Every published task is stamped
+with an ``enqueued_at`` header, so a queue's depth (``LLEN``) and the age of
+its oldest message (the list's tail) can be read straight from the Redis
+broker. A queue deeper than ``PIPELINE_MAX_QUEUE_DEPTH``, or whose oldest
+task waited longer than ``PIPELINE_MAX_TASK_AGE_SECONDS``, is overloaded and
+the tasks feeding it shed work.
+"""
+
+import functools
+import json
+import logging
+import time
+import uuid
+
+from celery.signals import before_task_publish
+from django.conf import settings
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+SKIPPED_KEY = "pipeline:skipped"
+
+# Hash of each alert worker's latest tick-to-trigger latency percentiles
+LATENCY_KEY = "pipeline:trigger_latency"
+
+QUEUES = ("ingest", "alerts", "notify", "maintenance")
+
+# Queues whose backlog delays users; maintenance waits while they are behind
+LATENCY_QUEUES = ("ingest", "alerts", "notify")
+
+RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+EXTEND_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("pexpire", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+class Lease:
+    """
+    A named Redis lease owned by a random token.
+    """
+
+    def __init__(self, name, ttl=None, token=None):
+        self.name = name
+        self.key = f"lease:{name}"
+        self.ttl_ms = int(ttl * 1000) if ttl else None
+        self.token = token or uuid.uuid4().hex
+
+    def acquire(self):
+        return bool(get_redis().set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    def extend(self):
+        return bool(
+            get_redis().eval(EXTEND_SCRIPT, 1, self.key, self.token, self.ttl_ms)
+        )
+
+    def release(self):
+        return bool(get_redis().eval(RELEASE_SCRIPT, 1, self.key, self.token))
+
+
+def record_skip(name, count=1):
+    try:
+        get_redis().hincrby(SKIPPED_KEY, name, count)
+    except Exception as e:
+        logger.error(f"Error counting skipped {name}: {e}")
+
+
+def skipped_counts():
+    """
+    Skipped cycles (and deduplicated fetches) per task since Redis started.
+    """
+    counts = get_redis().hgetall(SKIPPED_KEY)
+    return {name: int(count) for name, count in counts.items()}
+
+
+def record_latency(worker_id, stats):
+    get_redis().hset(LATENCY_KEY, worker_id, json.dumps(stats))
+
+
+def trigger_latencies():
+    """
+    Tick-to-trigger latency percentiles last reported by each alert worker.
+    """
+    reports = get_redis().hgetall(LATENCY_KEY)
+    return {worker_id: json.loads(stats) for worker_id, stats in reports.items()}
+
+
+def single_flight(name, ttl, coalesce=False):
+    """
+    Run the decorated function only while holding the ``name`` lease; see
+    the module docstring. ``name`` is formatted with the call's arguments,
+    so ``"task:{0}"`` gives each first argument its own lease.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            lease_name = name.format(*args, **kwargs)
+            lease = Lease(lease_name, ttl)
+            pending_key = f"{lease.key}:pending"
+            try:
+                acquired = lease.acquire()
+            except Exception as e:
+                logger.error(
+                    f"Lease for {lease_name} unavailable, running unguarded: {e}"
+                )
+                return func(*args, **kwargs)
+
+            if not acquired:
+                if coalesce:
+                    get_redis().set(pending_key, 1, px=lease.ttl_ms)
+                record_skip(lease_name)
+                logger.info(
+                    f"Skipped {lease_name}: the previous cycle is still running"
+                )
+                return None
+
+            try:
+                result = func(*args, **kwargs)
+                # Run once more for the cycles skipped meanwhile
+                while coalesce and get_redis().delete(pending_key):
+                    lease.extend()
+                    result = func(*args, **kwargs)
+                return result
+            finally:
+                try:
+                    lease.release()
+                except Exception as e:
+                    logger.error(f"Error releasing lease for {lease_name}: {e}")
+
+        return wrapper
+
+    return decorator
+
+
+@before_task_publish.connect
+def stamp_enqueued_at(headers=None, **kwargs):
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+def queue_stats(queue, now=None):
+    """
+    Depth of a broker queue and the age in seconds of its oldest task.
+    """
+    client = get_redis()
+    depth = client.llen(queue)
+    age = None
+    oldest = client.lindex(queue, -1)
+    if oldest is not None:
+        enqueued_at = json.loads(oldest).get("headers", {}).get("enqueued_at")
+        if enqueued_at is not None:
+            age = max((now or time.time()) - enqueued_at, 0)
+    return {
+        "depth": depth,
+        "oldest_age_seconds": age,
+        "overloaded": depth > settings.PIPELINE_MAX_QUEUE_DEPTH
+        or (age or 0) > settings.PIPELINE_MAX_TASK_AGE_SECONDS,
+    }
+
+
+def pipeline_status(now=None):
+    return {queue: queue_stats(queue, now) for queue in QUEUES}
+
+
+def overloaded(*queues):
+    """
+    Whether any of ``queues`` is behind; False when Redis cannot tell.
+    """
+    try:
+        return any(queue_stats(queue)["overloaded"] for queue in queues)
+    except Exception as e:
+        logger.error(f"Error reading queue stats: {e}")
+        return False
+
+
+def defer_when_busy(task):
+    """
+    Push a maintenance ``task`` back by ``PIPELINE_MAINTENANCE_DEFER_SECONDS``
+    while the latency-sensitive queues are behind. Returns True if deferred.
+    """
+    if not overloaded(*LATENCY_QUEUES):
+        return False
+    task.apply_async(countdown=settings.PIPELINE_MAINTENANCE_DEFER_SECONDS)
+    name = task.name.rsplit(".", 1)[-1]
+    record_skip(name)
+    logger.info(f"Deferred {name}: the pipeline is behind")
+    return True
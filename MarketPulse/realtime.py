@@ -0,0 +1,270 @@
+import asyncio
+import json
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+
+import redis.asyncio as aioredis
+
+from MarketPulse.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def publish(channel, payload):
+    """
+    Publish a JSON payload on a Redis pub/sub channel (best effort).
+    """
+    try:
+        get_redis().publish(channel, json.dumps(payload, cls=DjangoJSONEncoder))
+    except Exception as e:
+        logger.error(f"Error publishing to {channel}: {e}")
+
+
+class Subscription:
+    """
+    A single connection's view of the broadcaster: a bounded queue of raw
+    messages for the channels it subscribed to.
+
+    When a slow client lets the queue fill up, the oldest message is dropped
+    so one stalled connection never holds memory for the whole process.
+    """
+
+    def __init__(self, channels, maxsize):
+        self.channels = tuple(channels)
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def put(self, channel, data):
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait((channel, data))
+
+    async def get(self, timeout=None):
+        """
+        Return the next ``(channel, data)`` pair, or None after ``timeout``.
+        """
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class Broadcaster:
+    """
+    Per-process pub/sub hub.
+
+    All connections in the process share one Redis pub/sub connection; a
+    channel is subscribed in Redis while at least one local connection
+    listens to it, and each message is fanned out to the local queues.
+    """
+
+    def __init__(self, url=None, queue_size=None):
+        self.url = url
+        self.queue_size = queue_size
+        self._subscribers = defaultdict(set)
+        self._client = None
+        self._pubsub = None
+        self._reader = None
+        self._lock = None
+
+    @asynccontextmanager
+    async def subscribe(self, channels):
+        subscription = Subscription(
+            channels, self.queue_size or settings.STREAM_QUEUE_SIZE
+        )
+        await self._add(subscription)
+        try:
+            yield subscription
+        finally:
+            await self._remove(subscription)
+
+    def dispatch(self, channel, data):
+        for subscription in tuple(self._subscribers.get(channel, ())):
+            subscription.put(channel, data)
+
+    def _register(self, subscription):
+        """
+        Track a subscription locally; return channels that are new to Redis.
+        """
+        new_channels = []
+        for channel in subscription.channels:
+            if not self._subscribers[channel]:
+                new_channels.append(channel)
+            self._subscribers[channel].add(subscription)
+        return new_channels
+
+    def _unregister(self, subscription):
+        """
+        Forget a subscription; return channels nobody listens to anymore.
+        """
+        stale_channels = []
+        for channel in subscription.channels:
+            listeners = self._subscribers.get(channel)
+            if listeners is None:
+                continue
+            listeners.discard(subscription)
+            if not listeners:
+                del self._subscribers[channel]
+                stale_channels.append(channel)
+        return stale_channels
+
+    async def _add(self, subscription):
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            new_channels = self._register(subscription)
+            if new_channels:
+                if self._pubsub is None:
+                    self._client = aioredis.Redis.from_url(
+                        self.url or settings.REDIS_URL, decode_responses=True
+                    )
+                    self._pubsub = self._client.pubsub()
+                await self._pubsub.subscribe(*new_channels)
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+
+    async def _remove(self, subscription):
+        async with self._lock:
+            stale_channels = self._unregister(subscription)
+            if stale_channels and self._pubsub is not None:
+                try:
+                    await self._pubsub.unsubscribe(*stale_channels)
+                except Exception as e:
+                    logger.error(f"Error unsubscribing from {stale_channels}: {e}")
+
+    async def _read(self):
+        while self._subscribers:
+            try:
+                message = await self._pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=1.0
+                )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error reading from Redis pub/sub: {e}")
+                await asyncio.sleep(1)
+                continue
+
+            if message and message["type"] == "message":
+                self.dispatch(message["channel"], message["data"])
+
+
+# Shared by every streaming endpoint served by this process
+broadcaster = Broadcaster()
+
+
+def format_event(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", f"data: {data}"]
+    return "\n".join(lines) + "\n\n"
+
+
+async def stream_messages(subscription, replay=None, event_id=None, timeout=None):
+    """
+    Yield ``(event_id, data)`` pairs: first those returned by the ``replay``
+    coroutine (run after subscribing, so nothing published in between is
+    lost), then live messages. Live messages already sent by the replay are
+    skipped by their ``event_id(data)``. Only replayed ids are skipped, not
+    every id below the newest one: a trigger whose transaction commits late
+    is published after higher ids and must still be delivered. Yields None
+    whenever nothing arrived for ``timeout`` seconds.
+
+    A replayed item may carry a third element, the event name to send it
+    under instead of the stream's, e.g. to announce a gap in the replay.
+    """
+    replayed = set()
+    if replay is not None:
+        for message in await replay():
+            if message[0] is not None:
+                replayed.add(message[0])
+            yield message
+
+    while True:
+        message = await subscription.get(timeout=timeout)
+        if message is None:
+            yield None
+            continue
+
+        data = message[1]
+        message_id = event_id(data) if event_id is not None else None
+        if message_id in replayed:
+            # Each event is published once, so it can be forgotten here
+            replayed.discard(message_id)
+            continue
+        yield message_id, data
+
+
+async def sse_events(channels, event, replay=None, event_id=None):
+    """
+    Yield SSE frames for messages on ``channels``, with keep-alive comments
+    while idle.
+    """
+    async with broadcaster.subscribe(channels) as subscription:
+        yield "retry: 5000\n\n"
+        async for message in stream_messages(
+            subscription, replay, event_id, timeout=settings.STREAM_HEARTBEAT_SECONDS
+        ):
+            if message is None:
+                yield ": keep-alive\n\n"
+                continue
+            name = message[2] if len(message) > 2 else event
+            yield format_event(name, message[1], message[0])
+
+
+def event_stream_response(events):
+    response = StreamingHttpResponse(events, content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+def stream_error(request):
+    """
+    Return an error response if the request cannot be streamed, else None.
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse(
+            {"detail": "Streaming is only available from the ASGI server."},
+            status=501,
+        )
+    return None
+
+
+def websocket_params(scope):
+    """
+    First value of each query string parameter of a WebSocket scope.
+    """
+    query = parse_qs(scope.get("query_string", b"").decode())
+    return {key: values[0] for key, values in query.items()}
+
+
+async def forward_messages(subscription, send, replay=None, event_id=None):
+    async for message in stream_messages(subscription, replay, event_id):
+        await send({"type": "websocket.send", "text": message[1]})
+
+
+async def serve_websocket(receive, send, channels, replay=None, event_id=None):
+    """
+    Accept a WebSocket and push messages on ``channels`` as text frames until
+    the client disconnects. ``replay``/``event_id`` as in ``stream_messages``.
+    """
+    await send({"type": "websocket.accept"})
+    async with broadcaster.subscribe(channels) as subscription:
+        sender = asyncio.create_task(
+            forward_messages(subscription, send, replay, event_id)
+        )
+        try:
+            while True:
+                message = await receive()
+                if message["type"] == "websocket.disconnect":
+                    break
+        finally:
+            sender.cancel()
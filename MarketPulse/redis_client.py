@@ -0,0 +1,20 @@
+from django.conf import settings
+
+import redis
+
+_client = None
+
+
+def get_redis():
+    """
+    Return the process-wide Redis client (created lazily, after any fork).
+    """
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+    return _client
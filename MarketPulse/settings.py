@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from decouple import config
+from decouple import Csv, config
 
 import os
 
@@ -142,6 +142,32 @@ STOCK_API_FORMAT = config("STOCK_API_FORMAT", default="JSON")
 STOCK_API_SIZE = config("STOCK_API_SIZE", default="1")
 STOCK_TYPE = config("STOCK_TYPE", default="stock")
 
+# Maximum number of symbols accepted by the batch quote endpoint
+QUOTE_BATCH_MAX_SYMBOLS = config("QUOTE_BATCH_MAX_SYMBOLS", default=300, cast=int)
+
+# Maximum number of symbols accepted by a bulk watchlist add/remove request
+WATCHLIST_BULK_MAX_SYMBOLS = config(
+    "WATCHLIST_BULK_MAX_SYMBOLS", default=300, cast=int
+)
+
+# Maximum number of indicators per indicators request, and how long results
+# for windows that ended before today stay cached
+INDICATOR_MAX_NAMES = config("INDICATOR_MAX_NAMES", default=10, cast=int)
+INDICATOR_CACHE_SECONDS = config("INDICATOR_CACHE_SECONDS", default=86400, cast=int)
+
+# Most points a downsampled price history (``?points=``) may return
+PRICE_HISTORY_MAX_POINTS = config("PRICE_HISTORY_MAX_POINTS", default=5000, cast=int)
+
+# Days a downsampled price history covers without ``start``, and the widest
+# range it may be asked for
+PRICE_HISTORY_DEFAULT_DAYS = config("PRICE_HISTORY_DEFAULT_DAYS", default=365, cast=int)
+PRICE_HISTORY_MAX_DAYS = config("PRICE_HISTORY_MAX_DAYS", default=3650, cast=int)
+
+# Maximum number of symbols per aligned series request, and how long results
+# for ranges that ended before today stay cached
+SERIES_MAX_SYMBOLS = config("SERIES_MAX_SYMBOLS", default=50, cast=int)
+SERIES_CACHE_SECONDS = config("SERIES_CACHE_SECONDS", default=86400, cast=int)
+
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(hours=1),
@@ -160,9 +186,13 @@ EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Redis Configuration
+REDIS_URL = config("REDIS_URL", default="redis://localhost:6379/0")
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=5, cast=float)
+
 # Celery Configuration
-CELERY_BROKER_URL = config("REDIS_URL", default="redis://localhost:6379/0")
-CELERY_RESULT_BACKEND = config("REDIS_URL", default="redis://localhost:6379/0")
+CELERY_BROKER_URL = REDIS_URL
+CELERY_RESULT_BACKEND = REDIS_URL
 CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
@@ -174,8 +204,119 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.stocks.tasks.fetch_stock_data_batch",
         "schedule": 60.0,
     },
+    # Sweeps retries and expired leases; new triggers also kick a dispatch
+    "dispatch_notifications": {
+        "task": "apps.alerts.tasks.dispatch_notifications",
+        "schedule": 15.0,
+    },
 }
 
+# Periodic task leases
+# Longest a fetch/alert/cleanup cycle may hold its lease before another may start
+PERIODIC_TASK_LEASE_SECONDS = config(
+    "PERIODIC_TASK_LEASE_SECONDS", default=300, cast=int
+)
+# Longest a symbol's fetch counts as in flight, deduplicating repeat fetches
+FETCH_LEASE_SECONDS = config("FETCH_LEASE_SECONDS", default=120, cast=int)
+
+# Backpressure: a queue deeper than this, or whose oldest task waited longer,
+# is overloaded and the tasks feeding it shed work
+PIPELINE_MAX_QUEUE_DEPTH = config("PIPELINE_MAX_QUEUE_DEPTH", default=1000, cast=int)
+PIPELINE_MAX_TASK_AGE_SECONDS = config(
+    "PIPELINE_MAX_TASK_AGE_SECONDS", default=120, cast=int
+)
+# While ingest is overloaded, symbols nobody watches are fetched every Nth cycle
+PIPELINE_UNWATCHED_REFRESH_EVERY = config(
+    "PIPELINE_UNWATCHED_REFRESH_EVERY", default=5, cast=int
+)
+# Delay before a maintenance task deferred under load runs again
+PIPELINE_MAINTENANCE_DEFER_SECONDS = config(
+    "PIPELINE_MAINTENANCE_DEFER_SECONDS", default=600, cast=int
+)
+
+# Notification outbox
+# Entries claimed per dispatcher batch
+NOTIFICATION_BATCH_SIZE = config("NOTIFICATION_BATCH_SIZE", default=100, cast=int)
+# Seconds a claimed entry stays invisible to other dispatchers
+NOTIFICATION_LEASE_SECONDS = config(
+    "NOTIFICATION_LEASE_SECONDS", default=300, cast=int
+)
+# Delivery attempts before an entry is marked failed, and the first retry delay
+NOTIFICATION_MAX_ATTEMPTS = config("NOTIFICATION_MAX_ATTEMPTS", default=5, cast=int)
+NOTIFICATION_RETRY_BASE_SECONDS = config(
+    "NOTIFICATION_RETRY_BASE_SECONDS", default=30, cast=int
+)
+
+# Webhook notifications
+# Per-request timeout and total pooled connections of the webhook client
+WEBHOOK_TIMEOUT_SECONDS = config("WEBHOOK_TIMEOUT_SECONDS", default=5, cast=float)
+WEBHOOK_MAX_CONNECTIONS = config("WEBHOOK_MAX_CONNECTIONS", default=200, cast=int)
+# Requests in flight to any one receiver host
+WEBHOOK_HOST_CONCURRENCY = config("WEBHOOK_HOST_CONCURRENCY", default=20, cast=int)
+# Attempts per delivery before it is dead-lettered, and the first retry delay
+WEBHOOK_MAX_ATTEMPTS = config("WEBHOOK_MAX_ATTEMPTS", default=3, cast=int)
+WEBHOOK_RETRY_BASE_SECONDS = config(
+    "WEBHOOK_RETRY_BASE_SECONDS", default=0.5, cast=float
+)
+# Hosts trusted as webhook receivers over plain http and private addresses;
+# any other endpoint must be https and resolve to public addresses only
+WEBHOOK_ALLOWED_HOSTS = config("WEBHOOK_ALLOWED_HOSTS", default="", cast=Csv())
+
+# Active alerts evaluated per batch by the alert evaluator
+ALERT_EVALUATION_CHUNK_SIZE = config(
+    "ALERT_EVALUATION_CHUNK_SIZE", default=5000, cast=int
+)
+
+# Quote stream read by the alert workers: partitions (by stock id), entries
+# kept per partition, entries read per call, and how long an unacknowledged
+# entry may sit with a consumer before another worker claims it. Partitions
+# are the unit the workers split, so workers beyond the partition count own
+# nothing; keep it well above the number of alert-worker replicas
+QUOTE_STREAM_PARTITIONS = config("QUOTE_STREAM_PARTITIONS", default=256, cast=int)
+QUOTE_STREAM_MAXLEN = config("QUOTE_STREAM_MAXLEN", default=1000, cast=int)
+QUOTE_STREAM_BATCH = config("QUOTE_STREAM_BATCH", default=500, cast=int)
+QUOTE_STREAM_CLAIM_IDLE_SECONDS = config(
+    "QUOTE_STREAM_CLAIM_IDLE_SECONDS", default=30, cast=int
+)
+
+# Completed bars replayed to warm up indicators that have no checkpoint
+INDICATOR_WARMUP_BARS = config("INDICATOR_WARMUP_BARS", default=250, cast=int)
+
+# Split process_alerts into this many tasks, by consistent hashing on stock
+ALERT_EVALUATION_SHARDS = config("ALERT_EVALUATION_SHARDS", default=1, cast=int)
+# Virtual points per member on the alert sharding hash ring
+ALERT_RING_REPLICAS = config("ALERT_RING_REPLICAS", default=64, cast=int)
+# Alert workers beat this often and drop out of the ring after the TTL
+ALERT_WORKER_HEARTBEAT_SECONDS = config(
+    "ALERT_WORKER_HEARTBEAT_SECONDS", default=5, cast=int
+)
+ALERT_WORKER_TTL_SECONDS = config("ALERT_WORKER_TTL_SECONDS", default=15, cast=int)
+# Alert workers rebuild their indexes from the database this often, as
+# alert changes reach them over pub/sub and can be lost
+ALERT_WORKER_RELOAD_SECONDS = config(
+    "ALERT_WORKER_RELOAD_SECONDS", default=300, cast=int
+)
+
+# Time duration alerts with the alert worker's deadline scheduler instead of
+# re-checking them in every process_alerts batch
+ALERT_DURATION_SCHEDULER = config("ALERT_DURATION_SCHEDULER", default=True, cast=bool)
+# Leave threshold alerts to the alert worker's per-quote index, which fires
+# on crossings, instead of re-firing them every cooldown in process_alerts
+ALERT_THRESHOLD_WORKER = config("ALERT_THRESHOLD_WORKER", default=True, cast=bool)
+
+# Serve read-only stock/quote/watchlist endpoints with async views (ASGI profile)
+ASYNC_READ_VIEWS = config("ASYNC_READ_VIEWS", default=False, cast=bool)
+
+# Realtime streaming (SSE/WebSocket, served by the ASGI app)
+# Seconds between keep-alive comments on idle SSE streams
+STREAM_HEARTBEAT_SECONDS = config("STREAM_HEARTBEAT_SECONDS", default=15, cast=int)
+# Messages buffered per connection before the oldest are dropped
+STREAM_QUEUE_SIZE = config("STREAM_QUEUE_SIZE", default=100, cast=int)
+# Maximum number of missed events replayed to a reconnecting client
+STREAM_REPLAY_LIMIT = config("STREAM_REPLAY_LIMIT", default=100, cast=int)
+# Seconds a single-use stream ticket (``POST /api/v1/stream/ticket/``) stays valid
+STREAM_TICKET_SECONDS = config("STREAM_TICKET_SECONDS", default=30, cast=int)
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
@@ -229,6 +370,12 @@ LOGGING = {
             "level": "INFO",
             "propagate": False,
         },
+        # httpx logs every webhook request at INFO
+        "httpx": {
+            "handlers": ["console", "file"],
+            "level": "WARNING",
+            "propagate": False,
+        },
     },
 }
 
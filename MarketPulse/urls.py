@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
-from MarketPulse.health_check import health
+from MarketPulse.health_check import health, pipeline_health
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -8,4 +8,5 @@ urlpatterns = [
     path("api/v1/", include("apps.stocks.urls")),
     path("api/v1/", include("apps.alerts.urls")),
     path("health/", health, name="health"),
+    path("health/pipeline/", pipeline_health, name="pipeline-health"),
 ]
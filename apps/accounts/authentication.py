@@ -0,0 +1,113 @@
+import logging
+import secrets
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from MarketPulse.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+
+def stream_ticket_key(ticket):
+    return f"stream:ticket:{ticket}"
+
+
+def user_id_from_token(raw_token):
+    """
+    Validate a JWT access token without touching the database.
+
+    Used by streaming endpoints, which run outside DRF and cannot always send
+    an Authorization header (EventSource, browser WebSockets).
+    Returns the user id claim, or None if the token is missing or invalid.
+    """
+    if not raw_token:
+        return None
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return None
+    return token.get(api_settings.USER_ID_CLAIM)
+
+
+def token_from_header(value):
+    """
+    Extract the token from an ``Authorization: Bearer <token>`` header value.
+    """
+    parts = (value or "").split()
+    if len(parts) == 2 and parts[0] in api_settings.AUTH_HEADER_TYPES:
+        return parts[1]
+    return None
+
+
+def issue_stream_ticket(user_id):
+    """
+    Store a random single-use ticket for ``user_id`` that expires after
+    ``STREAM_TICKET_SECONDS``, and return it.
+
+    Browser clients that cannot send an Authorization header open streams
+    with ``?ticket=``, so no bearer token ends up in access logs.
+    """
+    ticket = secrets.token_urlsafe(32)
+    get_redis().set(
+        stream_ticket_key(ticket), user_id, ex=settings.STREAM_TICKET_SECONDS
+    )
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """
+    Consume a stream ticket and return its user id, or None if the ticket is
+    missing, expired, already used, or Redis is unavailable.
+    """
+    if not ticket:
+        return None
+    try:
+        user_id = get_redis().getdel(stream_ticket_key(ticket))
+    except Exception as e:
+        logger.error(f"Error redeeming stream ticket: {e}")
+        return None
+    return int(user_id) if user_id is not None else None
+
+
+async def active_user_id(user_id):
+    """
+    ``user_id`` if it belongs to an active user, else None.
+    """
+    if user_id is None:
+        return None
+    active = await (
+        get_user_model()
+        .objects.filter(**{api_settings.USER_ID_FIELD: user_id}, is_active=True)
+        .aexists()
+    )
+    return user_id if active else None
+
+
+async def authenticate_stream(request):
+    """
+    Id of the active user opening an SSE stream, from the Authorization
+    header or a ``?ticket=`` from ``issue_stream_ticket``; None otherwise.
+    """
+    token = token_from_header(request.headers.get("Authorization"))
+    if token:
+        user_id = user_id_from_token(token)
+    else:
+        user_id = await sync_to_async(redeem_stream_ticket)(request.GET.get("ticket"))
+    return await active_user_id(user_id)
+
+
+async def authenticate_websocket(params):
+    """
+    Id of the active user opening a WebSocket, from its ``ticket`` or, as
+    browsers cannot set headers there either, ``token`` query parameter.
+    """
+    if params.get("ticket"):
+        user_id = await sync_to_async(redeem_stream_ticket)(params["ticket"])
+    else:
+        user_id = user_id_from_token(params.get("token"))
+    return await active_user_id(user_id)
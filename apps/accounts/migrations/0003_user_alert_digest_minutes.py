@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_created_at_user_is_email_verified_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='alert_digest_minutes',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -6,6 +6,8 @@ class User (AbstractUser):
     email=models.EmailField(max_length=255, unique=True) 
     phone_number = models.CharField(max_length=15, blank=True, null=True)
     is_email_verified = models.BooleanField(default=False)
+    # Merge email alerts triggered within this many minutes into one digest
+    alert_digest_minutes = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -36,8 +36,8 @@ class UserProfileSerializer(serializers.ModelSerializer):
     """
     class Meta:
         model = User
-        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'is_email_verified', 'created_at']
-        # Make only first_name and last_name writable
+        fields = ['id', 'username', 'email', 'first_name', 'last_name', 'phone_number', 'is_email_verified', 'alert_digest_minutes', 'created_at']
+        # Make only first_name, last_name and alert_digest_minutes writable
         # Other fields are read-only while mvp is in progress to handle username, email, and phone_number edge cases
         read_only_fields = ['id', 'username', 'email', 'phone_number', 'is_email_verified', 'created_at']
 
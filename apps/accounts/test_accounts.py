@@ -1,9 +1,11 @@
+import fakeredis
 import pytest
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
+from apps.accounts import authentication
 
 
 User = get_user_model()
@@ -245,6 +247,20 @@ def test_update_profile_authenticated(api_client: APIClient, user: User):
     assert user.last_name == "Name"
 
 
+def test_update_profile_alert_digest_minutes(api_client: APIClient, user: User):
+    profile_url = reverse("accounts:profile")
+    refresh = RefreshToken.for_user(user)
+    access_token = str(refresh.access_token)
+    api_client.credentials(HTTP_AUTHORIZATION=f"Bearer {access_token}")
+
+    response = api_client.patch(profile_url, {"alert_digest_minutes": 10}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["alert_digest_minutes"] == 10
+    user.refresh_from_db()
+    assert user.alert_digest_minutes == 10
+
+
 def test_update_profile_readonly_fields(api_client: APIClient, user: User):
     profile_url = reverse("accounts:profile")
     refresh = RefreshToken.for_user(user)
@@ -344,3 +360,23 @@ def test_token_refresh_missing_token(api_client: APIClient):
     response = api_client.post(refresh_url, {}, format="json")
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def test_stream_ticket_is_single_use(api_client: APIClient, user: User, monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(authentication, "get_redis", lambda: client)
+    api_client.force_authenticate(user=user)
+
+    response = api_client.post(reverse("accounts:stream-ticket"))
+
+    assert response.status_code == status.HTTP_201_CREATED
+    ticket = response.data["ticket"]
+    assert 0 < client.ttl(authentication.stream_ticket_key(ticket)) <= response.data["expires_in"]
+    assert authentication.redeem_stream_ticket(ticket) == user.id
+    assert authentication.redeem_stream_ticket(ticket) is None
+
+
+def test_stream_ticket_unauthenticated(api_client: APIClient):
+    response = api_client.post(reverse("accounts:stream-ticket"))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
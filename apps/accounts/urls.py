@@ -10,4 +10,5 @@ urlpatterns = [
     path("profile/", views.UserProfileView.as_view(), name="profile"),
     path("auth/logout/", views.UserLogoutView.as_view(), name="logout"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("stream/ticket/", views.StreamTicketView.as_view(), name="stream-ticket"),
 ]
\ No newline at end of file
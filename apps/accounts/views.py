@@ -1,6 +1,8 @@
 from rest_framework import status, generics, permissions
 from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
+from django.conf import settings
+from .authentication import issue_stream_ticket
 from .serializers import (
     UserRegistrationSerializer,
     UserProfileSerializer,
@@ -85,4 +87,18 @@ class UserLogoutView(generics.GenericAPIView):
         except Exception as e:
             return Response({
                 'message': 'Logout successful'
-            }, status=status.HTTP_200_OK)
\ No newline at end of file
+            }, status=status.HTTP_200_OK)
+
+
+class StreamTicketView(generics.GenericAPIView):
+    """
+    Issue a short-lived single-use ticket for opening a stream with
+    ``?ticket=`` instead of putting the access token in the URL.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request, *args, **kwargs):
+        return Response({
+            'ticket': issue_stream_ticket(request.user.id),
+            'expires_in': settings.STREAM_TICKET_SECONDS,
+        }, status=status.HTTP_201_CREATED)
@@ -0,0 +1,179 @@
+"""
+Replay alert rules over stored price history.
+
+A rule's condition becomes a boolean mask over the whole series. Duration
+rules find the runs of consecutive met bars and keep the bars that are at
+least ``duration_hours`` into their run. Cooldowns are applied last by
+jumping from one fire to the first candidate after its cooldown, so Python
+only loops once per fire, never per bar.
+
+Rules are plain dicts of ``RULE_FIELDS``, and histories dicts of NumPy
+arrays, so both pickle cheaply to worker processes.
+"""
+
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from rest_framework import serializers
+
+from apps.stocks.indicators import ema, moving_sum, rsi, sma
+from apps.stocks.models import StockPrice
+from .evaluator import CONDITION_CODES, conditions_met, to_cents
+
+RULE_FIELDS = (
+    "alert_type",
+    "condition",
+    "threshold_price",
+    "duration_hours",
+    "cooldown_minutes",
+    "window",
+    "slow_window",
+)
+
+
+def rule_from_alert(alert):
+    return {field: getattr(alert, field) for field in RULE_FIELDS}
+
+
+def load_history(stock_id, start=None, end=None):
+    """
+    Close and volume series of a stock, with timestamps in epoch seconds.
+    """
+    rows = StockPrice.objects.filter(stock_id=stock_id).order_by("timestamp")
+    if start is not None:
+        rows = rows.filter(timestamp__gte=start)
+    if end is not None:
+        rows = rows.filter(timestamp__lte=end)
+    rows = list(rows.values_list("timestamp", "close_price", "volume"))
+    return {
+        "timestamps": np.array([row[0].timestamp() for row in rows], np.float64),
+        "closes": np.array([row[1] for row in rows], dtype=np.float64),
+        "volumes": np.array([row[2] for row in rows], dtype=np.float64),
+    }
+
+
+def previous(values, fill=np.nan):
+    """
+    ``values`` shifted one bar later.
+    """
+    shifted = np.empty_like(values, dtype=np.float64)
+    if len(values):
+        shifted[0] = fill
+        shifted[1:] = values[:-1]
+    return shifted
+
+
+def condition_mask(rule, history):
+    """
+    Bars at which the rule's condition holds; bars without enough history
+    for an indicator never do.
+    """
+    closes, volumes = history["closes"], history["volumes"]
+    alert_type, condition = rule["alert_type"], rule["condition"]
+    threshold = float(rule["threshold_price"])
+    if alert_type in ("threshold", "duration"):
+        return conditions_met(
+            CONDITION_CODES.get(condition, -1),
+            to_cents(rule["threshold_price"]),
+            np.rint(closes * 100).astype(np.int64),
+        )
+
+    sign = {"above": 1, "below": -1}.get(condition, np.nan)
+    window = rule["window"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if alert_type == "percent_change":
+            before = previous(closes)
+            return sign * (closes - before) / before * 100 > threshold
+        if alert_type == "rsi":
+            return sign * (rsi(closes, window) - threshold) > 0
+        if alert_type == "volume_spike":
+            # Against the previous ``window`` bars, with the sample deviation;
+            # centred first so the sums of squares keep their precision
+            centred = volumes - volumes.mean() if len(volumes) else volumes
+            mean = previous(moving_sum(centred, window) / window)
+            squares = previous(moving_sum(centred**2, window))
+            deviation = np.sqrt((squares - window * mean**2) / (window - 1))
+            return sign * (centred - mean) / deviation > threshold
+        if alert_type in ("sma_crossover", "ema_crossover"):
+            average = sma if alert_type == "sma_crossover" else ema
+            gap = average(closes, window) - average(closes, rule["slow_window"])
+            return (sign * previous(gap) <= 0) & (sign * gap > 0)
+    return np.zeros(len(closes), dtype=bool)
+
+
+def held_for(met, timestamps, seconds):
+    """
+    Bars at least ``seconds`` into their run of consecutive met bars.
+    """
+    positions = np.arange(len(met))
+    starts = met & ~np.concatenate(([False], met[:-1]))
+    run_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    return met & (timestamps - timestamps[run_start] >= seconds)
+
+
+def cool_down(candidates, timestamps, seconds):
+    """
+    Indices of the candidate bars that fire, each more than ``seconds`` after
+    the previous fire.
+    """
+    indices = np.flatnonzero(candidates)
+    if not seconds or len(indices) < 2:
+        return indices
+    moments = timestamps[indices]
+    fired = []
+    position = 0
+    while position < len(indices):
+        fired.append(indices[position])
+        position = np.searchsorted(moments, moments[position] + seconds, "right")
+    return np.array(fired, dtype=np.int64)
+
+
+def backtest(rule, history):
+    """
+    Indices of the bars at which ``rule`` would have fired.
+    """
+    timestamps = history["timestamps"]
+    candidates = condition_mask(rule, history)
+    if rule["alert_type"] == "duration":
+        candidates = held_for(candidates, timestamps, rule["duration_hours"] * 3600)
+    return cool_down(candidates, timestamps, rule["cooldown_minutes"] * 60)
+
+
+def backtest_rules(job):
+    history, rules = job
+    return [backtest(rule, history) for rule in rules]
+
+
+def backtest_many(jobs, workers=None):
+    """
+    Run ``(history, rules)`` jobs across a process pool; returns the fired
+    indices of each rule, per job.
+    """
+    if workers == 1 or len(jobs) == 1:
+        return [backtest_rules(job) for job in jobs]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(backtest_rules, jobs))
+
+
+def backtest_payload(rule, history):
+    started = time.perf_counter()
+    fired = backtest(rule, history)
+    elapsed = time.perf_counter() - started
+    timestamp_field = serializers.DateTimeField()
+    timestamps, closes = history["timestamps"], history["closes"]
+    return {
+        "bars": len(timestamps),
+        "fire_count": len(fired),
+        "fires": [
+            {
+                "timestamp": timestamp_field.to_representation(
+                    datetime.fromtimestamp(timestamps[index], dt_timezone.utc)
+                ),
+                "price": round(float(closes[index]), 2),
+            }
+            for index in fired
+        ],
+        "elapsed_ms": round(elapsed * 1000, 3),
+    }
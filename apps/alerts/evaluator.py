@@ -0,0 +1,527 @@
+import logging
+from decimal import Decimal
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from apps.stocks.models import Stock, StockPrice
+from .models import Alert, AlertCheck, AlertState, AlertTrigger, IndicatorState
+from .rolling import (
+    CROSSOVER_ALERT_TYPES,
+    INDICATOR_ALERT_TYPES,
+    StockIndicators,
+    alert_specs,
+    indicator_condition_met,
+    make_indicator,
+)
+
+logger = logging.getLogger(__name__)
+
+ALERT_TYPE_CODES = {"threshold": 0, "duration": 1}
+CONDITION_CODES = {"above": 0, "below": 1, "equals": 2}
+
+# Columns streamed for each active alert, in order
+ALERT_COLUMNS = (
+    "id",
+    "stock_id",
+    "alert_type",
+    "condition",
+    "threshold_price",
+    "duration_hours",
+    "cooldown_minutes",
+    "last_triggered_at",
+    "state__condition_met",
+    "state__condition_since",
+)
+
+# Alerts agreeing on these columns share one condition, evaluated once
+CONDITION_COLUMNS = (
+    "stock_id",
+    "alert_type",
+    "condition",
+    "threshold_price",
+    "duration_hours",
+)
+
+# Columns read for each active indicator alert, in order
+INDICATOR_COLUMNS = (
+    "id",
+    "stock_id",
+    "alert_type",
+    "condition",
+    "threshold_price",
+    "window",
+    "slow_window",
+    "cooldown_minutes",
+    "last_triggered_at",
+)
+
+# AlertState columns rewritten on every evaluation
+STATE_FIELDS = ("condition_met", "condition_since", "last_price", "evaluated_at")
+
+
+def to_cents(value):
+    """
+    Prices are compared as integer cents so ``equals`` stays exact.
+    """
+    return int(Decimal(str(value)) * 100)
+
+
+def from_cents(cents):
+    return Decimal(int(cents)).scaleb(-2)
+
+
+def to_seconds(moments):
+    return np.array(
+        [moment.timestamp() if moment else -np.inf for moment in moments],
+        dtype=np.float64,
+    )
+
+
+class PriceSnapshot:
+    """
+    Latest close price of every stock with active alerts (optionally only
+    ``stock_ids``), as arrays sorted by stock id, read with a single query.
+    """
+
+    def __init__(self, stock_ids, prices):
+        self.stock_ids = np.asarray(stock_ids, dtype=np.int64)
+        self.prices = np.asarray(prices, dtype=np.int64)
+
+    @classmethod
+    def load(cls, stock_ids=None):
+        stocks = Stock.objects.filter(alerts__is_active=True)
+        if stock_ids is not None:
+            stocks = stocks.filter(id__in=stock_ids)
+        rows = (
+            stocks.distinct()
+            .with_latest_price(("close_price",))
+            .order_by("id")
+            .values_list("id", "latest_close_price")
+        )
+        rows = [(stock_id, price) for stock_id, price in rows if price is not None]
+        return cls(
+            [stock_id for stock_id, _ in rows],
+            [to_cents(price) for _, price in rows],
+        )
+
+    def lookup(self, stock_ids):
+        """
+        Return ``(prices, has_price)`` arrays aligned with ``stock_ids``.
+        """
+        if not len(self.stock_ids):
+            return np.zeros(len(stock_ids), dtype=np.int64), np.zeros(
+                len(stock_ids), dtype=bool
+            )
+        positions = np.searchsorted(self.stock_ids, stock_ids)
+        positions = np.minimum(positions, len(self.stock_ids) - 1)
+        has_price = self.stock_ids[positions] == stock_ids
+        return self.prices[positions], has_price
+
+
+def conditions_met(conditions, thresholds, prices):
+    return (
+        ((conditions == CONDITION_CODES["above"]) & (prices > thresholds))
+        | ((conditions == CONDITION_CODES["below"]) & (prices < thresholds))
+        | ((conditions == CONDITION_CODES["equals"]) & (prices == thresholds))
+    )
+
+
+def condition_groups(keys):
+    """
+    Group rows of a ``keys`` matrix sorted by condition: returns the index
+    of each group's first row and, per row, the number of its group.
+    """
+    if not len(keys):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    starts = np.ones(len(keys), dtype=bool)
+    starts[1:] = (keys[1:] != keys[:-1]).any(axis=1)
+    return np.flatnonzero(starts), np.cumsum(starts) - 1
+
+
+def active_alert_rows(queryset=None, chunk_size=None):
+    """
+    Stream active alerts sorted by condition (so by stock first, and alerts
+    sharing a condition are adjacent), in chunks of column tuples.
+
+    The cooldown is checked against the denormalized ``last_triggered_at``
+    and the duration state is read through a join, so each chunk needs no
+    extra queries.
+    """
+    queryset = Alert.objects.all() if queryset is None else queryset
+    chunk_size = chunk_size or settings.ALERT_EVALUATION_CHUNK_SIZE
+    rows = (
+        queryset.filter(is_active=True, alert_type__in=ALERT_TYPE_CODES)
+        .order_by(*CONDITION_COLUMNS, "id")
+        .values_list(*ALERT_COLUMNS)
+        .iterator(chunk_size=chunk_size)
+    )
+    while chunk := list(islice(rows, chunk_size)):
+        yield chunk
+
+
+def evaluate_chunk(chunk, snapshot, now):
+    """
+    Evaluate one chunk of alert rows against the price snapshot.
+
+    Each distinct condition in the chunk is looked up and compared once, and
+    the result fanned out to the alerts sharing it; cooldowns and duration
+    runs stay per alert. Returns the unsaved ``(triggers, checks, states)``
+    to write: a duration alert gets its state upserted and a check only when
+    its condition flipped (or its run has no recorded start yet).
+    """
+    columns = dict(zip(ALERT_COLUMNS, zip(*chunk)))
+    alert_ids = np.array(columns["id"], dtype=np.int64)
+    stock_ids = np.array(columns["stock_id"], dtype=np.int64)
+    alert_types = np.array(
+        [ALERT_TYPE_CODES.get(value, -1) for value in columns["alert_type"]]
+    )
+    conditions = np.array(
+        [CONDITION_CODES.get(value, -1) for value in columns["condition"]]
+    )
+    thresholds = np.array(
+        [to_cents(value) for value in columns["threshold_price"]], dtype=np.int64
+    )
+    duration_hours = np.array(columns["duration_hours"], dtype=np.int64)
+    durations = duration_hours * 3600.0
+    cooldowns = np.array(columns["cooldown_minutes"], dtype=np.float64) * 60
+    last_triggered = to_seconds(columns["last_triggered_at"])
+    was_met = np.array(
+        [bool(value) for value in columns["state__condition_met"]], dtype=bool
+    )
+    condition_since = to_seconds(columns["state__condition_since"])
+
+    now_seconds = now.timestamp()
+    keys = np.column_stack(
+        (stock_ids, alert_types, conditions, thresholds, duration_hours)
+    )
+    firsts, members = condition_groups(keys)
+    prices, has_price = snapshot.lookup(stock_ids[firsts])
+    met = has_price & conditions_met(conditions[firsts], thresholds[firsts], prices)
+    prices, has_price, met = prices[members], has_price[members], met[members]
+    cooled = last_triggered < now_seconds - cooldowns
+
+    # Duration alerts keep the start of an unbroken run of met conditions
+    is_duration = has_price & (alert_types == ALERT_TYPE_CODES["duration"])
+    continuing = met & was_met & np.isfinite(condition_since)
+    duration_start = np.where(continuing, condition_since, now_seconds)
+    duration_elapsed = met & (now_seconds - duration_start >= durations)
+
+    fire = cooled & (
+        (met & (alert_types == ALERT_TYPE_CODES["threshold"]))
+        | (is_duration & duration_elapsed)
+    )
+
+    triggers = [
+        AlertTrigger(alert_id=int(alert_id), triggered_price=from_cents(price))
+        for alert_id, price in zip(alert_ids[fire], prices[fire])
+    ]
+
+    states = []
+    checks = []
+    # Unchanged runs need no write; a met run without a start gets one
+    changed = is_duration & ((met != was_met) | (met & ~continuing))
+    for row in np.flatnonzero(changed):
+        since = None
+        if met[row]:
+            since = columns["state__condition_since"][row] if continuing[row] else now
+        states.append(
+            AlertState(
+                alert_id=int(alert_ids[row]),
+                condition_met=bool(met[row]),
+                condition_since=since,
+                last_price=from_cents(prices[row]),
+                evaluated_at=now,
+            )
+        )
+        if met[row] != was_met[row]:
+            checks.append(
+                AlertCheck(
+                    alert_id=int(alert_ids[row]),
+                    current_price=from_cents(prices[row]),
+                    condition_met=bool(met[row]),
+                    duration_start=since,
+                )
+            )
+    return triggers, checks, states
+
+
+def cooled_down(last_triggered_at, cooldown_minutes, now):
+    return last_triggered_at is None or (
+        last_triggered_at < now - timezone.timedelta(minutes=cooldown_minutes)
+    )
+
+
+def claim_cooldowns(alert_ids, now):
+    """
+    Stamp ``last_triggered_at`` on those of the alerts out of their cooldown
+    and return their ids. The cooldown is re-checked by a conditional update
+    (one per cooldown length), so when the worker and the batch evaluator
+    race for an alert only one of them claims it.
+    """
+    by_cooldown = {}
+    for alert_id, minutes in Alert.objects.filter(id__in=alert_ids).values_list(
+        "id", "cooldown_minutes"
+    ):
+        by_cooldown.setdefault(minutes, []).append(alert_id)
+    # Stamped at ``now`` already, e.g. by a claim earlier in the same cycle
+    stamped = set(
+        Alert.objects.filter(id__in=alert_ids, last_triggered_at=now).values_list(
+            "id", flat=True
+        )
+    )
+    for minutes, ids in by_cooldown.items():
+        Alert.objects.filter(id__in=ids).filter(
+            Q(last_triggered_at__isnull=True)
+            | Q(last_triggered_at__lt=now - timezone.timedelta(minutes=minutes))
+        ).update(last_triggered_at=now)
+    claimed = Alert.objects.filter(id__in=alert_ids, last_triggered_at=now)
+    return set(claimed.values_list("id", flat=True)) - stamped
+
+
+def save_triggers(triggers, now):
+    """
+    Insert the triggers whose alerts could be claimed out of their cooldown.
+    """
+    if not triggers:
+        return []
+    with transaction.atomic():
+        claimed = claim_cooldowns({trigger.alert_id for trigger in triggers}, now)
+        triggers = AlertTrigger.objects.bulk_create(
+            trigger for trigger in triggers if trigger.alert_id in claimed
+        )
+    return [trigger.id for trigger in triggers]
+
+
+def fire_alerts(alert_ids, price, now=None):
+    """
+    Create triggers at ``price`` for the given alerts, skipping those still in
+    their cooldown. Returns the ids of the created triggers.
+    """
+    triggers = [
+        AlertTrigger(alert_id=alert_id, triggered_price=price) for alert_id in alert_ids
+    ]
+    return save_triggers(triggers, now or timezone.now())
+
+
+def record_transitions(prices, met, now=None):
+    """
+    Persist duration alerts entering (``met``) or leaving their condition:
+    upsert their state and write one transition check each. ``prices`` maps
+    alert ids to the price that caused the transition.
+    """
+    now = now or timezone.now()
+    since = now if met else None
+    with transaction.atomic():
+        AlertState.objects.bulk_create(
+            [
+                AlertState(
+                    alert_id=alert_id,
+                    condition_met=met,
+                    condition_since=since,
+                    last_price=price,
+                    evaluated_at=now,
+                )
+                for alert_id, price in prices.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["alert"],
+            update_fields=STATE_FIELDS,
+        )
+        AlertCheck.objects.bulk_create(
+            AlertCheck(
+                alert_id=alert_id,
+                current_price=price,
+                condition_met=met,
+                duration_start=since,
+            )
+            for alert_id, price in prices.items()
+        )
+
+
+def rebuild_indicators(stock_id, specs):
+    """
+    Replay the last ``INDICATOR_WARMUP_BARS`` bars of a stock into fresh
+    indicators, for stocks without a checkpoint or with new specs.
+
+    Returns ``(indicators, bar_timestamp, open_bar)``.
+    """
+    bars = list(
+        StockPrice.objects.filter(stock_id=stock_id).order_by("-timestamp")[
+            : settings.INDICATOR_WARMUP_BARS
+        ]
+    )[::-1]
+    indicators = StockIndicators({spec: make_indicator(spec) for spec in specs})
+    for bar in bars[:-1]:
+        indicators.push(float(bar.close_price), float(bar.volume))
+    bar_timestamp = bars[-2].timestamp if len(bars) > 1 else None
+    return indicators, bar_timestamp, bars[-1] if bars else None
+
+
+def advance_indicators(stock_specs):
+    """
+    Bring each stock's checkpointed indicators up to its open (latest) bar:
+    completed bars since the checkpoint are pushed, one each in the usual
+    case, and the new checkpoints saved.
+
+    Returns ``{stock_id: (indicators, bar_timestamp, open_bar)}``.
+    """
+    checkpoints = {
+        state.stock_id: state
+        for state in IndicatorState.objects.filter(stock_id__in=list(stock_specs))
+    }
+    resumable = {
+        stock_id: state
+        for stock_id, state in checkpoints.items()
+        if state.bar_timestamp is not None
+        and StockIndicators.load(state.state).has(stock_specs[stock_id])
+    }
+    new_bars = {stock_id: [] for stock_id in resumable}
+    if resumable:
+        since = min(state.bar_timestamp for state in resumable.values())
+        for bar in StockPrice.objects.filter(
+            stock_id__in=list(resumable), timestamp__gt=since
+        ).order_by("stock_id", "timestamp"):
+            if bar.timestamp > resumable[bar.stock_id].bar_timestamp:
+                new_bars[bar.stock_id].append(bar)
+
+    advanced = {}
+    checkpoints = []
+    for stock_id, specs in stock_specs.items():
+        if stock_id in resumable:
+            state = resumable[stock_id]
+            indicators = StockIndicators.load(state.state)
+            indicators.retain(specs)
+            bars = new_bars[stock_id]
+            if not bars:
+                continue
+            for bar in bars[:-1]:
+                indicators.push(float(bar.close_price), float(bar.volume))
+            bar_timestamp = bars[-2].timestamp if len(bars) > 1 else state.bar_timestamp
+            open_bar = bars[-1]
+        else:
+            indicators, bar_timestamp, open_bar = rebuild_indicators(stock_id, specs)
+            if open_bar is None:
+                continue
+        advanced[stock_id] = (indicators, bar_timestamp, open_bar)
+        checkpoints.append(
+            IndicatorState(
+                stock_id=stock_id,
+                bar_timestamp=bar_timestamp,
+                state=indicators.dump(),
+                updated_at=timezone.now(),
+            )
+        )
+
+    IndicatorState.objects.bulk_create(
+        checkpoints,
+        update_conflicts=True,
+        unique_fields=["stock"],
+        update_fields=["bar_timestamp", "state", "updated_at"],
+    )
+    return advanced
+
+
+def evaluate_indicator_alerts(queryset=None, now=None):
+    """
+    Evaluate active indicator alerts (optionally restricted to ``queryset``)
+    on the open bar of their stocks and write their triggers.
+
+    Returns the ids of the created triggers.
+    """
+    now = now or timezone.now()
+    queryset = Alert.objects.all() if queryset is None else queryset
+    alerts = list(
+        queryset.filter(is_active=True, alert_type__in=INDICATOR_ALERT_TYPES)
+        .order_by("stock_id", "id")
+        .values_list(*INDICATOR_COLUMNS)
+    )
+    if not alerts:
+        return []
+
+    stock_specs = {}
+    for _, stock_id, alert_type, _, _, window, slow_window, _, _ in alerts:
+        specs = stock_specs.setdefault(stock_id, set())
+        specs.update(alert_specs(alert_type, window, slow_window))
+    advanced = advance_indicators(stock_specs)
+
+    triggers = []
+    for (
+        alert_id,
+        stock_id,
+        alert_type,
+        condition,
+        threshold,
+        window,
+        slow_window,
+        cooldown_minutes,
+        last_triggered_at,
+    ) in alerts:
+        if stock_id not in advanced:
+            continue
+        indicators, bar_timestamp, bar = advanced[stock_id]
+        if not cooled_down(last_triggered_at, cooldown_minutes, now):
+            continue
+        # A crossover fires once per bar
+        if (
+            alert_type in CROSSOVER_ALERT_TYPES
+            and last_triggered_at is not None
+            and bar_timestamp is not None
+            and last_triggered_at > bar_timestamp
+        ):
+            continue
+        if indicator_condition_met(
+            alert_type,
+            condition,
+            float(threshold),
+            alert_specs(alert_type, window, slow_window),
+            indicators,
+            float(bar.close_price),
+            float(bar.volume),
+        ):
+            triggers.append(
+                AlertTrigger(alert_id=alert_id, triggered_price=bar.close_price)
+            )
+
+    trigger_ids = save_triggers(triggers, now)
+    logger.info(
+        f"Evaluated {len(alerts)} indicator alerts on {len(advanced)} stocks, "
+        f"{len(trigger_ids)} triggered"
+    )
+    return trigger_ids
+
+
+def evaluate_alerts(queryset=None, now=None, stock_ids=None):
+    """
+    Evaluate active alerts (optionally restricted to ``queryset``) in one
+    batch pass and write their triggers and checks in bulk, then the
+    indicator alerts. ``stock_ids`` limits the price snapshot to the stocks
+    of ``queryset`` when the caller already knows them.
+
+    Returns the ids of the created triggers.
+    """
+    now = now or timezone.now()
+    snapshot = PriceSnapshot.load(stock_ids)
+    trigger_ids = []
+
+    for chunk in active_alert_rows(queryset):
+        triggers, checks, states = evaluate_chunk(chunk, snapshot, now)
+        with transaction.atomic():
+            AlertState.objects.bulk_create(
+                states,
+                update_conflicts=True,
+                unique_fields=["alert"],
+                update_fields=STATE_FIELDS,
+            )
+            AlertCheck.objects.bulk_create(checks)
+            trigger_ids.extend(save_triggers(triggers, now))
+
+    logger.info(
+        f"Evaluated alerts for {len(snapshot.stock_ids)} stocks, "
+        f"{len(trigger_ids)} triggered"
+    )
+    return trigger_ids + evaluate_indicator_alerts(queryset, now)
@@ -0,0 +1,282 @@
+"""
+In-memory index of active alerts of one type for tick-driven matching.
+
+Per symbol, "above" and "below" alerts are kept in lists sorted by threshold
+(in integer cents). A new price only needs the alerts whose threshold lies
+between the previous price and the new one, found by binary search, so a
+tick costs O(log n + k) instead of a scan over every alert on the stock.
+Alerts with the same threshold share one entry, so ``n`` counts distinct
+conditions rather than users.
+"""
+
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+
+from .evaluator import to_cents
+from .models import Alert
+
+# Channel carrying alert create/update/delete events to evaluation workers
+ALERT_CHANGES_CHANNEL = "alerts:changes"
+
+
+class SortedThresholds:
+    """
+    Distinct thresholds in sorted order, each with the set of alerts sharing
+    it, so any number of identical alerts costs one entry to search.
+    """
+
+    def __init__(self):
+        self.thresholds = []
+        self.members = []
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def add(self, threshold, alert_id):
+        position = bisect_left(self.thresholds, threshold)
+        if (
+            position == len(self.thresholds)
+            or self.thresholds[position] != threshold
+        ):
+            self.thresholds.insert(position, threshold)
+            self.members.insert(position, set())
+        if alert_id not in self.members[position]:
+            self.members[position].add(alert_id)
+            self.count += 1
+
+    def remove(self, threshold, alert_id):
+        position = bisect_left(self.thresholds, threshold)
+        if (
+            position < len(self.thresholds)
+            and self.thresholds[position] == threshold
+            and alert_id in self.members[position]
+        ):
+            self.members[position].discard(alert_id)
+            self.count -= 1
+            if not self.members[position]:
+                del self.thresholds[position]
+                del self.members[position]
+
+    def between(self, low, high, inclusive_low=True):
+        """
+        Alert ids with threshold in ``[low, high)``, or ``(low, high]`` when
+        ``inclusive_low`` is false.
+        """
+        if inclusive_low:
+            start = bisect_left(self.thresholds, low)
+            end = bisect_left(self.thresholds, high)
+        else:
+            start = bisect_right(self.thresholds, low)
+            end = bisect_right(self.thresholds, high)
+        return [alert_id for group in self.members[start:end] for alert_id in group]
+
+
+class SymbolAlerts:
+    def __init__(self):
+        self.above = SortedThresholds()
+        self.below = SortedThresholds()
+        self.equals = defaultdict(set)
+
+    def __len__(self):
+        equals = sum(len(alert_ids) for alert_ids in self.equals.values())
+        return len(self.above) + len(self.below) + equals
+
+    def add(self, condition, threshold, alert_id):
+        if condition == "above":
+            self.above.add(threshold, alert_id)
+        elif condition == "below":
+            self.below.add(threshold, alert_id)
+        elif condition == "equals":
+            self.equals[threshold].add(alert_id)
+
+    def remove(self, condition, threshold, alert_id):
+        if condition == "above":
+            self.above.remove(threshold, alert_id)
+        elif condition == "below":
+            self.below.remove(threshold, alert_id)
+        elif condition == "equals":
+            self.equals[threshold].discard(alert_id)
+            if not self.equals[threshold]:
+                del self.equals[threshold]
+
+    def crossed(self, previous, price):
+        """
+        Alert ids whose condition became true moving from ``previous`` to
+        ``price``. With no previous price every currently met alert matches.
+        """
+        if previous is None:
+            matched = self.above.between(float("-inf"), price)
+            matched += self.below.between(price, float("inf"), inclusive_low=False)
+        elif price > previous:
+            # above: previous <= threshold < price
+            matched = self.above.between(previous, price)
+        elif price < previous:
+            # below: price < threshold <= previous
+            matched = self.below.between(price, previous, inclusive_low=False)
+        else:
+            matched = []
+        if price != previous:
+            matched += self.equals.get(price, ())
+        return matched
+
+    def uncrossed(self, previous, price):
+        """
+        Alert ids whose condition stopped being true moving from ``previous``
+        to ``price``.
+        """
+        if previous is None or price == previous:
+            return []
+        if price > previous:
+            # below: previous < threshold <= price
+            unmatched = self.below.between(previous, price, inclusive_low=False)
+        else:
+            # above: price <= threshold < previous
+            unmatched = self.above.between(price, previous)
+        return unmatched + list(self.equals.get(previous, ()))
+
+
+def condition_met(condition, threshold, price):
+    if condition == "above":
+        return price > threshold
+    if condition == "below":
+        return price < threshold
+    return condition == "equals" and price == threshold
+
+
+class AlertIndex:
+    """
+    Active alerts of one type for every symbol, plus the last price seen for
+    each symbol.
+
+    ``apply`` takes the change events published on ``ALERT_CHANGES_CHANNEL``;
+    each carries the alert's full state, so replaying one is harmless.
+    """
+
+    def __init__(self, alert_type="threshold"):
+        self.alert_type = alert_type
+        self.symbols = defaultdict(SymbolAlerts)
+        self.alerts = {}
+        self.last_prices = {}
+
+    def __len__(self):
+        return len(self.alerts)
+
+    @classmethod
+    def hydrate(cls, alert_type="threshold", stock_ids=None):
+        """
+        Build the index from the database: active alerts of ``alert_type``
+        (on ``stock_ids`` only, if given) and the latest close price of their
+        stocks.
+        """
+        from apps.stocks.models import Stock
+
+        index = cls(alert_type)
+        alerts = Alert.objects.filter(is_active=True, alert_type=alert_type)
+        if stock_ids is not None:
+            alerts = alerts.filter(stock_id__in=stock_ids)
+        for alert_id, symbol, condition, threshold in alerts.values_list(
+            "id", "stock__symbol", "condition", "threshold_price"
+        ).iterator():
+            index.add(alert_id, symbol, condition, threshold)
+
+        prices = (
+            Stock.objects.filter(symbol__in=list(index.symbols))
+            .with_latest_price(("close_price",))
+            .values_list("symbol", "latest_close_price")
+        )
+        for symbol, price in prices:
+            if price is not None:
+                index.last_prices[symbol] = to_cents(price)
+        return index
+
+    def add(self, alert_id, symbol, condition, threshold):
+        self.discard(alert_id)
+        threshold = to_cents(threshold)
+        self.symbols[symbol].add(condition, threshold, alert_id)
+        self.alerts[alert_id] = (symbol, condition, threshold)
+
+    def discard(self, alert_id):
+        entry = self.alerts.pop(alert_id, None)
+        if entry is None:
+            return
+        symbol, condition, threshold = entry
+        self.symbols[symbol].remove(condition, threshold, alert_id)
+        if not self.symbols[symbol]:
+            del self.symbols[symbol]
+
+    def apply(self, change):
+        """
+        Apply one change event from ``alert_change``.
+        """
+        alert_id = change["id"]
+        if (
+            change.get("deleted")
+            or not change["is_active"]
+            or change["alert_type"] != self.alert_type
+        ):
+            self.discard(alert_id)
+        else:
+            self.add(
+                alert_id,
+                change["symbol"],
+                change["condition"],
+                change["threshold_price"],
+            )
+
+    def crossings(self, symbol, price):
+        """
+        Ids of the alerts whose condition a new price for ``symbol`` would
+        make true and of those where it would stop being true. The price is
+        not recorded; see ``record``.
+        """
+        price = to_cents(price)
+        previous = self.last_prices.get(symbol)
+        alerts = self.symbols.get(symbol)
+        if alerts is None:
+            return [], []
+        return alerts.crossed(previous, price), alerts.uncrossed(previous, price)
+
+    def record(self, symbol, price):
+        self.last_prices[symbol] = to_cents(price)
+
+    def transitions(self, symbol, price):
+        """
+        Record a new price for ``symbol`` and return ``crossings`` for it.
+        """
+        crossings = self.crossings(symbol, price)
+        self.record(symbol, price)
+        return crossings
+
+    def match(self, symbol, price):
+        """
+        Record a new price for ``symbol`` and return the alert ids it crossed.
+        """
+        return self.transitions(symbol, price)[0]
+
+    def is_met(self, alert_id):
+        """
+        Whether an indexed alert's condition holds at its symbol's last price.
+        """
+        symbol, condition, threshold = self.alerts[alert_id]
+        price = self.last_prices.get(symbol)
+        return price is not None and condition_met(condition, threshold, price)
+
+
+def alert_change(alert, deleted=False):
+    """
+    Change event describing an alert's current state.
+    """
+    if deleted:
+        return {"id": alert.id, "deleted": True}
+    return {
+        "id": alert.id,
+        "stock_id": alert.stock_id,
+        "symbol": alert.stock.symbol,
+        "alert_type": alert.alert_type,
+        "condition": alert.condition,
+        "threshold_price": alert.threshold_price,
+        "duration_hours": alert.duration_hours,
+        "cooldown_minutes": alert.cooldown_minutes,
+        "is_active": alert.is_active,
+    }
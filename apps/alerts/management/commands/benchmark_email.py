@@ -0,0 +1,70 @@
+import time
+
+from django.core.mail import EmailMessage, get_connection
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare one SMTP connection per email with a shared connection, "
+        "against a local aiosmtpd server"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--messages", type=int, default=500)
+        parser.add_argument("--port", type=int, default=8025)
+
+    def handle(self, *args, **options):
+        try:
+            from aiosmtpd.controller import Controller
+            from aiosmtpd.handlers import Sink
+        except ImportError:
+            raise CommandError(
+                "aiosmtpd is required for this benchmark; it is in the dev "
+                "dependency group (poetry install --with dev)"
+            )
+
+        controller = Controller(Sink(), hostname="127.0.0.1", port=options["port"])
+        controller.start()
+        try:
+            backend = {
+                "backend": "django.core.mail.backends.smtp.EmailBackend",
+                "host": "127.0.0.1",
+                "port": options["port"],
+                "use_tls": False,
+                "use_ssl": False,
+                "username": "",
+                "password": "",
+            }
+            messages = [
+                EmailMessage(
+                    f"Stock Alert {number}",
+                    "Your stock alert has been triggered!",
+                    "alerts@example.com",
+                    ["user@example.com"],
+                )
+                for number in range(options["messages"])
+            ]
+
+            started = time.perf_counter()
+            for message in messages:
+                get_connection(**backend).send_messages([message])
+            per_message = time.perf_counter() - started
+
+            started = time.perf_counter()
+            with get_connection(**backend) as connection:
+                for message in messages:
+                    connection.send_messages([message])
+            shared = time.perf_counter() - started
+        finally:
+            controller.stop()
+
+        count = len(messages)
+        self.stdout.write(
+            f"Connection per message: {per_message:.2f}s "
+            f"({count / per_message:.0f} msg/s)"
+        )
+        self.stdout.write(
+            f"Shared connection:      {shared:.2f}s ({count / shared:.0f} msg/s)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {per_message / shared:.1f}x"))
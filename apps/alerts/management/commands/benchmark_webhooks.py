@@ -0,0 +1,92 @@
+import asyncio
+import threading
+import time
+
+import httpx
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from apps.alerts.webhooks import post_all
+
+
+def make_receiver(latency):
+    async def receiver(scope, receive, send):
+        """
+        Stand-in webhook receiver: reads the body, waits ``latency`` seconds
+        like a remote service would, and answers 204.
+        """
+        if scope["type"] != "http":
+            return
+        more_body = True
+        while more_body:
+            message = await receive()
+            more_body = message.get("more_body", False)
+        await asyncio.sleep(latency)
+        await send({"type": "http.response.start", "status": 204, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    return receiver
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare sequential webhook posts with the pooled concurrent client, "
+        "against a local stand-in receiver served by uvicorn"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--deliveries", type=int, default=5000)
+        parser.add_argument("--port", type=int, default=8099)
+        parser.add_argument("--latency-ms", type=float, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            import uvicorn
+        except ImportError:
+            raise CommandError("uvicorn is required for this benchmark")
+
+        server = uvicorn.Server(
+            uvicorn.Config(
+                make_receiver(options["latency_ms"] / 1000),
+                host="127.0.0.1",
+                port=options["port"],
+                log_level="warning",
+                access_log=False,
+            )
+        )
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.05)
+
+        url = f"http://127.0.0.1:{options['port']}/hook"
+        body = b'{"event": "alert.triggered", "trigger": {"id": 1}}'
+        deliveries = [
+            (url, "secret", body, number) for number in range(options["deliveries"])
+        ]
+        # The sequential baseline is slow; time it on a sample
+        sample = deliveries[: max(len(deliveries) // 10, 1)]
+        try:
+            started = time.perf_counter()
+            for url, _, body, _ in sample:
+                httpx.post(url, content=body, timeout=5)
+            sequential = (time.perf_counter() - started) / len(sample)
+
+            started = time.perf_counter()
+            # The stand-in receiver is local, which webhooks normally refuse
+            with override_settings(WEBHOOK_ALLOWED_HOSTS=["127.0.0.1"]):
+                results = asyncio.run(post_all(deliveries))
+            pooled = (time.perf_counter() - started) / len(deliveries)
+        finally:
+            server.should_exit = True
+            thread.join()
+
+        failed = sum(1 for _, _, error in results if error is not None)
+        self.stdout.write(
+            f"Sequential posts: {1 / sequential:.0f}/s (sample of {len(sample)})"
+        )
+        self.stdout.write(
+            f"Pooled client:    {1 / pooled:.0f}/s "
+            f"({len(deliveries) - failed}/{len(deliveries)} delivered)"
+        )
+        self.stdout.write(self.style.SUCCESS(f"Speedup: {sequential / pooled:.1f}x"))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.alerts.worker import AlertWorker
+
+
+class Command(BaseCommand):
+    help = "Match threshold alerts against live quotes using an in-memory index"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS("Starting alert worker"))
+        AlertWorker().run()
@@ -0,0 +1,65 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_states(apps, schema_editor):
+    """
+    Seed each duration alert's state from its latest check.
+    """
+    Alert = apps.get_model("alerts", "Alert")
+    AlertCheck = apps.get_model("alerts", "AlertCheck")
+    AlertState = apps.get_model("alerts", "AlertState")
+
+    states = []
+    for alert_id in Alert.objects.filter(alert_type="duration").values_list(
+        "id", flat=True
+    ):
+        check = (
+            AlertCheck.objects.filter(alert_id=alert_id).order_by("-checked_at").first()
+        )
+        if check is not None:
+            states.append(
+                AlertState(
+                    alert_id=alert_id,
+                    condition_met=check.condition_met,
+                    condition_since=check.duration_start,
+                    last_price=check.current_price,
+                    evaluated_at=check.checked_at,
+                )
+            )
+    AlertState.objects.bulk_create(states, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("alerts", "0002_alter_alert_notification_method"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="AlertState",
+            fields=[
+                (
+                    "alert",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="state",
+                        serialize=False,
+                        to="alerts.alert",
+                    ),
+                ),
+                ("condition_met", models.BooleanField(default=False)),
+                ("condition_since", models.DateTimeField(blank=True, null=True)),
+                (
+                    "last_price",
+                    models.DecimalField(
+                        blank=True, decimal_places=2, max_digits=10, null=True
+                    ),
+                ),
+                ("evaluated_at", models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.RunPython(seed_states, migrations.RunPython.noop),
+    ]
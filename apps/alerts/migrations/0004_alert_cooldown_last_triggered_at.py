@@ -0,0 +1,32 @@
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def backfill_last_triggered_at(apps, schema_editor):
+    Alert = apps.get_model("alerts", "Alert")
+    alerts = Alert.objects.annotate(latest=Max("triggers__triggered_at")).filter(
+        latest__isnull=False
+    )
+    for alert in alerts.only("id").iterator():
+        Alert.objects.filter(id=alert.id).update(last_triggered_at=alert.latest)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("alerts", "0003_alert_state"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="alert",
+            name="cooldown_minutes",
+            field=models.PositiveIntegerField(default=60),
+        ),
+        migrations.AddField(
+            model_name="alert",
+            name="last_triggered_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_last_triggered_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("alerts", "0006_webhooks"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="alert",
+            index=models.Index(
+                fields=[
+                    "stock",
+                    "alert_type",
+                    "condition",
+                    "threshold_price",
+                    "duration_hours",
+                ],
+                name="alert_condition_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,57 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("alerts", "0007_alert_condition_index"),
+        ("stocks", "0003_watchlist_unique_and_price_indexes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="alert",
+            name="window",
+            field=models.PositiveIntegerField(default=14),
+        ),
+        migrations.AddField(
+            model_name="alert",
+            name="slow_window",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name="alert",
+            name="alert_type",
+            field=models.CharField(
+                choices=[
+                    ("threshold", "Threshold Alert"),
+                    ("duration", "Duration Alert"),
+                    ("percent_change", "Percent Change"),
+                    ("sma_crossover", "SMA Crossover"),
+                    ("ema_crossover", "EMA Crossover"),
+                    ("rsi", "RSI"),
+                    ("volume_spike", "Volume Spike"),
+                ],
+                max_length=20,
+            ),
+        ),
+        migrations.CreateModel(
+            name="IndicatorState",
+            fields=[
+                (
+                    "stock",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="indicator_state",
+                        serialize=False,
+                        to="stocks.stock",
+                    ),
+                ),
+                ("bar_timestamp", models.DateTimeField(blank=True, null=True)),
+                ("state", models.JSONField(default=dict)),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -1,5 +1,8 @@
+import secrets
+
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Alert(models.Model):
@@ -10,6 +13,11 @@ class Alert(models.Model):
     ALERT_TYPES = [
         ("threshold", "Threshold Alert"),
         ("duration", "Duration Alert"),
+        ("percent_change", "Percent Change"),
+        ("sma_crossover", "SMA Crossover"),
+        ("ema_crossover", "EMA Crossover"),
+        ("rsi", "RSI"),
+        ("volume_spike", "Volume Spike"),
     ]
 
     CONDITIONS = [
@@ -22,6 +30,7 @@ class Alert(models.Model):
     NOTIFICATION_METHODS = [
         ("email", "Email"),
         ("console", "Console Notification"),
+        ("webhook", "Webhook"),
     ]
 
     user = models.ForeignKey(
@@ -34,9 +43,17 @@ class Alert(models.Model):
     condition = models.CharField(max_length=10, choices=CONDITIONS)
     threshold_price = models.DecimalField(max_digits=10, decimal_places=2)
     duration_hours = models.PositiveIntegerField(default=0)
+    # Bars in the indicator window (RSI period, fast average, volume lookback)
+    # and in the slow average of a crossover
+    window = models.PositiveIntegerField(default=14)
+    slow_window = models.PositiveIntegerField(default=0)
     notification_method = models.CharField(
         max_length=10, choices=NOTIFICATION_METHODS, default="email"
     )
+    # Minimum time between two triggers of this alert
+    cooldown_minutes = models.PositiveIntegerField(default=60)
+    # Denormalized time of the latest trigger, checked by the evaluators
+    last_triggered_at = models.DateTimeField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -45,8 +62,39 @@ class Alert(models.Model):
         indexes = [
             models.Index(fields=['user', 'is_active']),
             models.Index(fields=['stock', 'is_active']),
+            # Order of the batch evaluator, which groups identical conditions
+            models.Index(
+                fields=[
+                    'stock',
+                    'alert_type',
+                    'condition',
+                    'threshold_price',
+                    'duration_hours',
+                ],
+                name='alert_condition_idx',
+            ),
         ]
 
+    def rule_text(self):
+        """
+        The alert's condition in words, as shown in notifications.
+        """
+        threshold = self.threshold_price
+        if self.alert_type == "percent_change":
+            direction = "up" if self.condition == "above" else "down"
+            return f"{direction} {threshold}% on previous close"
+        if self.alert_type in ("sma_crossover", "ema_crossover"):
+            average = self.alert_type.split("_")[0].upper()
+            return (
+                f"{average}({self.window}) crosses {self.condition} "
+                f"{average}({self.slow_window})"
+            )
+        if self.alert_type == "rsi":
+            return f"RSI({self.window}) {self.condition} {threshold}"
+        if self.alert_type == "volume_spike":
+            return f"volume z-score({self.window}) {self.condition} {threshold}"
+        return f"{self.condition} ${threshold}"
+
 
 class AlertTrigger(models.Model):
     """
@@ -68,7 +116,10 @@ class AlertTrigger(models.Model):
 
 class AlertCheck(models.Model):
     """
-    Model to track alert condition checks for duration alerts.
+    Model to track condition transitions of duration alerts.
+
+    A row is written only when the condition flips; the current state lives
+    in ``AlertState``.
     """
 
     alert = models.ForeignKey(Alert, on_delete=models.CASCADE, related_name="checks")
@@ -81,4 +132,105 @@ class AlertCheck(models.Model):
         indexes = [
             models.Index(fields=['alert', '-checked_at']),
             models.Index(fields=['checked_at']),
-        ]
\ No newline at end of file
+        ]
+
+
+class AlertState(models.Model):
+    """
+    Current condition state of a duration alert, upserted when the condition
+    flips; ``last_price`` and ``evaluated_at`` are as of that flip.
+    """
+
+    alert = models.OneToOneField(
+        Alert, on_delete=models.CASCADE, primary_key=True, related_name="state"
+    )
+    condition_met = models.BooleanField(default=False)
+    condition_since = models.DateTimeField(null=True, blank=True)
+    last_price = models.DecimalField(
+        max_digits=10, decimal_places=2, null=True, blank=True
+    )
+    evaluated_at = models.DateTimeField(null=True, blank=True)
+
+
+class IndicatorState(models.Model):
+    """
+    Checkpoint of a stock's rolling indicators through its last completed
+    bar, so evaluation resumes without replaying the price history.
+    """
+
+    stock = models.OneToOneField(
+        "stocks.Stock",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="indicator_state",
+    )
+    bar_timestamp = models.DateTimeField(null=True, blank=True)
+    state = models.JSONField(default=dict)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class NotificationOutbox(models.Model):
+    """
+    Pending notification of an alert trigger, drained by dispatchers that
+    claim batches with ``SELECT ... FOR UPDATE SKIP LOCKED``.
+    """
+
+    STATUSES = [
+        ("pending", "Pending"),
+        ("sent", "Sent"),
+        ("failed", "Failed"),
+    ]
+
+    trigger = models.OneToOneField(
+        AlertTrigger, on_delete=models.CASCADE, related_name="outbox_entry"
+    )
+    status = models.CharField(max_length=10, choices=STATUSES, default="pending")
+    attempts = models.PositiveIntegerField(default=0)
+    # Earliest time the entry may be claimed: retry backoff or claim lease
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "available_at"]),
+        ]
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookEndpoint(models.Model):
+    """
+    URL receiving a user's webhook alert notifications, signed with ``secret``.
+    """
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="webhook_endpoints",
+    )
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+
+class WebhookDeadLetter(models.Model):
+    """
+    Webhook delivery that still failed after all its retries.
+    """
+
+    endpoint = models.ForeignKey(
+        WebhookEndpoint, on_delete=models.CASCADE, related_name="dead_letters"
+    )
+    trigger = models.ForeignKey(
+        AlertTrigger, on_delete=models.CASCADE, related_name="dead_letters"
+    )
+    payload = models.JSONField()
+    status_code = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField()
+    attempts = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,365 @@
+"""
+Notification outbox: triggers are queued as ``NotificationOutbox`` rows and
+delivered in batches by any number of dispatchers.
+
+A dispatcher claims a batch in a short transaction with ``SELECT ... FOR
+UPDATE SKIP LOCKED`` (concurrent dispatchers skip each other's rows instead
+of waiting on them) and leases it by pushing ``available_at`` forward, so
+the row locks are released before anything is sent. An entry whose
+dispatcher dies is claimed again once its lease expires; an entry that
+fails is retried with exponential backoff until ``NOTIFICATION_MAX_ATTEMPTS``.
+
+Email entries of a batch share one SMTP connection. Users with an
+``alert_digest_minutes`` window get their email entries held until the end
+of the current window and merged into a single digest message.
+
+Webhook entries are posted to all of the user's endpoints concurrently (see
+``webhooks``); deliveries that exhaust their retries go to the dead-letter
+list.
+"""
+
+import asyncio
+import json
+import logging
+import math
+import random
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import (
+    AlertTrigger,
+    NotificationOutbox,
+    WebhookDeadLetter,
+    WebhookEndpoint,
+)
+from .webhooks import post_all, webhook_body
+
+logger = logging.getLogger(__name__)
+
+
+def digest_window_end(now, minutes):
+    """
+    End of the ``minutes``-long window containing ``now``; windows are
+    aligned to the epoch so every trigger of a window is due together.
+    """
+    window = minutes * 60
+    end = math.floor(now.timestamp() / window) * window + window
+    return timezone.datetime.fromtimestamp(end, tz=now.tzinfo)
+
+
+def enqueue_notifications(trigger_ids, now=None):
+    """
+    Queue one outbox entry per trigger; queueing a trigger twice is a no-op.
+    """
+    now = now or timezone.now()
+    triggers = AlertTrigger.objects.filter(id__in=trigger_ids).values_list(
+        "id", "alert__notification_method", "alert__user__alert_digest_minutes"
+    )
+    entries = []
+    for trigger_id, method, digest_minutes in triggers:
+        available_at = now
+        if method == "email" and digest_minutes:
+            available_at = digest_window_end(now, digest_minutes)
+        entries.append(
+            NotificationOutbox(trigger_id=trigger_id, available_at=available_at)
+        )
+    NotificationOutbox.objects.bulk_create(entries, ignore_conflicts=True)
+
+
+def claim_batch(batch_size=None, now=None):
+    """
+    Claim up to ``batch_size`` due entries for this dispatcher and return
+    them with their trigger, alert, stock and user loaded.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_BATCH_SIZE
+    now = now or timezone.now()
+    with transaction.atomic():
+        ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status="pending", available_at__lte=now)
+            .order_by("available_at", "id")
+            .values_list("id", flat=True)[:batch_size]
+        )
+        NotificationOutbox.objects.filter(id__in=ids).update(
+            attempts=F("attempts") + 1,
+            available_at=now
+            + timezone.timedelta(seconds=settings.NOTIFICATION_LEASE_SECONDS),
+        )
+    return list(
+        NotificationOutbox.objects.filter(id__in=ids)
+        .select_related("trigger__alert__stock", "trigger__alert__user")
+        .order_by("id")
+    )
+
+
+def retry_delay(attempts):
+    """
+    Exponential backoff, jittered over its upper half, after ``attempts``.
+    """
+    base = settings.NOTIFICATION_RETRY_BASE_SECONDS * 2 ** (attempts - 1)
+    return timezone.timedelta(seconds=random.uniform(base / 2, base))
+
+
+def email_subject(trigger):
+    alert = trigger.alert
+    return f"Stock Alert: {alert.stock.symbol} {alert.rule_text()}"
+
+
+def email_message(trigger):
+    alert = trigger.alert
+    user = alert.user
+    return f"""
+        Hello {user.first_name or user.username},
+
+        Your stock alert has been triggered!
+
+        Stock: {alert.stock.symbol} ({alert.stock.name})
+        Current Price: ${trigger.triggered_price}
+        Triggered At: {trigger.triggered_at}
+
+        Best regards,
+        Stock Alert System
+        """
+
+
+def digest_subject(triggers):
+    symbols = ", ".join(
+        dict.fromkeys(trigger.alert.stock.symbol for trigger in triggers)
+    )
+    return f"Stock Alerts: {len(triggers)} alerts triggered ({symbols})"
+
+
+def digest_message(triggers):
+    user = triggers[0].alert.user
+    lines = "\n".join(
+        f"        - {trigger.alert.stock.symbol} ({trigger.alert.stock.name}) "
+        f"{trigger.alert.rule_text()}: "
+        f"${trigger.triggered_price} at {trigger.triggered_at}"
+        for trigger in triggers
+    )
+    return f"""
+        Hello {user.first_name or user.username},
+
+        {len(triggers)} of your stock alerts have been triggered:
+
+{lines}
+
+        Best regards,
+        Stock Alert System
+        """
+
+
+def console_message(trigger):
+    alert = trigger.alert
+    return f"""
+        ===== STOCK ALERT TRIGGERED =====
+        User: {alert.user.email}
+        Stock: {alert.stock.symbol} ({alert.stock.name})
+        Current Price: ${trigger.triggered_price}
+        Triggered At: {trigger.triggered_at}
+        =================================
+        """
+
+
+def deliver_email(trigger):
+    if not settings.EMAIL_HOST_USER:
+        raise RuntimeError("Email configuration not set up")
+    send_mail(
+        subject=email_subject(trigger),
+        message=email_message(trigger),
+        from_email=settings.EMAIL_HOST_USER,
+        recipient_list=[trigger.alert.user.email],
+        fail_silently=False,
+    )
+
+
+def deliver_console(trigger):
+    print(console_message(trigger))
+
+
+def email_messages(entries):
+    """
+    Build ``(entries, message)`` pairs: one digest per user with a digest
+    window and several entries, one message per entry otherwise.
+    """
+    by_user = defaultdict(list)
+    for entry in entries:
+        by_user[entry.trigger.alert.user].append(entry)
+
+    for user, user_entries in by_user.items():
+        if user.alert_digest_minutes and len(user_entries) > 1:
+            triggers = [entry.trigger for entry in user_entries]
+            subject, body = digest_subject(triggers), digest_message(triggers)
+            yield user_entries, EmailMessage(
+                subject, body, settings.EMAIL_HOST_USER, [user.email]
+            )
+            continue
+        for entry in user_entries:
+            yield [entry], EmailMessage(
+                email_subject(entry.trigger),
+                email_message(entry.trigger),
+                settings.EMAIL_HOST_USER,
+                [user.email],
+            )
+
+
+def deliver_email_batch(entries):
+    """
+    Send the batch's emails over one SMTP connection. Returns the delivered
+    and failed entries; failures carry their error in ``last_error``.
+    """
+    if not settings.EMAIL_HOST_USER:
+        return [], fail(entries, "Email configuration not set up")
+
+    sent, failed = [], []
+    try:
+        with get_connection() as connection:
+            for message_entries, message in email_messages(entries):
+                try:
+                    connection.send_messages([message])
+                    sent += message_entries
+                except Exception as e:
+                    failed += fail(message_entries, e)
+    except Exception as e:
+        # Opening or closing the connection failed
+        delivered = {entry.id for entry in sent}
+        failed += fail(
+            [entry for entry in entries if entry.id not in delivered], e
+        )
+    return sent, failed
+
+
+def deliver_console_batch(entries):
+    sent, failed = [], []
+    for entry in entries:
+        try:
+            deliver_console(entry.trigger)
+            sent.append(entry)
+        except Exception as e:
+            failed += fail([entry], e)
+    return sent, failed
+
+
+def deliver_webhook_batch(entries):
+    """
+    Post the batch's webhooks concurrently. Entries of users without an
+    active endpoint fail; the others count as sent, with any delivery that
+    ran out of retries stored as a ``WebhookDeadLetter``.
+    """
+    endpoints = defaultdict(list)
+    user_ids = {entry.trigger.alert.user_id for entry in entries}
+    for endpoint in WebhookEndpoint.objects.filter(
+        user_id__in=user_ids, is_active=True
+    ):
+        endpoints[endpoint.user_id].append(endpoint)
+
+    sent, failed, targets, deliveries = [], [], [], []
+    for entry in entries:
+        user_endpoints = endpoints.get(entry.trigger.alert.user_id)
+        if not user_endpoints:
+            failed += fail([entry], "No active webhook endpoint")
+            continue
+        sent.append(entry)
+        body = webhook_body(entry.trigger)
+        for endpoint in user_endpoints:
+            targets.append((entry, endpoint, body))
+            deliveries.append((endpoint.url, endpoint.secret, body, entry.trigger_id))
+    if not deliveries:
+        return sent, failed
+
+    results = asyncio.run(post_all(deliveries))
+    dead_letters = []
+    for (entry, endpoint, body), (attempts, status_code, error) in zip(
+        targets, results
+    ):
+        if error is None:
+            continue
+        logger.error(
+            f"Webhook for trigger {entry.trigger_id} to {endpoint.url} failed "
+            f"after {attempts} attempts: {error}"
+        )
+        dead_letters.append(
+            WebhookDeadLetter(
+                endpoint=endpoint,
+                trigger_id=entry.trigger_id,
+                payload=json.loads(body),
+                status_code=status_code,
+                error=error,
+                attempts=attempts,
+            )
+        )
+    WebhookDeadLetter.objects.bulk_create(dead_letters)
+    return sent, failed
+
+
+def fail(entries, error):
+    """
+    Record ``error`` on undelivered entries and return them.
+    """
+    for entry in entries:
+        logger.error(
+            f"Error sending notification for trigger {entry.trigger_id}: {error}"
+        )
+        entry.last_error = str(error)
+    return list(entries)
+
+
+CHANNELS = {
+    "email": deliver_email_batch,
+    "console": deliver_console_batch,
+    "webhook": deliver_webhook_batch,
+}
+
+
+def dispatch_batch(batch_size=None, now=None):
+    """
+    Claim and deliver one batch. Returns the number of entries claimed.
+    """
+    entries = claim_batch(batch_size, now)
+    by_method = defaultdict(list)
+    for entry in entries:
+        by_method[entry.trigger.alert.notification_method].append(entry)
+
+    sent, failed = [], []
+    for method, method_entries in by_method.items():
+        channel = CHANNELS.get(method)
+        if channel is None:
+            error = f"Unknown notification method {method}"
+            result = [], fail(method_entries, error)
+        else:
+            result = channel(method_entries)
+        sent += result[0]
+        failed += result[1]
+
+    record_results(sent, failed)
+    return len(entries)
+
+
+def record_results(sent, failed):
+    now = timezone.now()
+    if sent:
+        sent_ids = [entry.id for entry in sent]
+        NotificationOutbox.objects.filter(id__in=sent_ids).update(
+            status="sent", sent_at=now, last_error=None
+        )
+        AlertTrigger.objects.filter(outbox_entry__id__in=sent_ids).update(
+            notification_sent=True, notification_sent_at=now
+        )
+
+    for entry in failed:
+        entry.available_at = now + retry_delay(entry.attempts)
+        if entry.attempts >= settings.NOTIFICATION_MAX_ATTEMPTS:
+            entry.status = "failed"
+    NotificationOutbox.objects.bulk_update(
+        failed, ["status", "available_at", "last_error"]
+    )
+    exhausted = [entry for entry in failed if entry.status == "failed"]
+    for entry in exhausted:
+        AlertTrigger.objects.filter(id=entry.trigger_id).update(
+            error_message=entry.last_error
+        )
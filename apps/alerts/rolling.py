@@ -0,0 +1,303 @@
+"""
+Incremental technical indicators for indicator alerts.
+
+Each indicator keeps just enough running state to absorb a new bar in O(1):
+a running sum over a fixed window (SMA), the EMA recurrence, Wilder's
+smoothed gains and losses (RSI), and Welford's mean and variance over a
+sliding window (volume z-score).
+
+Stocks have one ``StockPrice`` row per day, updated in place while the day
+is open. Completed bars are ``push``-ed into the state; the open bar is only
+``peek``-ed, which returns the indicator as if it were pushed without
+changing the state. The state of every indicator serializes to JSON, so it
+is checkpointed in ``IndicatorState`` and evaluation resumes from there.
+"""
+
+import math
+from collections import deque
+
+
+class SMA:
+    source = "close"
+
+    def __init__(self, window, values=(), total=0.0):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.total = total
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            self.total -= self.values[0]
+        self.values.append(value)
+        self.total += value
+
+    def peek(self, value):
+        if len(self.values) + 1 < self.window:
+            return None
+        if len(self.values) == self.window:
+            return (self.total - self.values[0] + value) / self.window
+        return (self.total + value) / self.window
+
+    def value(self):
+        if len(self.values) < self.window:
+            return None
+        return self.total / self.window
+
+    def dump(self):
+        return {"values": list(self.values), "total": self.total}
+
+
+class EMA:
+    """
+    Exponential moving average, seeded with the SMA of the first ``window``
+    bars.
+    """
+
+    source = "close"
+
+    def __init__(self, window, count=0, total=0.0, ema=None):
+        self.window = window
+        self.alpha = 2 / (window + 1)
+        self.count = count
+        self.total = total
+        self.ema = ema
+
+    def next(self, value):
+        if self.ema is not None:
+            return self.ema + self.alpha * (value - self.ema)
+        if self.count + 1 == self.window:
+            return (self.total + value) / self.window
+        return None
+
+    def push(self, value):
+        ema = self.next(value)
+        if ema is None:
+            self.total += value
+        self.ema = ema
+        self.count += 1
+
+    def peek(self, value):
+        return self.next(value)
+
+    def value(self):
+        return self.ema
+
+    def dump(self):
+        return {"count": self.count, "total": self.total, "ema": self.ema}
+
+
+class RSI:
+    """
+    Wilder's relative strength index. Average gains and losses between
+    consecutive closes are a plain running mean over the first ``window``
+    changes, then smoothed as ``avg + (change - avg) / window``.
+    """
+
+    source = "close"
+
+    def __init__(self, window, last=None, count=0, gain=0.0, loss=0.0):
+        self.window = window
+        self.last = last
+        self.count = count
+        self.gain = gain
+        self.loss = loss
+
+    def step(self, value):
+        change = value - self.last
+        count = self.count + 1
+        weight = min(count, self.window)
+        gain = self.gain + (max(change, 0.0) - self.gain) / weight
+        loss = self.loss + (max(-change, 0.0) - self.loss) / weight
+        return count, gain, loss
+
+    def push(self, value):
+        if self.last is not None:
+            self.count, self.gain, self.loss = self.step(value)
+        self.last = value
+
+    def peek(self, value):
+        if self.last is None:
+            return None
+        count, gain, loss = self.step(value)
+        return rsi(gain, loss) if count >= self.window else None
+
+    def value(self):
+        return rsi(self.gain, self.loss) if self.count >= self.window else None
+
+    def dump(self):
+        return {
+            "last": self.last,
+            "count": self.count,
+            "gain": self.gain,
+            "loss": self.loss,
+        }
+
+
+def rsi(gain, loss):
+    if loss == 0:
+        return 100.0 if gain > 0 else 50.0
+    return 100 - 100 / (1 + gain / loss)
+
+
+class VolumeZScore:
+    """
+    Z-score of a bar's volume against the previous ``window`` bars, with
+    their mean and variance kept by Welford's update and its inverse as bars
+    leave the window.
+    """
+
+    source = "volume"
+
+    def __init__(self, window, values=(), mean=0.0, m2=0.0):
+        self.window = window
+        self.values = deque(values, maxlen=window)
+        self.mean = mean
+        self.m2 = m2
+
+    def push(self, value):
+        if len(self.values) == self.window:
+            oldest = self.values[0]
+            mean = self.mean + (value - oldest) / self.window
+            self.m2 += (value - oldest) * (value - mean + oldest - self.mean)
+            self.mean = mean
+        else:
+            delta = value - self.mean
+            self.mean += delta / (len(self.values) + 1)
+            self.m2 += delta * (value - self.mean)
+        self.values.append(value)
+
+    def peek(self, value):
+        if len(self.values) < self.window:
+            return None
+        std = math.sqrt(max(self.m2, 0.0) / (self.window - 1))
+        if std == 0:
+            return None
+        return (value - self.mean) / std
+
+    def dump(self):
+        return {"values": list(self.values), "mean": self.mean, "m2": self.m2}
+
+
+INDICATORS = {"sma": SMA, "ema": EMA, "rsi": RSI, "volume_z": VolumeZScore}
+
+CROSSOVER_ALERT_TYPES = ("sma_crossover", "ema_crossover")
+
+INDICATOR_ALERT_TYPES = (
+    "percent_change",
+    "sma_crossover",
+    "ema_crossover",
+    "rsi",
+    "volume_spike",
+)
+
+
+def make_indicator(spec, state=None):
+    """
+    Build an indicator from a spec such as ``"sma:20"``, optionally
+    restoring a dumped state.
+    """
+    name, window = spec.split(":")
+    return INDICATORS[name](int(window), **(state or {}))
+
+
+class StockIndicators:
+    """
+    A stock's indicators (keyed by spec) and last close, through its last
+    completed bar.
+    """
+
+    def __init__(self, indicators=None, close=None):
+        self.indicators = indicators or {}
+        self.close = close
+
+    @classmethod
+    def load(cls, state):
+        return cls(
+            {
+                spec: make_indicator(spec, dumped)
+                for spec, dumped in state.get("indicators", {}).items()
+            },
+            state.get("close"),
+        )
+
+    def dump(self):
+        return {
+            "close": self.close,
+            "indicators": {
+                spec: indicator.dump() for spec, indicator in self.indicators.items()
+            },
+        }
+
+    def has(self, specs):
+        return all(spec in self.indicators for spec in specs)
+
+    def push(self, close, volume):
+        for indicator in self.indicators.values():
+            indicator.push(volume if indicator.source == "volume" else close)
+        self.close = close
+
+    def peek(self, spec, close, volume):
+        indicator = self.indicators[spec]
+        return indicator.peek(volume if indicator.source == "volume" else close)
+
+    def value(self, spec):
+        return self.indicators[spec].value()
+
+    def percent_change(self, close):
+        """
+        Percent change of ``close`` versus the previous bar's close.
+        """
+        if not self.close:
+            return None
+        return (close - self.close) / self.close * 100
+
+    def retain(self, specs):
+        """
+        Drop indicators no alert reads any more.
+        """
+        for spec in set(self.indicators) - set(specs):
+            del self.indicators[spec]
+
+
+def alert_specs(alert_type, window, slow_window):
+    """
+    Specs of the indicators an alert of ``alert_type`` reads.
+    """
+    if alert_type == "sma_crossover":
+        return [f"sma:{window}", f"sma:{slow_window}"]
+    if alert_type == "ema_crossover":
+        return [f"ema:{window}", f"ema:{slow_window}"]
+    if alert_type == "rsi":
+        return [f"rsi:{window}"]
+    if alert_type == "volume_spike":
+        return [f"volume_z:{window}"]
+    return []
+
+
+def indicator_condition_met(
+    alert_type, condition, threshold, specs, indicators, close, volume
+):
+    """
+    Whether an indicator alert's condition holds on the open bar. Crossovers
+    hold when the fast average crossed the slow one since the last completed
+    bar; "below" bounds on percent change and volume z-score are negative.
+    """
+    sign = {"above": 1, "below": -1}.get(condition)
+    if sign is None:
+        return False
+    if alert_type in CROSSOVER_ALERT_TYPES:
+        before = [indicators.value(spec) for spec in specs]
+        after = [indicators.peek(spec, close, volume) for spec in specs]
+        if None in before or None in after:
+            return False
+        return sign * (before[0] - before[1]) <= 0 < sign * (after[0] - after[1])
+
+    if alert_type == "percent_change":
+        value = indicators.percent_change(close)
+    else:
+        value = indicators.peek(specs[0], close, volume)
+    if value is None:
+        return False
+    if alert_type == "rsi":
+        return sign * (value - threshold) > 0
+    return sign * value > threshold
@@ -0,0 +1,52 @@
+import heapq
+import itertools
+
+
+class DeadlineScheduler:
+    """
+    Min-heap of deadlines keyed by alert id.
+
+    Rescheduling or cancelling a key only updates ``deadlines``; the stale
+    heap entry is skipped when it reaches the top, so every operation is
+    O(log n).
+    """
+
+    def __init__(self):
+        self.heap = []
+        self.deadlines = {}
+        self.counter = itertools.count()
+
+    def __len__(self):
+        return len(self.deadlines)
+
+    def __contains__(self, key):
+        return key in self.deadlines
+
+    def schedule(self, key, deadline):
+        self.deadlines[key] = deadline
+        heapq.heappush(self.heap, (deadline, next(self.counter), key))
+
+    def cancel(self, key):
+        self.deadlines.pop(key, None)
+
+    def _discard_stale(self):
+        while self.heap:
+            deadline, _, key = self.heap[0]
+            if self.deadlines.get(key) == deadline:
+                return
+            heapq.heappop(self.heap)
+
+    def next_deadline(self):
+        self._discard_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now):
+        """
+        Remove and return the keys whose deadline is at or before ``now``.
+        """
+        due = []
+        while (deadline := self.next_deadline()) is not None and deadline <= now:
+            _, _, key = heapq.heappop(self.heap)
+            del self.deadlines[key]
+            due.append(key)
+        return due
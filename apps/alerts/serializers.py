@@ -1,9 +1,59 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import Alert, AlertTrigger, AlertCheck
+from MarketPulse.fieldsets import SparseFieldsetSerializerMixin
+from .models import (
+    Alert,
+    AlertTrigger,
+    AlertCheck,
+    WebhookDeadLetter,
+    WebhookEndpoint,
+)
+from .rolling import CROSSOVER_ALERT_TYPES, INDICATOR_ALERT_TYPES
+from .webhooks import check_url
 from apps.stocks.serializers import StockSerializer
 
 
-class AlertSerializer(serializers.ModelSerializer):
+def validate_indicator_rule(attrs):
+    """
+    Checks shared by the alert serializers for indicator alert types.
+    Crossovers compare two averages and need no threshold.
+    """
+    alert_type = attrs.get("alert_type")
+    if alert_type not in INDICATOR_ALERT_TYPES:
+        return
+    if attrs.get("condition") not in ("above", "below"):
+        raise serializers.ValidationError(
+            "Indicator alerts must use the above or below condition"
+        )
+    window = attrs.get("window", 14)
+    if window < 2:
+        raise serializers.ValidationError("Indicator alerts must have window >= 2")
+    if alert_type in CROSSOVER_ALERT_TYPES:
+        if attrs.get("slow_window", 0) <= window:
+            raise serializers.ValidationError(
+                "Crossover alerts must have slow_window > window"
+            )
+        attrs.setdefault("threshold_price", Decimal("0"))
+    elif alert_type == "rsi" and attrs.get("threshold_price", 0) >= 100:
+        raise serializers.ValidationError("RSI thresholds must be below 100")
+
+
+class IndicatorRuleMixin:
+    """
+    Crossover alerts compare two averages, so they take no threshold.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        data = getattr(self, "initial_data", None)
+        if hasattr(data, "get") and data.get("alert_type") in CROSSOVER_ALERT_TYPES:
+            self.fields["threshold_price"].required = False
+
+
+class AlertSerializer(
+    IndicatorRuleMixin, SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for alert creation and management.
     """
@@ -22,13 +72,17 @@ class AlertSerializer(serializers.ModelSerializer):
             "condition",
             "threshold_price",
             "duration_hours",
+            "window",
+            "slow_window",
+            "cooldown_minutes",
             "notification_method",
             "is_active",
+            "last_triggered_at",
             "description",
             "created_at",
             "updated_at",
         ]
-        read_only_fields = ["user", "created_at", "updated_at"]
+        read_only_fields = ["user", "last_triggered_at", "created_at", "updated_at"]
 
     def validate(self, attrs):
         # Validate duration_hours for duration alerts
@@ -39,15 +93,21 @@ class AlertSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Duration alerts must have duration_hours > 0"
             )
+        validate_indicator_rule(attrs)
 
         # Validate threshold_price
-        if attrs.get("threshold_price", 0) <= 0:
+        if (
+            attrs.get("alert_type") not in CROSSOVER_ALERT_TYPES
+            and attrs.get("threshold_price", 0) <= 0
+        ):
             raise serializers.ValidationError("Threshold price must be greater than 0")
 
         return attrs
 
 
-class AlertTriggerSerializer(serializers.ModelSerializer):
+class AlertTriggerSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for alert trigger history.
     """
@@ -92,14 +152,18 @@ class AlertCheckSerializer(serializers.ModelSerializer):
         read_only_fields = ["checked_at"]
 
 
-class AlertSummarySerializer(serializers.ModelSerializer):
+class AlertSummarySerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for alert summary with trigger count.
     """
 
     stock_details = StockSerializer(source="stock", read_only=True)
     trigger_count = serializers.SerializerMethodField()
-    last_triggered = serializers.SerializerMethodField()
+    last_triggered = serializers.DateTimeField(
+        source="last_triggered_at", read_only=True
+    )
 
     class Meta:
         model = Alert
@@ -111,6 +175,9 @@ class AlertSummarySerializer(serializers.ModelSerializer):
             "condition",
             "threshold_price",
             "duration_hours",
+            "window",
+            "slow_window",
+            "cooldown_minutes",
             "notification_method",
             "is_active",
             "trigger_count",
@@ -119,14 +186,12 @@ class AlertSummarySerializer(serializers.ModelSerializer):
         ]
 
     def get_trigger_count(self, obj):
+        if hasattr(obj, "trigger_count"):
+            return obj.trigger_count
         return obj.triggers.count()
 
-    def get_last_triggered(self, obj):
-        last_trigger = obj.triggers.first()
-        return last_trigger.triggered_at if last_trigger else None
-
 
-class CreateAlertSerializer(serializers.ModelSerializer):
+class CreateAlertSerializer(IndicatorRuleMixin, serializers.ModelSerializer):
     """
     Serializer for creating new alerts.
     """
@@ -139,6 +204,9 @@ class CreateAlertSerializer(serializers.ModelSerializer):
             "condition",
             "threshold_price",
             "duration_hours",
+            "window",
+            "slow_window",
+            "cooldown_minutes",
             "notification_method",
         ]
 
@@ -151,9 +219,13 @@ class CreateAlertSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Duration alerts must have duration_hours > 0"
             )
+        validate_indicator_rule(attrs)
 
         # Validate threshold_price
-        if attrs.get("threshold_price", 0) <= 0:
+        if (
+            attrs.get("alert_type") not in CROSSOVER_ALERT_TYPES
+            and attrs.get("threshold_price", 0) <= 0
+        ):
             raise serializers.ValidationError("Threshold price must be greater than 0")
 
         return attrs
@@ -161,3 +233,74 @@ class CreateAlertSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         validated_data["user"] = self.context["request"].user
         return super().create(validated_data)
+
+
+class BacktestSerializer(CreateAlertSerializer):
+    """
+    An alert rule to replay over stored history, optionally limited to
+    ``[start, end]``; never saved.
+    """
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+
+    class Meta(CreateAlertSerializer.Meta):
+        fields = CreateAlertSerializer.Meta.fields + ["start", "end"]
+
+    def validate(self, attrs):
+        attrs = super().validate(attrs)
+        if attrs.get("start") and attrs.get("end") and attrs["start"] > attrs["end"]:
+            raise serializers.ValidationError("start must not be after end")
+        return attrs
+
+
+class WebhookEndpointSerializer(serializers.ModelSerializer):
+    """
+    Serializer for a user's webhook endpoints. The URL must be safe to POST
+    to from inside the cluster (see ``webhooks.check_url``).
+    """
+
+    class Meta:
+        model = WebhookEndpoint
+        fields = ["id", "url", "is_active", "created_at"]
+        read_only_fields = ["created_at"]
+
+    def validate_url(self, value):
+        try:
+            check_url(value)
+        except ValueError as e:
+            raise serializers.ValidationError(str(e))
+        return value
+
+
+class CreateWebhookEndpointSerializer(WebhookEndpointSerializer):
+    """
+    Serializer for registering a webhook endpoint; the signing secret is
+    generated by the server and only shown in this response.
+    """
+
+    class Meta(WebhookEndpointSerializer.Meta):
+        fields = WebhookEndpointSerializer.Meta.fields + ["secret"]
+        read_only_fields = ["secret", "created_at"]
+
+
+class WebhookDeadLetterSerializer(serializers.ModelSerializer):
+    """
+    Serializer for webhook deliveries that exhausted their retries.
+    """
+
+    url = serializers.URLField(source="endpoint.url", read_only=True)
+
+    class Meta:
+        model = WebhookDeadLetter
+        fields = [
+            "id",
+            "endpoint",
+            "url",
+            "trigger",
+            "payload",
+            "status_code",
+            "error",
+            "attempts",
+            "created_at",
+        ]
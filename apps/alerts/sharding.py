@@ -0,0 +1,77 @@
+"""
+Consistent-hash sharding of alert evaluation by ``stock_id``.
+
+Each member (an alert worker, or a numbered batch shard) is placed on a hash
+ring at ``ALERT_RING_REPLICAS`` virtual points; a stock belongs to the first
+point at or after its own hash. All of a stock's alerts, its last price,
+duration states and cooldowns therefore live on one member, which needs no
+locking with the others. When a member joins or leaves only the stocks next
+to its points move, about 1/N of them.
+
+Alert workers find each other through a Redis sorted set of heartbeats:
+members that have not beaten within ``ALERT_WORKER_TTL_SECONDS`` drop out,
+and every worker rebuilds the same ring from the same member list.
+"""
+
+import hashlib
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+
+from MarketPulse.redis_client import get_redis
+
+WORKERS_KEY = "alerts:workers"
+
+
+def ring_hash(value):
+    digest = hashlib.blake2b(str(value).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class HashRing:
+    def __init__(self, members, replicas=None):
+        replicas = replicas or settings.ALERT_RING_REPLICAS
+        self.members = sorted(members)
+        points = sorted(
+            (ring_hash(f"{member}#{replica}"), member)
+            for member in self.members
+            for replica in range(replicas)
+        )
+        self.hashes = [point for point, _ in points]
+        self.owners = [member for _, member in points]
+
+    def owner(self, key):
+        if not self.owners:
+            return None
+        position = bisect_left(self.hashes, ring_hash(key)) % len(self.hashes)
+        return self.owners[position]
+
+
+def batch_shard_ring(shards):
+    return HashRing([f"shard-{shard}" for shard in range(shards)])
+
+
+class Membership:
+    """
+    One worker's entry in the shared set of live alert workers.
+    """
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+
+    def heartbeat(self, now=None):
+        """
+        Refresh this worker's entry and return the sorted live members.
+        """
+        now = now or time.time()
+        pipe = get_redis().pipeline()
+        pipe.zadd(WORKERS_KEY, {self.worker_id: now})
+        pipe.zremrangebyscore(
+            WORKERS_KEY, "-inf", now - settings.ALERT_WORKER_TTL_SECONDS
+        )
+        pipe.zrange(WORKERS_KEY, 0, -1)
+        return sorted(pipe.execute()[-1])
+
+    def leave(self):
+        get_redis().zrem(WORKERS_KEY, self.worker_id)
@@ -0,0 +1,22 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from MarketPulse.realtime import publish
+from .index import ALERT_CHANGES_CHANNEL, alert_change
+from .models import Alert
+
+
+@receiver(post_save, sender=Alert)
+def publish_alert_saved(sender, instance, **kwargs):
+    """
+    Keep evaluation workers' alert indexes current on create/update/toggle.
+    """
+    change = alert_change(instance)
+    transaction.on_commit(lambda: publish(ALERT_CHANGES_CHANNEL, change))
+
+
+@receiver(post_delete, sender=Alert)
+def publish_alert_deleted(sender, instance, **kwargs):
+    change = alert_change(instance, deleted=True)
+    transaction.on_commit(lambda: publish(ALERT_CHANGES_CHANNEL, change))
@@ -0,0 +1,152 @@
+import json
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import JsonResponse
+
+from MarketPulse.realtime import (
+    event_stream_response,
+    publish,
+    serve_websocket,
+    sse_events,
+    stream_error,
+    websocket_params,
+)
+from apps.accounts.authentication import authenticate_stream, authenticate_websocket
+from .models import AlertTrigger
+
+
+def trigger_channel(user_id):
+    return f"triggers:user:{user_id}"
+
+
+def trigger_payload(trigger):
+    alert = trigger.alert
+    return {
+        "id": trigger.id,
+        "alert": alert.id,
+        "symbol": alert.stock.symbol,
+        "alert_type": alert.alert_type,
+        "condition": alert.condition,
+        "threshold_price": alert.threshold_price,
+        "triggered_price": trigger.triggered_price,
+        "triggered_at": trigger.triggered_at,
+    }
+
+
+def publish_trigger(trigger):
+    """
+    Push a new trigger to the owner's channel once the row is committed, so a
+    client replaying from its id is guaranteed to find it.
+    """
+    user_id = trigger.alert.user_id
+    payload = trigger_payload(trigger)
+    transaction.on_commit(lambda: publish(trigger_channel(user_id), payload))
+
+
+def trigger_event_id(data):
+    return json.loads(data)["id"]
+
+
+def parse_event_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def missed_triggers(user_id, last_event_id):
+    """
+    Build the replay coroutine returning triggers created after
+    ``last_event_id``, oldest first.
+
+    At most ``STREAM_REPLAY_LIMIT`` triggers are replayed: the newest ones,
+    so the replay runs straight into the live stream. When older ones are
+    left out, the replay starts with a ``reset`` event giving how many were
+    skipped; the client should refetch its trigger history.
+    """
+
+    async def replay():
+        if last_event_id is None:
+            return []
+        limit = settings.STREAM_REPLAY_LIMIT
+        missed = AlertTrigger.objects.filter(
+            alert__user_id=user_id, id__gt=last_event_id
+        )
+        newest = missed.select_related("alert__stock").order_by("-id")[: limit + 1]
+        triggers = [trigger async for trigger in newest]
+        events = [
+            (trigger.id, json.dumps(trigger_payload(trigger), cls=DjangoJSONEncoder))
+            for trigger in reversed(triggers[:limit])
+        ]
+        if len(triggers) > limit:
+            reset = {
+                "type": "reset",
+                "last_event_id": last_event_id,
+                "skipped": await missed.acount() - limit,
+                "resume_from": events[0][0] if events else None,
+            }
+            events.insert(0, (None, json.dumps(reset), "reset"))
+        return events
+
+    return replay
+
+
+async def trigger_stream(request):
+    """
+    Server-Sent Events stream of the authenticated user's alert triggers.
+
+    Reconnecting clients send ``Last-Event-ID`` (or ``?last_event_id=``) and
+    first receive the triggers they missed, after a ``reset`` event if there
+    were too many to replay (see ``missed_triggers``).
+    """
+    user_id = await authenticate_stream(request)
+    if user_id is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    error = stream_error(request)
+    if error is not None:
+        return error
+
+    last_event_id = parse_event_id(
+        request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    )
+    return event_stream_response(
+        sse_events(
+            [trigger_channel(user_id)],
+            "trigger",
+            replay=missed_triggers(user_id, last_event_id),
+            event_id=trigger_event_id,
+        )
+    )
+
+
+async def trigger_websocket(scope, receive, send):
+    """
+    Raw ASGI WebSocket handler pushing the user's triggers as JSON frames.
+
+    Query string: ``ticket`` (from ``POST /api/v1/stream/ticket/``) or
+    ``token`` (access token), and optional ``last_event_id`` to replay
+    missed triggers. A replay with a gap starts
+    with a ``{"type": "reset", ...}`` frame.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    params = websocket_params(scope)
+    user_id = await authenticate_websocket(params)
+    if user_id is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    last_event_id = parse_event_id(params.get("last_event_id"))
+    await serve_websocket(
+        receive,
+        send,
+        [trigger_channel(user_id)],
+        replay=missed_triggers(user_id, last_event_id),
+        event_id=trigger_event_id,
+    )
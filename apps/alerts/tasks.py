@@ -1,76 +1,102 @@
 import logging
 from django.conf import settings
 from django.utils import timezone
-from django.core.mail import send_mail
 from celery import shared_task
+from MarketPulse.pipeline import defer_when_busy, single_flight
+from .evaluator import evaluate_alerts
 from .models import Alert, AlertTrigger, AlertCheck
+from .sharding import batch_shard_ring
+from .notifications import (
+    deliver_console,
+    deliver_email,
+    dispatch_batch,
+    enqueue_notifications,
+)
+from .streaming import publish_trigger
 
 logger = logging.getLogger(__name__)
 
 
 @shared_task
+@single_flight("process_alerts", settings.PERIODIC_TASK_LEASE_SECONDS, coalesce=True)
 def process_alerts():
     """
-    Process all active alerts and check if conditions are met.
-    """
-    active_alerts = Alert.objects.filter(is_active=True)
+    Evaluate all active alerts in one batch and notify new triggers, or fan
+    out one task per shard when ``ALERT_EVALUATION_SHARDS`` is above 1. Runs
+    requested while a batch is in progress collapse into one follow-up run.
 
-    for alert in active_alerts:
-        try:
-            if alert.alert_type == "threshold":
-                process_threshold_alert.delay(alert.id)
-            elif alert.alert_type == "duration":
-                process_duration_alert.delay(alert.id)
-        except Exception as e:
-            logger.error(f"Error processing alert {alert.id}: {e}")
+    Duration alerts are left to the alert worker's deadline scheduler when
+    ``ALERT_DURATION_SCHEDULER`` is on, and threshold alerts to its quote
+    index when ``ALERT_THRESHOLD_WORKER`` is on.
+    """
+    try:
+        if settings.ALERT_EVALUATION_SHARDS > 1:
+            for shard, stock_ids in shard_stock_ids().items():
+                process_alert_shard.delay(shard, stock_ids)
+            return
+        notify_triggers(evaluate_alerts(alerts_to_evaluate()))
+    except Exception as e:
+        logger.error(f"Error processing alerts: {e}")
 
 
 @shared_task
-def process_threshold_alert(alert_id):
+@single_flight(
+    "process_alerts:{0}", settings.PERIODIC_TASK_LEASE_SECONDS, coalesce=True
+)
+def process_alert_shard(shard, stock_ids=None):
     """
-    Process a threshold alert.
+    Evaluate the alerts of the stocks that hash to ``shard`` on a ring of
+    ``ALERT_EVALUATION_SHARDS`` batch shards. ``process_alerts`` partitions
+    the stocks once and passes each shard its ``stock_ids``.
     """
     try:
-        alert = Alert.objects.get(id=alert_id, is_active=True)
-        latest_price = alert.stock.prices.first()
-
-        if not latest_price:
-            logger.warning(f"No price data available for {alert.stock.symbol}")
-            return
-
-        current_price = latest_price.close_price
-        condition_met = False
+        if stock_ids is None:
+            stock_ids = shard_stock_ids().get(shard, [])
+        alerts = alerts_to_evaluate().filter(stock_id__in=stock_ids)
+        notify_triggers(evaluate_alerts(alerts, stock_ids=stock_ids))
+    except Exception as e:
+        logger.error(f"Error processing alert shard {shard}: {e}")
 
-        # Check if condition is met
-        if alert.condition == "above":
-            condition_met = current_price > alert.threshold_price
-        elif alert.condition == "below":
-            condition_met = current_price < alert.threshold_price
-        elif alert.condition == "equals":
-            condition_met = current_price == alert.threshold_price
 
-        if condition_met:
-            # Check if we already triggered this alert recently (within 1 hour)
-            recent_trigger = AlertTrigger.objects.filter(
-                alert=alert,
-                triggered_at__gte=timezone.now() - timezone.timedelta(hours=1),
-            ).first()
+def shard_stock_ids():
+    """
+    Map each batch shard number to the ids of the stocks with alerts to
+    evaluate that it owns; shards owning none are left out.
+    """
+    ring_size = settings.ALERT_EVALUATION_SHARDS
+    ring = batch_shard_ring(ring_size)
+    stock_ids = (
+        alerts_to_evaluate()
+        .filter(is_active=True)
+        .order_by("stock_id")
+        .values_list("stock_id", flat=True)
+        .distinct()
+    )
+    numbers = {f"shard-{shard}": shard for shard in range(ring_size)}
+    shards = {}
+    for stock_id in stock_ids:
+        shards.setdefault(numbers[ring.owner(stock_id)], []).append(stock_id)
+    return shards
 
-            if not recent_trigger:
-                # Create trigger record
-                trigger = AlertTrigger.objects.create(
-                    alert=alert, triggered_price=current_price
-                )
 
-                # Send notification
-                send_alert_notification.delay(trigger.id)
+def alerts_to_evaluate():
+    alerts = Alert.objects.all()
+    if settings.ALERT_DURATION_SCHEDULER:
+        alerts = alerts.exclude(alert_type="duration")
+    if settings.ALERT_THRESHOLD_WORKER:
+        alerts = alerts.exclude(alert_type="threshold")
+    return alerts
 
-                logger.info(
-                    f"Threshold alert triggered for {alert.stock.symbol} at ${current_price}"
-                )
 
-    except Alert.DoesNotExist:
-        logger.warning(f"Alert {alert_id} not found or inactive")
+@shared_task
+def process_threshold_alert(alert_id):
+    """
+    Process a threshold alert.
+    """
+    try:
+        notify_triggers(
+            evaluate_alerts(Alert.objects.filter(id=alert_id, alert_type="threshold"))
+        )
     except Exception as e:
         logger.error(f"Error processing threshold alert {alert_id}: {e}")
 
@@ -81,115 +107,51 @@ def process_duration_alert(alert_id):
     Process a duration alert.
     """
     try:
-        alert = Alert.objects.get(id=alert_id, is_active=True)
-        latest_price = alert.stock.prices.first()
-
-        if not latest_price:
-            logger.warning(f"No price data available for {alert.stock.symbol}")
-            return
-
-        current_price = latest_price.close_price
-        condition_met = False
-
-        # Check if condition is met
-        if alert.condition == "above":
-            condition_met = current_price > alert.threshold_price
-        elif alert.condition == "below":
-            condition_met = current_price < alert.threshold_price
-        elif alert.condition == "equals":
-            condition_met = current_price == alert.threshold_price
-
-        # Record the check
-        check = AlertCheck.objects.create(
-            alert=alert, current_price=current_price, condition_met=condition_met
+        notify_triggers(
+            evaluate_alerts(Alert.objects.filter(id=alert_id, alert_type="duration"))
         )
+    except Exception as e:
+        logger.error(f"Error processing duration alert {alert_id}: {e}")
 
-        if condition_met:
-            # Check if this is the start of a new condition period
-            previous_check = (
-                AlertCheck.objects.filter(alert=alert, condition_met=True)
-                .exclude(id=check.id)
-                .order_by("-checked_at")
-                .first()
-            )
-
-            if not previous_check or not check.duration_start:
-                # Start tracking duration
-                check.duration_start = timezone.now()
-                check.save()
-
-            # Check if duration requirement is met
-            if check.duration_start:
-                duration_elapsed = timezone.now() - check.duration_start
-                required_duration = timezone.timedelta(hours=alert.duration_hours)
-
-                if duration_elapsed >= required_duration:
-                    # Check if we already triggered this alert recently (within 1 hour)
-                    recent_trigger = AlertTrigger.objects.filter(
-                        alert=alert,
-                        triggered_at__gte=timezone.now() - timezone.timedelta(hours=1),
-                    ).first()
-
-                    if not recent_trigger:
-                        # Create trigger record
-                        trigger = AlertTrigger.objects.create(
-                            alert=alert, triggered_price=current_price
-                        )
 
-                        # Send notification
-                        send_alert_notification.delay(trigger.id)
+def notify_triggers(trigger_ids):
+    """
+    Stream new triggers and queue their notifications in the outbox.
+    """
+    triggers = AlertTrigger.objects.filter(id__in=trigger_ids).select_related(
+        "alert__stock"
+    )
+    for trigger in triggers:
+        publish_trigger(trigger)
+        logger.info(
+            f"{trigger.alert.alert_type.capitalize()} alert triggered for "
+            f"{trigger.alert.stock.symbol} at ${trigger.triggered_price}"
+        )
+    if trigger_ids:
+        enqueue_notifications(trigger_ids)
+        dispatch_notifications.delay()
 
-                        logger.info(
-                            f"Duration alert triggered for {alert.stock.symbol} at ${current_price}"
-                        )
-        else:
-            # Reset duration tracking if condition is not met
-            if check.duration_start:
-                check.duration_start = None
-                check.save()
 
-    except Alert.DoesNotExist:
-        logger.warning(f"Alert {alert_id} not found or inactive")
+@shared_task
+def dispatch_notifications():
+    """
+    Drain due notification outbox entries batch by batch. Any number of
+    these can run at once; each claims its own batches.
+    """
+    try:
+        while dispatch_batch() == settings.NOTIFICATION_BATCH_SIZE:
+            pass
     except Exception as e:
-        logger.error(f"Error processing duration alert {alert_id}: {e}")
+        logger.error(f"Error dispatching notifications: {e}")
 
 
 @shared_task
 def send_alert_notification(trigger_id):
     """
-    Send notification for an alert trigger.
+    Queue the notification for an alert trigger in the outbox.
     """
-    try:
-        # Use select_for_update to lock the row during this transaction
-        from django.db import transaction
-        
-        with transaction.atomic():
-            # Lock the row to prevent concurrent access
-            trigger = AlertTrigger.objects.select_for_update().get(id=trigger_id)
-            alert = trigger.alert
-            
-            # Check if notification has already been sent
-            if trigger.notification_sent:
-                logger.info(f"Notification for trigger {trigger_id} already sent, skipping")
-                return
-                
-            # Mark notification as being processed immediately to prevent duplicate processing
-            trigger.notification_sent = True
-            trigger.notification_sent_at = timezone.now()
-            trigger.save()
-        
-        # Now that we've marked it as sent, process the notification
-        if alert.notification_method == "email":
-            # Call directly instead of using delay to ensure sequential processing
-            send_email_notification(trigger_id)
-        elif alert.notification_method == "console":
-            # Call directly instead of using delay to ensure sequential processing
-            send_console_notification(trigger_id)
-
-    except AlertTrigger.DoesNotExist:
-        logger.warning(f"Alert trigger {trigger_id} not found")
-    except Exception as e:
-        logger.error(f"Error sending notification for trigger {trigger_id}: {e}")
+    enqueue_notifications([trigger_id])
+    dispatch_notifications.delay()
 
 
 @shared_task
@@ -198,51 +160,11 @@ def send_email_notification(trigger_id):
     Send email notification for an alert trigger.
     """
     try:
-        trigger = AlertTrigger.objects.get(id=trigger_id)
-        alert = trigger.alert
-        user = alert.user
-
-        if not settings.EMAIL_HOST_USER:
-            logger.error("Email configuration not set up")
-            return
-
-        subject = f"Stock Alert: {alert.stock.symbol} {alert.condition} ${alert.threshold_price}"
-
-        context = {
-            "user": user,
-            "alert": alert,
-            "trigger": trigger,
-            "stock": alert.stock,
-        }
-
-        # Simple text email
-        message = f"""
-        Hello {user.first_name or user.username},
-        
-        Your stock alert has been triggered!
-        
-        Stock: {alert.stock.symbol} ({alert.stock.name})
-        Current Price: ${trigger.triggered_price}
-        Triggered At: {trigger.triggered_at}
-        
-        Best regards,
-        Stock Alert System
-        """
-
-        try:
-            send_mail(
-                subject=subject,
-                message=message,
-                from_email=settings.EMAIL_HOST_USER,
-                recipient_list=[user.email],
-                fail_silently=False,
-            )
-            logger.info(f"Email notification sent for alert {alert.id}")
-        except Exception as e:
-            logger.error(f"Failed to send email notification: {e}")
-            trigger.error_message = str(e)
-            trigger.save()
-
+        trigger = AlertTrigger.objects.select_related(
+            "alert__stock", "alert__user"
+        ).get(id=trigger_id)
+        deliver_email(trigger)
+        logger.info(f"Email notification sent for alert {trigger.alert_id}")
     except AlertTrigger.DoesNotExist:
         logger.warning(f"Alert trigger {trigger_id} not found")
     except Exception as e:
@@ -255,22 +177,11 @@ def send_console_notification(trigger_id):
     Send console notification for an alert trigger.
     """
     try:
-        trigger = AlertTrigger.objects.get(id=trigger_id)
-        alert = trigger.alert
-        user = alert.user
-
-        message = f"""
-        ===== STOCK ALERT TRIGGERED =====
-        User: {user.email}
-        Stock: {alert.stock.symbol} ({alert.stock.name})
-        Current Price: ${trigger.triggered_price}
-        Triggered At: {trigger.triggered_at}
-        =================================
-        """
-
-        print(message)
-        logger.info(f"Console notification sent for alert {alert.id}")
-
+        trigger = AlertTrigger.objects.select_related(
+            "alert__stock", "alert__user"
+        ).get(id=trigger_id)
+        deliver_console(trigger)
+        logger.info(f"Console notification sent for alert {trigger.alert_id}")
     except AlertTrigger.DoesNotExist:
         logger.warning(f"Alert trigger {trigger_id} not found")
     except Exception as e:
@@ -280,10 +191,14 @@ def send_console_notification(trigger_id):
 
 
 @shared_task
+@single_flight("cleanup_old_alert_data", settings.PERIODIC_TASK_LEASE_SECONDS)
 def cleanup_old_alert_data():
     """
     Clean up old alert triggers and checks to prevent database bloat.
     """
+    if defer_when_busy(cleanup_old_alert_data):
+        return
+
     from datetime import timedelta
 
     # Keep triggers for 90 days
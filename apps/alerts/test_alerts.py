@@ -1,12 +1,65 @@
+import asyncio
+import json
+
+import fakeredis
+import httpx
+import numpy as np
 import pytest
+from asgiref.sync import async_to_sync
+from celery import current_app
+from django.test import RequestFactory
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
-from apps.alerts.models import Alert, AlertTrigger
-from apps.stocks.models import Stock
+from django.core import mail
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from apps.alerts.backtest import backtest, backtest_many
+from apps.alerts.evaluator import (
+    PriceSnapshot,
+    active_alert_rows,
+    condition_groups,
+    evaluate_alerts,
+    evaluate_chunk,
+    evaluate_indicator_alerts,
+    fire_alerts,
+    save_triggers,
+)
+from apps.alerts.index import AlertIndex, SortedThresholds, alert_change
+from apps.alerts.rolling import StockIndicators, make_indicator
+from apps.alerts.scheduler import DeadlineScheduler
+from apps.alerts import sharding
+from apps.alerts.sharding import HashRing, Membership
+from apps.alerts.tasks import process_alert_shard, process_alerts, shard_stock_ids
+from apps.alerts.worker import QUOTE_GROUP, AlertWorker
+from apps.alerts.models import (
+    Alert,
+    AlertCheck,
+    AlertState,
+    AlertTrigger,
+    IndicatorState,
+    NotificationOutbox,
+    WebhookDeadLetter,
+    WebhookEndpoint,
+)
+from apps.alerts import notifications, webhooks
+from apps.alerts import worker as worker_module
+from apps.alerts.notifications import claim_batch, dispatch_batch, enqueue_notifications
+from apps.alerts.streaming import (
+    missed_triggers,
+    trigger_event_id,
+    trigger_stream,
+    trigger_websocket,
+)
+from MarketPulse import celery_app
+from MarketPulse.pipeline import trigger_latencies
+from MarketPulse.realtime import Subscription, format_event, stream_messages
+from apps.stocks import streaming as stock_streaming
+from apps.stocks.models import Stock, StockPrice
+from apps.stocks.streaming import publish_quote, quote_partition, quote_stream_key
 
 
 User = get_user_model()
@@ -344,3 +397,1313 @@ def test_retrieve_alert_trigger_unauthenticated(api_client: APIClient, alert_tri
     response = api_client.get(url)
     
     assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_list_alerts_sparse_fieldset(authenticated_client: APIClient, alert: Alert, alert_trigger: AlertTrigger):
+    url = reverse("alerts:alert-list")
+    alert.last_triggered_at = alert_trigger.triggered_at
+    alert.save()
+
+    response = authenticated_client.get(url, {"fields": "id,trigger_count,last_triggered"})
+
+    assert response.status_code == status.HTTP_200_OK
+    result = response.data['results'][0]
+    assert set(result) == {"id", "trigger_count", "last_triggered"}
+    assert result["trigger_count"] == 1
+    assert result["last_triggered"] is not None
+
+
+def test_list_alert_triggers_exclude_nested_fields(authenticated_client: APIClient, alert_trigger: AlertTrigger):
+    url = reverse("alerts:trigger-list")
+
+    response = authenticated_client.get(
+        url, {"fields": "id,alert_details", "exclude": "alert_details.stock_details"}
+    )
+
+    assert response.status_code == status.HTTP_200_OK
+    result = response.data['results'][0]
+    assert set(result) == {"id", "alert_details"}
+    assert "stock_details" not in result["alert_details"]
+    assert result["alert_details"]["condition"] == alert_trigger.alert.condition
+
+
+def test_trigger_stream_unauthenticated(api_client: APIClient):
+    url = reverse("alerts:trigger-stream")
+
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missed_triggers_replay_after_last_event_id(alert: Alert):
+    first = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    second = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("152.00"))
+
+    replayed = async_to_sync(missed_triggers(alert.user_id, first.id))()
+
+    assert [event_id for event_id, _ in replayed] == [second.id]
+    assert json.loads(replayed[0][1])["symbol"] == alert.stock.symbol
+    assert async_to_sync(missed_triggers(alert.user_id, None))() == []
+
+
+@pytest.mark.django_db(transaction=True)
+def test_missed_triggers_announce_a_gap_past_the_replay_limit(alert: Alert, settings):
+    settings.STREAM_REPLAY_LIMIT = 2
+    first, *missed = [
+        AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+        for _ in range(5)
+    ]
+
+    replayed = async_to_sync(missed_triggers(alert.user_id, first.id))()
+
+    # The newest triggers are replayed, after a reset event for the rest
+    reset_id, reset, event = replayed[0]
+    assert reset_id is None and event == "reset"
+    assert json.loads(reset) == {
+        "type": "reset",
+        "last_event_id": first.id,
+        "skipped": 2,
+        "resume_from": missed[2].id,
+    }
+    assert [event_id for event_id, _ in replayed[1:]] == [missed[2].id, missed[3].id]
+
+
+def test_stream_messages_skips_live_events_already_replayed():
+    subscription = Subscription(["triggers:user:1"], maxsize=10)
+    for event_id in (2, 3):
+        subscription.put("triggers:user:1", json.dumps({"id": event_id}))
+
+    async def replay():
+        return [(1, "one"), (2, "two")]
+
+    async def collect():
+        messages = stream_messages(subscription, replay, trigger_event_id, timeout=0.01)
+        return [await anext(messages) for _ in range(4)]
+
+    assert asyncio.run(collect()) == [(1, "one"), (2, "two"), (3, '{"id": 3}'), None]
+
+
+def test_stream_messages_delivers_live_events_committed_out_of_order():
+    subscription = Subscription(["triggers:user:1"], maxsize=10)
+    for event_id in (3, 2, 4):
+        subscription.put("triggers:user:1", json.dumps({"id": event_id}))
+
+    async def replay():
+        return [(1, "one"), (3, "three")]
+
+    async def collect():
+        messages = stream_messages(subscription, replay, trigger_event_id, timeout=0.01)
+        return [await anext(messages) for _ in range(5)]
+
+    assert asyncio.run(collect()) == [
+        (1, "one"),
+        (3, "three"),
+        (2, '{"id": 2}'),
+        (4, '{"id": 4}'),
+        None,
+    ]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_trigger_streams_reject_deactivated_users(user: User):
+    token = str(RefreshToken.for_user(user).access_token)
+    request = RequestFactory().get(
+        reverse("alerts:trigger-stream"), headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert async_to_sync(trigger_stream)(request).status_code == 501
+
+    user.is_active = False
+    user.save()
+    sent = []
+
+    async def receive():
+        return {"type": "websocket.connect"}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "websocket", "query_string": f"token={token}".encode()}
+
+    assert async_to_sync(trigger_stream)(request).status_code == 401
+    async_to_sync(trigger_websocket)(scope, receive, send)
+    assert sent == [{"type": "websocket.close", "code": 4401}]
+
+
+def test_stream_messages_passes_replayed_event_names_through():
+    subscription = Subscription(["triggers:user:1"], maxsize=10)
+    subscription.put("triggers:user:1", json.dumps({"id": 2}))
+
+    async def replay():
+        return [(None, "{}", "reset"), (2, "two")]
+
+    async def collect():
+        messages = stream_messages(subscription, replay, trigger_event_id, timeout=0.01)
+        return [await anext(messages) for _ in range(3)]
+
+    assert asyncio.run(collect()) == [(None, "{}", "reset"), (2, "two"), None]
+    assert format_event("reset", "{}") == "event: reset\ndata: {}\n\n"
+
+
+def add_price(stock: Stock, close_price: str) -> StockPrice:
+    price = Decimal(close_price)
+    return StockPrice.objects.create(
+        stock=stock,
+        price=price,
+        volume=1000,
+        high=price,
+        low=price,
+        open_price=price,
+        close_price=price,
+        timestamp=timezone.now(),
+    )
+
+
+def test_evaluate_alerts_triggers_met_threshold_alerts(user: User, stock: Stock, alert: Alert):
+    add_price(stock, "149.00")
+    add_price(stock, "151.25")
+    below = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="threshold",
+        condition="below",
+        threshold_price=Decimal("150.00"),
+    )
+    equals = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="threshold",
+        condition="equals",
+        threshold_price=Decimal("151.25"),
+    )
+
+    trigger_ids = evaluate_alerts()
+
+    triggers = AlertTrigger.objects.filter(id__in=trigger_ids)
+    assert {trigger.alert_id for trigger in triggers} == {alert.id, equals.id}
+    assert not below.triggers.exists()
+    assert {trigger.triggered_price for trigger in triggers} == {Decimal("151.25")}
+
+
+def test_evaluate_alerts_respects_cooldown(stock: Stock, alert: Alert):
+    add_price(stock, "160.00")
+    start = timezone.now()
+
+    assert len(evaluate_alerts(now=start)) == 1
+    alert.refresh_from_db()
+    assert alert.last_triggered_at == start
+
+    assert evaluate_alerts(now=start + timezone.timedelta(minutes=59)) == []
+    assert len(evaluate_alerts(now=start + timezone.timedelta(minutes=61))) == 1
+
+
+def test_worker_and_batch_racing_for_an_alert_fire_it_once(stock: Stock, alert: Alert):
+    add_price(stock, "160.00")
+    now = timezone.now()
+    # The batch read the alert before the worker fired it
+    chunk = next(active_alert_rows())
+    triggers, _, _ = evaluate_chunk(chunk, PriceSnapshot.load(), now)
+    assert len(triggers) == 1
+
+    assert len(fire_alerts([alert.id], Decimal("160.00"), now)) == 1
+    assert save_triggers(triggers, now + timezone.timedelta(seconds=1)) == []
+    assert fire_alerts([alert.id], Decimal("160.00"), now) == []
+    assert alert.triggers.count() == 1
+
+
+def test_evaluate_alerts_uses_per_alert_cooldown(stock: Stock, alert: Alert):
+    add_price(stock, "160.00")
+    start = timezone.now()
+    alert.cooldown_minutes = 5
+    alert.last_triggered_at = start
+    alert.save()
+
+    assert evaluate_alerts(now=start + timezone.timedelta(minutes=4)) == []
+    assert len(evaluate_alerts(now=start + timezone.timedelta(minutes=6))) == 1
+
+
+def test_create_alert_with_cooldown(authenticated_client: APIClient, stock: Stock):
+    url = reverse("alerts:alert-list")
+    payload = {
+        "stock": stock.id,
+        "alert_type": "threshold",
+        "condition": "above",
+        "threshold_price": "150.00",
+        "cooldown_minutes": 15,
+    }
+
+    response = authenticated_client.post(url, payload, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    alert = Alert.objects.get()
+    assert alert.cooldown_minutes == 15
+    detail = authenticated_client.get(
+        reverse("alerts:alert-detail", kwargs={"pk": alert.id})
+    )
+    assert detail.data["cooldown_minutes"] == 15
+    assert detail.data["last_triggered_at"] is None
+
+
+def test_evaluate_alerts_skips_inactive_alerts_and_stocks_without_prices(stock: Stock, alert: Alert):
+    assert evaluate_alerts() == []
+
+    add_price(stock, "160.00")
+    alert.is_active = False
+    alert.save()
+    assert evaluate_alerts() == []
+
+
+def test_evaluate_alerts_duration_carries_start_forward(user: User, stock: Stock):
+    add_price(stock, "160.00")
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="duration",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+        duration_hours=1,
+    )
+    start = timezone.now()
+
+    assert evaluate_alerts(now=start) == []
+    assert evaluate_alerts(now=start + timezone.timedelta(minutes=30)) == []
+    assert len(evaluate_alerts(now=start + timezone.timedelta(hours=1))) == 1
+
+    check = AlertCheck.objects.get(alert=alert)
+    assert check.condition_met and check.duration_start == start
+    alert.state.refresh_from_db()
+    assert alert.state.condition_since == start
+    # The state is only written when the condition flips
+    assert alert.state.evaluated_at == start
+
+
+def test_evaluate_alerts_duration_resets_when_condition_breaks(user: User, stock: Stock):
+    add_price(stock, "160.00")
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="duration",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+        duration_hours=1,
+    )
+    start = timezone.now()
+    evaluate_alerts(now=start)
+    add_price(stock, "140.00")
+    evaluate_alerts(now=start + timezone.timedelta(minutes=30))
+    add_price(stock, "160.00")
+
+    assert evaluate_alerts(now=start + timezone.timedelta(hours=1)) == []
+    transitions = AlertCheck.objects.filter(alert=alert).order_by("id")
+    assert [check.condition_met for check in transitions] == [True, False, True]
+    assert transitions.last().duration_start == start + timezone.timedelta(hours=1)
+
+
+def test_alert_index_matches_only_crossed_thresholds():
+    index = AlertIndex()
+    index.add(1, "AAPL", "above", Decimal("150.00"))
+    index.add(2, "AAPL", "above", Decimal("160.00"))
+    index.add(3, "AAPL", "below", Decimal("140.00"))
+    index.add(4, "AAPL", "equals", Decimal("145.50"))
+    index.last_prices["AAPL"] = 14500
+
+    assert sorted(index.match("AAPL", Decimal("155.00"))) == [1]
+    assert index.match("AAPL", Decimal("158.00")) == []
+    assert sorted(index.match("AAPL", Decimal("145.50"))) == [4]
+    assert sorted(index.match("AAPL", Decimal("139.99"))) == [3]
+    assert sorted(index.match("AAPL", Decimal("170.00"))) == [1, 2]
+    assert index.match("MSFT", Decimal("170.00")) == []
+
+
+def test_alert_index_applies_changes(alert: Alert):
+    index = AlertIndex.hydrate()
+    assert len(index) == 1
+
+    alert.threshold_price = Decimal("200.00")
+    index.apply(json.loads(json.dumps(alert_change(alert), cls=DjangoJSONEncoder)))
+    index.last_prices["AAPL"] = 15000
+    assert index.match("AAPL", Decimal("190.00")) == []
+    assert index.match("AAPL", Decimal("201.00")) == [alert.id]
+
+    alert.is_active = False
+    index.apply(alert_change(alert))
+    assert len(index) == 0 and not index.symbols
+
+    alert.is_active = True
+    index.apply(alert_change(alert))
+    index.apply(alert_change(alert, deleted=True))
+    assert len(index) == 0
+
+
+def test_alert_worker_fires_crossed_alerts_once(stock: Stock, alert: Alert, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    add_price(stock, "149.00")
+    worker = AlertWorker()
+    worker.load()
+
+    trigger_ids = worker.handle_quote({"symbol": "AAPL", "price": "151.00"})
+
+    assert list(alert.triggers.values_list("id", flat=True)) == trigger_ids
+    assert worker.handle_quote({"symbol": "AAPL", "price": "149.00"}) == []
+    assert worker.handle_quote({"symbol": "AAPL", "price": "151.00"}) == []
+
+
+def test_alert_worker_fires_threshold_alerts_already_met(user: User, stock: Stock, alert: Alert, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    add_price(stock, "160.00")
+    worker = AlertWorker()
+    worker.load()
+
+    # Loaded while met: no quote will cross it
+    assert alert.triggers.count() == 1
+    assert worker.handle_quote({"symbol": "AAPL", "price": "161.00"}) == []
+
+    created = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="threshold",
+        condition="above",
+        threshold_price=Decimal("120.00"),
+    )
+    worker.handle_change(alert_change(created))
+
+    assert created.triggers.count() == 1
+    assert worker.handle_quote({"symbol": "AAPL", "price": "162.00"}) == []
+    assert created.triggers.count() == 1
+
+
+def test_evaluate_alerts_writes_checks_only_on_transitions(user: User, stock: Stock):
+    add_price(stock, "140.00")
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="duration",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+        duration_hours=2,
+    )
+    start = timezone.now()
+    for minute in range(5):
+        evaluate_alerts(now=start + timezone.timedelta(minutes=minute))
+
+    assert not AlertCheck.objects.filter(alert=alert).exists()
+    assert not AlertState.objects.filter(alert=alert).exists()
+
+    add_price(stock, "160.00")
+    evaluate_alerts(now=start + timezone.timedelta(minutes=5))
+    for minute in range(6, 10):
+        evaluate_alerts(now=start + timezone.timedelta(minutes=minute))
+
+    state = AlertState.objects.get(alert=alert)
+    assert state.condition_met
+    assert state.condition_since == start + timezone.timedelta(minutes=5)
+    assert state.evaluated_at == start + timezone.timedelta(minutes=5)
+    assert state.last_price == Decimal("160.00")
+
+
+def test_deadline_scheduler_pops_due_keys_in_order():
+    scheduler = DeadlineScheduler()
+    scheduler.schedule("b", 20)
+    scheduler.schedule("a", 10)
+    scheduler.schedule("c", 30)
+    scheduler.schedule("b", 5)
+    scheduler.cancel("c")
+
+    assert scheduler.next_deadline() == 5
+    assert scheduler.pop_due(15) == ["b", "a"]
+    assert scheduler.pop_due(100) == []
+    assert len(scheduler) == 0
+
+
+def test_alert_worker_fires_duration_alert_at_deadline(user: User, stock: Stock, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    add_price(stock, "140.00")
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="duration",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+        duration_hours=1,
+    )
+    worker = AlertWorker()
+    worker.load()
+    start = timezone.now()
+
+    worker.handle_quote({"symbol": "AAPL", "price": "151.00"}, now=start)
+    assert worker.scheduler.next_deadline() == start + timezone.timedelta(hours=1)
+    assert worker.fire_due(start + timezone.timedelta(minutes=59)) == []
+
+    trigger_ids = worker.fire_due(start + timezone.timedelta(hours=1))
+    assert list(alert.triggers.values_list("id", flat=True)) == trigger_ids
+
+    worker.handle_quote({"symbol": "AAPL", "price": "149.00"})
+    assert alert.id not in worker.scheduler
+    assert [check.condition_met for check in alert.checks.order_by("id")] == [
+        True,
+        False,
+    ]
+    assert not AlertState.objects.get(alert=alert).condition_met
+
+
+def test_alert_worker_reschedules_duration_alerts_from_stored_state(user: User, stock: Stock):
+    add_price(stock, "160.00")
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="duration",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+        duration_hours=2,
+    )
+    since = timezone.now() - timezone.timedelta(hours=1)
+    AlertState.objects.create(alert=alert, condition_met=True, condition_since=since)
+
+    worker = AlertWorker()
+    worker.load()
+
+    assert worker.scheduler.next_deadline() == since + timezone.timedelta(hours=2)
+
+
+def test_enqueue_notifications_is_idempotent(alert_trigger: AlertTrigger):
+    enqueue_notifications([alert_trigger.id])
+    enqueue_notifications([alert_trigger.id])
+
+    assert NotificationOutbox.objects.filter(trigger=alert_trigger).count() == 1
+
+
+def test_claim_batch_leases_entries_with_context(alert: Alert, django_assert_num_queries):
+    triggers = [
+        AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+        for _ in range(3)
+    ]
+    enqueue_notifications([trigger.id for trigger in triggers])
+
+    # Claim select, lease update and context load, plus the savepoint pair
+    with django_assert_num_queries(5):
+        entries = claim_batch(batch_size=2)
+        assert [entry.trigger.alert.user.email for entry in entries] == [
+            "test@example.com"
+        ] * 2
+
+    assert {entry.attempts for entry in entries} == {1}
+    assert len(claim_batch()) == 1
+    assert claim_batch() == []
+
+
+def test_dispatch_batch_sends_and_marks_triggers(alert: Alert, settings):
+    settings.EMAIL_HOST_USER = "alerts@example.com"
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    assert dispatch_batch() == 1
+
+    assert len(mail.outbox) == 1
+    assert mail.outbox[0].to == ["test@example.com"]
+    trigger.refresh_from_db()
+    assert trigger.notification_sent and trigger.notification_sent_at
+    assert NotificationOutbox.objects.get(trigger=trigger).status == "sent"
+    assert dispatch_batch() == 0
+
+
+def test_dispatch_batch_retries_with_backoff_then_fails(alert: Alert, settings):
+    settings.EMAIL_HOST_USER = ""
+    settings.NOTIFICATION_MAX_ATTEMPTS = 2
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    dispatch_batch()
+    entry = NotificationOutbox.objects.get(trigger=trigger)
+    assert entry.status == "pending" and entry.attempts == 1
+    assert entry.available_at > timezone.now()
+    assert dispatch_batch() == 0
+
+    dispatch_batch(now=entry.available_at)
+    entry.refresh_from_db()
+    trigger.refresh_from_db()
+    assert entry.status == "failed" and entry.attempts == 2
+    assert trigger.error_message == "Email configuration not set up"
+    assert not trigger.notification_sent
+
+
+def test_dispatch_batch_reuses_one_smtp_connection(user: User, alert: Alert, settings, monkeypatch):
+    settings.EMAIL_HOST_USER = "alerts@example.com"
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    connections = []
+
+    def get_connection(*args, **kwargs):
+        connections.append(mail.get_connection(*args, **kwargs))
+        return connections[-1]
+
+    monkeypatch.setattr(notifications, "get_connection", get_connection)
+    triggers = [
+        AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+        for _ in range(3)
+    ]
+    enqueue_notifications([trigger.id for trigger in triggers])
+
+    assert dispatch_batch() == 3
+
+    assert len(connections) == 1
+    assert len(mail.outbox) == 3
+
+
+def test_dispatch_batch_merges_digest_window(user: User, alert: Alert, settings):
+    settings.EMAIL_HOST_USER = "alerts@example.com"
+    settings.EMAIL_BACKEND = "django.core.mail.backends.locmem.EmailBackend"
+    user.alert_digest_minutes = 5
+    user.save()
+    now = timezone.now()
+    triggers = [
+        AlertTrigger.objects.create(alert=alert, triggered_price=Decimal(price))
+        for price in ("151.00", "152.00")
+    ]
+    enqueue_notifications([trigger.id for trigger in triggers], now=now)
+
+    assert dispatch_batch(now=now) == 0
+    window_end = NotificationOutbox.objects.values_list("available_at", flat=True)
+    assert set(window_end) == {notifications.digest_window_end(now, 5)}
+
+    assert dispatch_batch(now=notifications.digest_window_end(now, 5)) == 2
+    assert len(mail.outbox) == 1
+    assert "2 alerts triggered (AAPL)" in mail.outbox[0].subject
+    assert "$152.00" in mail.outbox[0].body
+
+
+@pytest.fixture
+def webhook_receiver(monkeypatch):
+    """
+    Route webhook requests to an in-process receiver; ``responses`` lists
+    the status codes to answer with, the last one repeating.
+    """
+    received = []
+    responses = [200]
+
+    def handler(request):
+        received.append(request)
+        return httpx.Response(responses[min(len(received), len(responses)) - 1])
+
+    make_client = webhooks.make_client
+    monkeypatch.setattr(
+        webhooks, "make_client", lambda: make_client(httpx.MockTransport(handler))
+    )
+    return received, responses
+
+
+@pytest.fixture(autouse=True)
+def webhook_dns(monkeypatch):
+    """
+    Resolve webhook hosts from ``hosts`` instead of DNS.
+    """
+    hosts = {"hooks.example.com": ["93.184.216.34"]}
+
+    def resolve(host, port):
+        if host not in hosts:
+            raise ValueError(f"Cannot resolve {host}")
+        return hosts[host]
+
+    monkeypatch.setattr(webhooks, "resolve", resolve)
+    return hosts
+
+
+def test_create_webhook_endpoint_generates_secret(authenticated_client: APIClient, user: User):
+    url = reverse("alerts:webhook-list")
+    payload = {"url": "https://hooks.example.com/alerts"}
+
+    response = authenticated_client.post(url, payload, format="json")
+
+    assert response.status_code == status.HTTP_201_CREATED
+    assert len(response.data["secret"]) == 64
+    assert WebhookEndpoint.objects.get(user=user).url == payload["url"]
+
+    # The secret is only shown once
+    response = authenticated_client.get(url)
+    assert "secret" not in response.data["results"][0]
+    detail = reverse("alerts:webhook-detail", kwargs={"pk": response.data["results"][0]["id"]})
+    assert "secret" not in authenticated_client.get(detail).data
+
+
+def test_create_webhook_endpoint_rejects_internal_urls(authenticated_client: APIClient, webhook_dns, settings):
+    url = reverse("alerts:webhook-list")
+    webhook_dns.update(
+        {
+            "internal.example.com": ["10.0.0.5"],
+            "mixed.example.com": ["93.184.216.34", "127.0.0.1"],
+            "redis.internal": ["172.18.0.3"],
+        }
+    )
+
+    for target in (
+        "http://hooks.example.com/alerts",
+        "https://127.0.0.1/alerts",
+        "https://169.254.169.254/latest/meta-data",
+        "https://[::1]/alerts",
+        "https://internal.example.com/alerts",
+        "https://mixed.example.com/alerts",
+        "https://redis.internal/alerts",
+        "https://unknown.example.com/alerts",
+    ):
+        response = authenticated_client.post(url, {"url": target}, format="json")
+        assert response.status_code == status.HTTP_400_BAD_REQUEST, target
+    assert not WebhookEndpoint.objects.exists()
+
+    settings.WEBHOOK_ALLOWED_HOSTS = ["redis.internal"]
+    response = authenticated_client.post(url, {"url": "http://redis.internal/alerts"}, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+def test_dispatch_batch_pins_webhooks_and_blocks_rebinding(user: User, alert: Alert, webhook_receiver, webhook_dns):
+    received, _ = webhook_receiver
+    alert.notification_method = "webhook"
+    alert.save()
+    WebhookEndpoint.objects.create(user=user, url="https://hooks.example.com/a")
+    first, second = (
+        AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+        for _ in range(2)
+    )
+    enqueue_notifications([first.id])
+    dispatch_batch()
+
+    assert received[0].url.host == "93.184.216.34"
+    assert received[0].headers["Host"] == "hooks.example.com"
+    assert received[0].extensions["sni_hostname"] == "hooks.example.com"
+
+    # The record now points into the cluster
+    webhook_dns["hooks.example.com"] = ["10.0.0.5"]
+    enqueue_notifications([second.id])
+    dispatch_batch()
+
+    assert len(received) == 1
+    dead_letter = WebhookDeadLetter.objects.get(trigger=second)
+    assert dead_letter.error.startswith("Blocked:")
+    assert dead_letter.attempts == 0
+
+
+def test_dispatch_batch_posts_signed_webhooks(user: User, alert: Alert, webhook_receiver):
+    received, _ = webhook_receiver
+    alert.notification_method = "webhook"
+    alert.save()
+    endpoint = WebhookEndpoint.objects.create(user=user, url="https://hooks.example.com/a")
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    assert dispatch_batch() == 1
+
+    request = received[0]
+    assert json.loads(request.content)["trigger"]["symbol"] == "AAPL"
+    assert webhooks.verify_signature(
+        endpoint.secret, request.headers[webhooks.SIGNATURE_HEADER], request.content
+    )
+    assert not webhooks.verify_signature(
+        "wrong", request.headers[webhooks.SIGNATURE_HEADER], request.content
+    )
+    trigger.refresh_from_db()
+    assert trigger.notification_sent
+
+
+def test_dispatch_batch_retries_webhooks_then_dead_letters(user: User, alert: Alert, webhook_receiver, settings):
+    settings.WEBHOOK_RETRY_BASE_SECONDS = 0
+    received, responses = webhook_receiver
+    responses[:] = [503]
+    alert.notification_method = "webhook"
+    alert.save()
+    WebhookEndpoint.objects.create(user=user, url="https://hooks.example.com/a")
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    dispatch_batch()
+
+    assert len(received) == settings.WEBHOOK_MAX_ATTEMPTS
+    dead_letter = WebhookDeadLetter.objects.get(trigger=trigger)
+    assert dead_letter.status_code == 503
+    assert dead_letter.attempts == settings.WEBHOOK_MAX_ATTEMPTS
+    assert dead_letter.payload["trigger"]["id"] == trigger.id
+
+
+def test_dispatch_batch_does_not_retry_webhook_client_errors(user: User, alert: Alert, webhook_receiver, settings):
+    settings.WEBHOOK_RETRY_BASE_SECONDS = 0
+    received, responses = webhook_receiver
+    responses[:] = [503, 404]
+    alert.notification_method = "webhook"
+    alert.save()
+    WebhookEndpoint.objects.create(user=user, url="https://hooks.example.com/a")
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    dispatch_batch()
+
+    assert len(received) == 2
+    assert WebhookDeadLetter.objects.get(trigger=trigger).error == "HTTP 404"
+
+
+def test_dispatch_batch_fails_webhooks_without_endpoint(alert: Alert, webhook_receiver):
+    alert.notification_method = "webhook"
+    alert.save()
+    trigger = AlertTrigger.objects.create(alert=alert, triggered_price=Decimal("151.00"))
+    enqueue_notifications([trigger.id])
+
+    dispatch_batch()
+
+    entry = NotificationOutbox.objects.get(trigger=trigger)
+    assert entry.status == "pending"
+    assert entry.last_error == "No active webhook endpoint"
+
+
+@pytest.mark.parametrize(
+    "task, queue",
+    [
+        ("apps.stocks.tasks.fetch_single_stock_data", "ingest"),
+        ("apps.alerts.tasks.process_alerts", "alerts"),
+        ("apps.alerts.tasks.dispatch_notifications", "notify"),
+        ("apps.alerts.tasks.send_alert_notification", "notify"),
+        ("apps.alerts.tasks.cleanup_old_alert_data", "maintenance"),
+    ],
+)
+def test_tasks_are_routed_to_their_workload_queue(task: str, queue: str):
+    assert celery_app.amqp.router.route({}, task)["queue"].name == queue
+
+
+def test_alert_worker_evaluates_only_newest_quote_of_a_backlog(stock: Stock, alert: Alert, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    add_price(stock, "140.00")
+    worker = AlertWorker()
+    worker.load()
+    handled = []
+    monkeypatch.setattr(worker, "handle_quote", handled.append)
+
+    worker.handle_entries(
+        [
+            (f"{number}-0", {"symbol": "AAPL", "price": price})
+            for number, price in enumerate(("151.00", "149.00", "152.00"))
+        ]
+    )
+
+    assert handled == [{"symbol": "AAPL", "price": "152.00"}]
+
+
+def test_hash_ring_moves_only_the_new_members_share():
+    ring = HashRing(["a", "b", "c", "d"])
+    owners = {key: ring.owner(key) for key in range(10000)}
+    counts = {member: list(owners.values()).count(member) for member in "abcd"}
+    assert all(1500 < count < 3500 for count in counts.values())
+
+    grown = HashRing(["a", "b", "c", "d", "e"])
+    moved = [key for key in owners if grown.owner(key) != owners[key]]
+    assert all(grown.owner(key) == "e" for key in moved)
+    assert 1000 < len(moved) < 3000
+
+
+def test_default_quote_partitions_give_every_worker_a_share(settings):
+    workers = [f"alert-worker-{n}:1" for n in range(32)]
+    ring = HashRing(workers)
+    owners = [ring.owner(partition) for partition in range(settings.QUOTE_STREAM_PARTITIONS)]
+    average = settings.QUOTE_STREAM_PARTITIONS / len(workers)
+
+    assert set(owners) == set(workers)
+    assert max(owners.count(worker) for worker in workers) <= 2 * average
+
+
+def test_membership_drops_workers_that_stop_beating(monkeypatch, settings):
+    settings.ALERT_WORKER_TTL_SECONDS = 15
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(sharding, "get_redis", lambda: client)
+
+    assert Membership("a").heartbeat(now=100) == ["a"]
+    assert Membership("b").heartbeat(now=110) == ["a", "b"]
+    assert Membership("b").heartbeat(now=120) == ["b"]
+    Membership("b").leave()
+    assert client.zcard(sharding.WORKERS_KEY) == 0
+
+
+def test_sharded_alert_workers_split_alerts_by_stock(user: User, stock: Stock, alert: Alert, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    other_stock = Stock.objects.create(symbol="MSFT", name="Microsoft", type="Technology")
+    other = Alert.objects.create(
+        user=user,
+        stock=other_stock,
+        alert_type="threshold",
+        condition="above",
+        threshold_price=Decimal("150.00"),
+    )
+    # Pick member names that put the two stocks' partitions on different workers
+    members = ["worker-a", "worker-b"]
+    ring = HashRing(members)
+    while ring.owner(quote_partition(stock.id)) == ring.owner(
+        quote_partition(other_stock.id)
+    ):
+        members = [f"{member}x" for member in members]
+        ring = HashRing(members)
+    aapl_worker = AlertWorker(ring.owner(quote_partition(stock.id)))
+    aapl_worker.rebalance(ring.members)
+    msft_worker = AlertWorker(ring.owner(quote_partition(other_stock.id)))
+    msft_worker.rebalance(ring.members)
+
+    assert set(aapl_worker.index.alerts) == {alert.id}
+    assert set(msft_worker.index.alerts) == {other.id}
+    assert msft_worker.handle_quote({"symbol": "AAPL", "price": "151.00"}) == []
+    assert aapl_worker.handle_quote({"symbol": "AAPL", "price": "151.00"})
+
+
+def test_process_alerts_leaves_threshold_alerts_to_the_worker(stock: Stock, alert: Alert, settings):
+    settings.ALERT_EVALUATION_SHARDS = 1
+    add_price(stock, "160.00")
+
+    process_alerts()
+    assert not alert.triggers.exists()
+
+    settings.ALERT_THRESHOLD_WORKER = False
+    process_alerts()
+    assert alert.triggers.count() == 1
+
+
+def test_process_alert_shards_split_evaluation(user: User, stock: Stock, alert: Alert, monkeypatch, settings):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    settings.ALERT_EVALUATION_SHARDS = 2
+    settings.ALERT_THRESHOLD_WORKER = False
+    for symbol in ("MSFT", "GOOGL", "AMZN"):
+        other_stock = Stock.objects.create(symbol=symbol, name=symbol, type="Technology")
+        Alert.objects.create(
+            user=user,
+            stock=other_stock,
+            alert_type="threshold",
+            condition="above",
+            threshold_price=Decimal("150.00"),
+        )
+        add_price(other_stock, "151.00")
+    add_price(stock, "151.00")
+
+    shards = shard_stock_ids()
+    loaded = []
+    load = PriceSnapshot.load.__func__
+
+    def recording_load(cls, stock_ids=None):
+        loaded.append(stock_ids)
+        return load(cls, stock_ids)
+
+    monkeypatch.setattr(PriceSnapshot, "load", classmethod(recording_load))
+    process_alert_shard(0, shards.get(0, []))
+    first = set(AlertTrigger.objects.values_list("alert__stock_id", flat=True))
+    process_alert_shard(1, shards.get(1, []))
+    both = set(AlertTrigger.objects.values_list("alert__stock_id", flat=True))
+
+    ring = sharding.batch_shard_ring(2)
+    assert first == set(shards.get(0, [])) == {
+        stock_id for stock_id in both if ring.owner(stock_id) == "shard-0"
+    }
+    assert both == set(Stock.objects.values_list("id", flat=True))
+    # Each shard only reads the prices of its own stocks
+    assert loaded == [shards.get(0, []), shards.get(1, [])]
+
+
+@pytest.fixture
+def quote_streams(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(stock_streaming, "get_redis", lambda: client)
+    monkeypatch.setattr("MarketPulse.realtime.get_redis", lambda: client)
+    monkeypatch.setattr("MarketPulse.pipeline.get_redis", lambda: client)
+    return client
+
+
+def test_alert_worker_consumes_and_acknowledges_quote_stream(stock: Stock, alert: Alert, quote_streams, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    add_price(stock, "149.00")
+    worker = AlertWorker("worker-a")
+    worker.load()
+    worker.ensure_groups(quote_streams)
+
+    publish_quote(stock, add_price(stock, "151.00"))
+    stream = quote_stream_key(quote_partition(stock.id))
+    for name, entries in worker.read_quotes(quote_streams, 0):
+        worker.consume(quote_streams, name, entries)
+
+    assert alert.triggers.count() == 1
+    assert quote_streams.xpending(stream, QUOTE_GROUP)["pending"] == 0
+    assert worker.latency.percentiles()["count"] == 1
+    worker.report_latency()
+    assert "worker-a" in trigger_latencies()
+
+
+def test_alert_worker_recovers_entries_of_a_dead_consumer(stock: Stock, alert: Alert, quote_streams, monkeypatch, settings):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    settings.QUOTE_STREAM_CLAIM_IDLE_SECONDS = 0
+    add_price(stock, "149.00")
+    worker = AlertWorker("worker-b")
+    worker.load()
+    dead = AlertWorker("worker-dead")
+    dead.ensure_groups(quote_streams)
+    publish_quote(stock, add_price(stock, "151.00"))
+    # Read but never acknowledged, as if the worker crashed mid-batch
+    assert dead.read_quotes(quote_streams, 0)
+
+    worker.recover(quote_streams)
+
+    stream = quote_stream_key(quote_partition(stock.id))
+    assert alert.triggers.count() == 1
+    assert quote_streams.xpending(stream, QUOTE_GROUP)["pending"] == 0
+
+
+def test_alert_worker_refires_a_quote_that_failed_midway(stock: Stock, alert: Alert, quote_streams, monkeypatch, settings):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    settings.QUOTE_STREAM_CLAIM_IDLE_SECONDS = 0
+    add_price(stock, "149.00")
+    worker = AlertWorker("worker-a")
+    worker.load()
+    worker.ensure_groups(quote_streams)
+    failures = [RuntimeError("database unavailable")]
+
+    def flaky_fire_alerts(*args):
+        if failures:
+            raise failures.pop()
+        return fire_alerts(*args)
+
+    monkeypatch.setattr(worker_module, "fire_alerts", flaky_fire_alerts)
+    publish_quote(stock, add_price(stock, "151.00"))
+    stream = quote_stream_key(quote_partition(stock.id))
+    for name, entries in worker.read_quotes(quote_streams, 0):
+        with pytest.raises(RuntimeError):
+            worker.consume(quote_streams, name, entries)
+    assert not alert.triggers.exists()
+
+    worker.recover(quote_streams)
+
+    assert alert.triggers.count() == 1
+    assert quote_streams.xpending(stream, QUOTE_GROUP)["pending"] == 0
+
+
+def test_alert_worker_reconnects_after_losing_redis(stock: Stock, alert: Alert, quote_streams, monkeypatch):
+    monkeypatch.setattr(sharding, "get_redis", lambda: quote_streams)
+    monkeypatch.setattr(worker_module.redis.Redis, "from_url", lambda *args, **kwargs: quote_streams)
+    sleeps = []
+    monkeypatch.setattr(worker_module.time, "sleep", sleeps.append)
+    worker = AlertWorker("worker-a")
+    connects = []
+    connect = worker.connect
+
+    def counting_connect(*args):
+        connects.append(args)
+        return connect(*args)
+
+    outages = [worker_module.redis.ConnectionError("connection reset")]
+
+    def read_quotes(client, timeout):
+        if outages:
+            raise outages.pop()
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(worker, "connect", counting_connect)
+    monkeypatch.setattr(worker, "read_quotes", read_quotes)
+
+    with pytest.raises(KeyboardInterrupt):
+        worker.run()
+
+    assert len(connects) == 2
+    assert sleeps == [worker_module.RECONNECT_SECONDS]
+    assert quote_streams.zcard(sharding.WORKERS_KEY) == 0
+
+
+def test_alert_worker_reloads_changes_lost_while_disconnected(user: User, stock: Stock, alert: Alert, quote_streams, monkeypatch):
+    monkeypatch.setattr(current_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(sharding, "get_redis", lambda: quote_streams)
+    add_price(stock, "160.00")
+    worker = AlertWorker("worker-a")
+    membership = Membership("worker-a")
+    worker.connect(quote_streams, membership).close()
+    assert alert.triggers.count() == 1
+
+    # Published while the worker was reconnecting, so never received
+    alert.delete()
+    created = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="threshold",
+        condition="above",
+        threshold_price=Decimal("120.00"),
+    )
+    worker.connect(quote_streams, membership).close()
+
+    assert set(worker.index.alerts) == {created.id}
+    assert created.triggers.count() == 1
+
+
+def test_condition_groups_number_adjacent_identical_rows():
+    keys = np.array([[1, 0, 150], [1, 0, 150], [1, 0, 160], [2, 0, 150], [2, 0, 150]])
+    firsts, members = condition_groups(keys)
+    assert firsts.tolist() == [0, 2, 3]
+    assert members.tolist() == [0, 0, 1, 2, 2]
+
+
+def test_identical_conditions_fan_out_with_per_alert_cooldowns(user: User, stock: Stock, alert: Alert):
+    others = [
+        Alert.objects.create(
+            user=User.objects.create_user(
+                username=f"user{number}", email=f"user{number}@example.com", password="x"
+            ),
+            stock=stock,
+            alert_type="threshold",
+            condition="above",
+            threshold_price=Decimal("150.00"),
+        )
+        for number in range(3)
+    ]
+    Alert.objects.filter(id=others[0].id).update(last_triggered_at=timezone.now())
+    add_price(stock, "151.00")
+
+    evaluate_alerts()
+
+    fired = set(AlertTrigger.objects.values_list("alert_id", flat=True))
+    assert fired == {alert.id, others[1].id, others[2].id}
+
+
+def test_sorted_thresholds_share_an_entry_per_threshold():
+    thresholds = SortedThresholds()
+    for alert_id in (1, 2, 3):
+        thresholds.add(15000, alert_id)
+    thresholds.add(16000, 4)
+
+    assert thresholds.thresholds == [15000, 16000]
+    assert len(thresholds) == 4
+    assert sorted(thresholds.between(14000, 15500)) == [1, 2, 3]
+    thresholds.remove(15000, 2)
+    thresholds.remove(15000, 2)
+    assert len(thresholds) == 3
+    for alert_id in (1, 3):
+        thresholds.remove(15000, alert_id)
+    assert thresholds.thresholds == [16000]
+
+
+def add_bars(stock: Stock, closes, volumes=None, days_ago=None):
+    """
+    One daily bar per close, the last one today.
+    """
+    volumes = volumes or [1000] * len(closes)
+    days_ago = len(closes) - 1 if days_ago is None else days_ago
+    start = timezone.now() - timezone.timedelta(days=days_ago)
+    return [
+        StockPrice.objects.create(
+            stock=stock,
+            price=Decimal(close),
+            volume=volume,
+            high=Decimal(close),
+            low=Decimal(close),
+            open_price=Decimal(close),
+            close_price=Decimal(close),
+            timestamp=start + timezone.timedelta(days=day),
+        )
+        for day, (close, volume) in enumerate(zip(closes, volumes))
+    ]
+
+
+def test_rolling_indicators_match_full_recomputation():
+    rng = np.random.default_rng(7)
+    closes = 100 + np.cumsum(rng.normal(0, 1, 200))
+    volumes = rng.integers(1000, 5000, 200).astype(float)
+    indicators = StockIndicators(
+        {spec: make_indicator(spec) for spec in ("sma:20", "ema:10", "rsi:14", "volume_z:30")}
+    )
+    for close, volume in zip(closes[:100], volumes[:100]):
+        indicators.push(close, volume)
+    # Resume from a checkpoint halfway through
+    indicators = StockIndicators.load(json.loads(json.dumps(indicators.dump())))
+    for close, volume in zip(closes[100:-1], volumes[100:-1]):
+        indicators.push(close, volume)
+
+    close, volume = closes[-1], volumes[-1]
+    assert indicators.peek("sma:20", close, volume) == pytest.approx(closes[-20:].mean())
+
+    ema = closes[:10].mean()
+    for value in closes[10:]:
+        ema += 2 / 11 * (value - ema)
+    assert indicators.peek("ema:10", close, volume) == pytest.approx(ema)
+
+    changes = np.diff(closes)
+    gain, loss = changes[:14].clip(min=0).mean(), (-changes[:14]).clip(min=0).mean()
+    for change in changes[14:]:
+        gain = (gain * 13 + max(change, 0)) / 14
+        loss = (loss * 13 + max(-change, 0)) / 14
+    assert indicators.peek("rsi:14", close, volume) == pytest.approx(100 - 100 / (1 + gain / loss))
+
+    window = volumes[-31:-1]
+    z_score = (volume - window.mean()) / window.std(ddof=1)
+    assert indicators.peek("volume_z:30", close, volume) == pytest.approx(z_score)
+    assert indicators.close == closes[-2]
+
+
+def test_percent_change_and_rsi_alerts_fire_on_the_open_bar(user: User, stock: Stock):
+    drop = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="percent_change",
+        condition="below",
+        threshold_price=Decimal("5.00"),
+    )
+    oversold = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="rsi",
+        condition="below",
+        threshold_price=Decimal("30.00"),
+        window=3,
+    )
+    Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="rsi",
+        condition="above",
+        threshold_price=Decimal("70.00"),
+        window=3,
+    )
+    add_bars(stock, ["100.00", "101.00", "102.00", "103.00", "104.00", "97.00"])
+
+    trigger_ids = evaluate_alerts()
+
+    fired = AlertTrigger.objects.filter(id__in=trigger_ids)
+    assert set(fired.values_list("alert_id", flat=True)) == {drop.id, oversold.id}
+    assert oversold.rule_text() == "RSI(3) below 30.00"
+    state = IndicatorState.objects.get(stock=stock)
+    assert state.state["close"] == 104.0
+    assert set(state.state["indicators"]) == {"rsi:3"}
+
+
+def test_crossover_alert_fires_once_per_bar_and_resumes_from_checkpoint(user: User, stock: Stock, monkeypatch):
+    alert = Alert.objects.create(
+        user=user,
+        stock=stock,
+        alert_type="sma_crossover",
+        condition="above",
+        threshold_price=Decimal("0"),
+        window=2,
+        slow_window=4,
+        cooldown_minutes=0,
+    )
+    add_bars(stock, ["110.00", "108.00", "106.00", "104.00", "102.00", "100.00", "112.00"], days_ago=7)
+
+    assert evaluate_indicator_alerts()
+    assert evaluate_indicator_alerts() == []
+    checkpoint = IndicatorState.objects.get(stock=stock).bar_timestamp
+
+    # The next evaluations only read bars after the checkpoint
+    monkeypatch.setattr("apps.alerts.evaluator.rebuild_indicators", None)
+    add_bars(stock, ["114.00"], days_ago=0)
+    assert evaluate_indicator_alerts() == []
+    assert IndicatorState.objects.get(stock=stock).bar_timestamp > checkpoint
+    assert alert.triggers.count() == 1
+
+
+def test_create_crossover_alert_without_threshold(authenticated_client: APIClient, stock: Stock):
+    url = reverse("alerts:alert-list")
+    payload = {
+        "stock": stock.id,
+        "alert_type": "ema_crossover",
+        "condition": "above",
+        "window": 12,
+        "slow_window": 26,
+    }
+
+    response = authenticated_client.post(url, payload, format="json")
+    assert response.status_code == status.HTTP_201_CREATED
+    alert = Alert.objects.get()
+    assert alert.rule_text() == "EMA(12) crosses above EMA(26)"
+
+    payload["slow_window"] = 10
+    response = authenticated_client.post(url, payload, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def hourly_history(closes):
+    return {
+        "timestamps": 3600.0 * np.arange(len(closes)),
+        "closes": np.array(closes, dtype=float),
+        "volumes": np.full(len(closes), 1000.0),
+    }
+
+
+def backtest_rule(**fields):
+    rule = {
+        "alert_type": "threshold",
+        "condition": "above",
+        "threshold_price": Decimal("150.00"),
+        "duration_hours": 0,
+        "cooldown_minutes": 0,
+        "window": 14,
+        "slow_window": 0,
+    }
+    rule.update(fields)
+    return rule
+
+
+def test_backtest_duration_rule_uses_runs_and_cooldown():
+    history = hourly_history([149, 151, 151, 151, 149, 151, 151, 151, 151, 151])
+
+    rule = backtest_rule(alert_type="duration", duration_hours=2)
+    assert backtest(rule, history).tolist() == [3, 7, 8, 9]
+
+    rule["cooldown_minutes"] = 60
+    assert backtest(rule, history).tolist() == [3, 7, 9]
+
+
+def test_backtest_matches_bar_by_bar_replay():
+    rng = np.random.default_rng(3)
+    history = hourly_history(150 + np.cumsum(rng.normal(0, 1, 2000)).round(2))
+    rule = backtest_rule(alert_type="duration", duration_hours=3, cooldown_minutes=300)
+
+    expected = []
+    run_start = last_fire = None
+    for index, (moment, close) in enumerate(zip(history["timestamps"], history["closes"])):
+        if close <= 150:
+            run_start = None
+            continue
+        run_start = moment if run_start is None else run_start
+        if moment - run_start >= 3 * 3600 and (last_fire is None or moment - last_fire > 300 * 60):
+            expected.append(index)
+            last_fire = moment
+
+    assert expected
+    assert backtest(rule, history).tolist() == expected
+
+
+def test_backtest_many_matches_sequential_runs():
+    rng = np.random.default_rng(5)
+    rules = [
+        backtest_rule(),
+        backtest_rule(alert_type="duration", duration_hours=2, cooldown_minutes=120),
+        backtest_rule(alert_type="sma_crossover", window=5, slow_window=20),
+        backtest_rule(alert_type="rsi", condition="below", threshold_price=Decimal("30")),
+    ]
+    jobs = [
+        (hourly_history(150 + np.cumsum(rng.normal(0, 1, 500))), rules) for _ in range(3)
+    ]
+
+    pooled = backtest_many(jobs, workers=2)
+
+    for (history, _), fired_lists in zip(jobs, pooled):
+        for rule, fired in zip(rules, fired_lists):
+            assert fired.tolist() == backtest(rule, history).tolist()
+
+
+def test_backtest_alert_endpoint(authenticated_client: APIClient, stock: Stock):
+    add_bars(stock, ["149.00", "151.00", "152.00", "149.00", "153.00"])
+    url = reverse("alerts:alert-backtest")
+    payload = {
+        "stock": stock.id,
+        "alert_type": "threshold",
+        "condition": "above",
+        "threshold_price": "150.00",
+    }
+
+    response = authenticated_client.post(url, payload, format="json")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["bars"] == 5
+    assert response.data["fire_count"] == 3
+    assert [fire["price"] for fire in response.data["fires"]] == [151.0, 152.0, 153.0]
+    assert not Alert.objects.exists()
+
+    payload["start"] = (timezone.now() - timezone.timedelta(hours=36)).isoformat()
+    response = authenticated_client.post(url, payload, format="json")
+    assert response.data["bars"] == 2
+    assert [fire["price"] for fire in response.data["fires"]] == [153.0]
+
+    payload["end"] = (timezone.now() - timezone.timedelta(days=3)).isoformat()
+    response = authenticated_client.post(url, payload, format="json")
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import streaming, views
 
 app_name = "alerts"
 
@@ -16,6 +16,11 @@ urlpatterns = [
         views.AlertStatisticsView.as_view(),
         name="alert-statistics",
     ),
+    path(
+        "alerts/backtest/",
+        views.AlertBacktestView.as_view(),
+        name="alert-backtest",
+    ),
     path("alerts/checks/", views.AlertCheckListView.as_view(), name="alert-check-list"),
     path("triggers/", views.AlertTriggerListView.as_view(), name="trigger-list"),
     path(
@@ -23,4 +28,18 @@ urlpatterns = [
         views.AlertTriggerDetailView.as_view(),
         name="trigger-detail",
     ),
+    path(
+        "webhooks/", views.WebhookEndpointListView.as_view(), name="webhook-list"
+    ),
+    path(
+        "webhooks/<int:pk>/",
+        views.WebhookEndpointDetailView.as_view(),
+        name="webhook-detail",
+    ),
+    path(
+        "webhooks/dead-letters/",
+        views.WebhookDeadLetterListView.as_view(),
+        name="webhook-dead-letters",
+    ),
+    path("stream/triggers/", streaming.trigger_stream, name="trigger-stream"),
 ]
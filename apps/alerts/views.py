@@ -1,19 +1,33 @@
 from rest_framework import generics, permissions
 from rest_framework.views import APIView
 from rest_framework.response import Response
+from django.db.models import Count
 from django.shortcuts import get_object_or_404
-from .models import Alert, AlertTrigger, AlertCheck
+from MarketPulse.fieldsets import SparseFieldsetViewMixin
+from .backtest import backtest_payload, load_history, rule_from_alert
+from .models import (
+    Alert,
+    AlertTrigger,
+    AlertCheck,
+    WebhookDeadLetter,
+    WebhookEndpoint,
+)
+from .rolling import INDICATOR_ALERT_TYPES
 from .serializers import (
     AlertSerializer,
     AlertTriggerSerializer,
     AlertCheckSerializer,
     AlertSummarySerializer,
+    BacktestSerializer,
     CreateAlertSerializer,
+    CreateWebhookEndpointSerializer,
     AlertCheckSerializer,
+    WebhookDeadLetterSerializer,
+    WebhookEndpointSerializer,
 )
 
 
-class AlertListView(generics.ListCreateAPIView):
+class AlertListView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     View to list and create alerts for the authenticated user.
     """
@@ -22,7 +36,16 @@ class AlertListView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Alert.objects.filter(user=self.request.user)
+        queryset = Alert.objects.filter(user=self.request.user)
+        if self.request.method != "GET":
+            return queryset
+
+        if self.wants_field("stock_details"):
+            queryset = queryset.select_related("stock")
+        queryset = self.sparse_queryset(queryset)
+        if self.wants_field("trigger_count"):
+            queryset = queryset.annotate(trigger_count=Count("triggers"))
+        return queryset
 
     def get_serializer_class(self):
         if self.request.method == "POST":
@@ -33,7 +56,9 @@ class AlertListView(generics.ListCreateAPIView):
         serializer.save(user=self.request.user)
 
 
-class AlertDetailView(generics.RetrieveUpdateDestroyAPIView):
+class AlertDetailView(
+    SparseFieldsetViewMixin, generics.RetrieveUpdateDestroyAPIView
+):
     """
     View to retrieve, update, and delete a specific alert.
     """
@@ -42,10 +67,13 @@ class AlertDetailView(generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return Alert.objects.filter(user=self.request.user)
+        queryset = Alert.objects.filter(user=self.request.user)
+        if self.request.method == "GET" and self.wants_field("stock_details"):
+            queryset = queryset.select_related("stock")
+        return self.sparse_queryset(queryset)
 
 
-class AlertTriggerListView(generics.ListAPIView):
+class AlertTriggerListView(SparseFieldsetViewMixin, generics.ListAPIView):
     """
     View to list alert triggers for the authenticated user.
     """
@@ -54,10 +82,13 @@ class AlertTriggerListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return AlertTrigger.objects.filter(alert__user=self.request.user)
+        queryset = AlertTrigger.objects.filter(alert__user=self.request.user)
+        if self.wants_field("alert_details"):
+            queryset = queryset.select_related("alert__stock")
+        return self.sparse_queryset(queryset)
 
 
-class AlertTriggerDetailView(generics.RetrieveAPIView):
+class AlertTriggerDetailView(SparseFieldsetViewMixin, generics.RetrieveAPIView):
     """
     View to retrieve a specific alert trigger.
     """
@@ -66,7 +97,10 @@ class AlertTriggerDetailView(generics.RetrieveAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return AlertTrigger.objects.filter(alert__user=self.request.user)
+        queryset = AlertTrigger.objects.filter(alert__user=self.request.user)
+        if self.wants_field("alert_details"):
+            queryset = queryset.select_related("alert__stock")
+        return self.sparse_queryset(queryset)
 
 
 class AlertCheckListView(generics.ListAPIView):
@@ -81,6 +115,54 @@ class AlertCheckListView(generics.ListAPIView):
         return AlertCheck.objects.filter(alert__user=self.request.user)
 
 
+class WebhookEndpointListView(generics.ListCreateAPIView):
+    """
+    View to list and register webhook endpoints for the authenticated user.
+    """
+
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user).order_by("id")
+
+    def get_serializer_class(self):
+        if self.request.method == "POST":
+            return CreateWebhookEndpointSerializer
+        return WebhookEndpointSerializer
+
+    def perform_create(self, serializer):
+        serializer.save(user=self.request.user)
+
+
+class WebhookEndpointDetailView(generics.RetrieveUpdateDestroyAPIView):
+    """
+    View to retrieve, update, and delete a webhook endpoint.
+    """
+
+    serializer_class = WebhookEndpointSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return WebhookEndpoint.objects.filter(user=self.request.user)
+
+
+class WebhookDeadLetterListView(generics.ListAPIView):
+    """
+    View to list the authenticated user's dead-lettered webhook deliveries.
+    """
+
+    serializer_class = WebhookDeadLetterSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            WebhookDeadLetter.objects.filter(endpoint__user=self.request.user)
+            .select_related("endpoint")
+            .order_by("-created_at")
+        )
+
+
 class ToggleAlertStatusView(APIView):
     """Toggle alert active/inactive status for the authenticated user."""
 
@@ -114,6 +196,9 @@ class AlertStatisticsView(APIView):
         # Get alerts by type
         threshold_alerts = user_alerts.filter(alert_type="threshold").count()
         duration_alerts = user_alerts.filter(alert_type="duration").count()
+        indicator_alerts = user_alerts.filter(
+            alert_type__in=INDICATOR_ALERT_TYPES
+        ).count()
 
         # Get recent triggers (last 7 days)
         from django.utils import timezone
@@ -133,6 +218,29 @@ class AlertStatisticsView(APIView):
                 "alert_types": {
                     "threshold": threshold_alerts,
                     "duration": duration_alerts,
+                    "indicator": indicator_alerts,
                 },
             }
         )
+
+
+class AlertBacktestView(APIView):
+    """Replay an alert rule over a stock's stored price history."""
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BacktestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        fields = dict(serializer.validated_data)
+        start, end = fields.pop("start", None), fields.pop("end", None)
+        # Unsaved, so fields left out take the model defaults
+        alert = Alert(user=request.user, **fields)
+        history = load_history(alert.stock_id, start, end)
+        return Response(
+            {
+                "stock": alert.stock.symbol,
+                "rule": alert.rule_text(),
+                **backtest_payload(rule_from_alert(alert), history),
+            }
+        )
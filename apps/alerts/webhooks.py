@@ -0,0 +1,230 @@
+"""
+Signed webhook requests for the notification outbox's webhook channel.
+
+Each webhook entry is POSTed as JSON to every active endpoint of the alert's
+owner. The body is signed with the endpoint's secret: the
+``X-MarketPulse-Signature`` header carries ``t=<unix time>,v1=<hex>``, where
+``v1`` is the HMAC-SHA256 of ``"<t>.<body>"``. Receivers recompute it and
+reject stale timestamps to stop replays.
+
+A batch is sent concurrently over one pooled ``httpx.AsyncClient``. A
+per-host semaphore caps the requests in flight to any single receiver.
+Timeouts, connection errors, 429s and 5xx responses are retried in process
+with jittered exponential backoff.
+
+Endpoints are user-supplied, so they must not reach into the cluster. A URL
+must be https, and its host must resolve only to public addresses; hosts in
+``WEBHOOK_ALLOWED_HOSTS`` are exempt. This is checked when an endpoint is
+saved and again at send time. The send-time check pins the request to the
+address it resolved (TLS still verifies the hostname), so a DNS record
+changed in between cannot redirect it.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import ipaddress
+import json
+import random
+import socket
+import time
+from collections import defaultdict
+from urllib.parse import urlsplit
+
+import httpx
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .streaming import trigger_payload
+
+SIGNATURE_HEADER = "X-MarketPulse-Signature"
+
+# Client errors worth retrying; any other 4xx is final
+RETRY_STATUSES = {408, 425, 429}
+
+
+def sign(secret, timestamp, body):
+    message = f"{timestamp}.".encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def signature_header(secret, body, timestamp=None):
+    timestamp = timestamp or int(time.time())
+    return f"t={timestamp},v1={sign(secret, timestamp, body)}"
+
+
+def verify_signature(secret, header, body, tolerance=300, now=None):
+    """
+    Check a signature header against ``body``, as a receiver would.
+    """
+    try:
+        parts = dict(part.split("=", 1) for part in header.split(","))
+        timestamp = int(parts["t"])
+    except (KeyError, ValueError):
+        return False
+    now = now or time.time()
+    if abs(now - timestamp) > tolerance:
+        return False
+    return hmac.compare_digest(sign(secret, timestamp, body), parts.get("v1", ""))
+
+
+def webhook_body(trigger):
+    payload = {"event": "alert.triggered", "trigger": trigger_payload(trigger)}
+    return json.dumps(payload, cls=DjangoJSONEncoder).encode()
+
+
+def retry_backoff(attempt):
+    """
+    Full-jitter exponential backoff before retry number ``attempt``.
+    """
+    base = settings.WEBHOOK_RETRY_BASE_SECONDS * 2 ** (attempt - 1)
+    return random.uniform(0, base)
+
+
+def resolve(host, port):
+    """
+    Addresses ``host`` resolves to; raises ValueError when it does not.
+    """
+    try:
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        raise ValueError(f"Cannot resolve {host}")
+    return [info[4][0] for info in infos]
+
+
+def is_public(address):
+    """
+    Whether ``address`` is globally routable, so not loopback, private,
+    link-local, shared, reserved or multicast.
+    """
+    ip = ipaddress.ip_address(address)
+    return ip.is_global and not ip.is_multicast
+
+
+def check_url(url):
+    """
+    Validate a webhook URL; returns ``(host, port, addresses)``, with no
+    addresses for allowlisted hosts. Raises ValueError.
+    """
+    parts = urlsplit(url)
+    host = parts.hostname
+    if not host:
+        raise ValueError("Webhook URLs need a host")
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+    except ValueError:
+        raise ValueError("Invalid port")
+    if host in settings.WEBHOOK_ALLOWED_HOSTS:
+        return host, port, []
+    if parts.scheme != "https":
+        raise ValueError("Webhook URLs must use https")
+    addresses = resolve(host, port)
+    if not addresses or not all(is_public(address) for address in addresses):
+        raise ValueError(f"{host} does not resolve to a public address")
+    return host, port, addresses
+
+
+async def pin_url(url):
+    """
+    Check ``url`` at send time and return ``(url, headers, extensions)`` to
+    request it at the checked address. Raises ValueError.
+    """
+    loop = asyncio.get_running_loop()
+    host, port, addresses = await loop.run_in_executor(None, check_url, url)
+    if not addresses:
+        return url, {}, {}
+    parts = urlsplit(url)
+    address = addresses[0]
+    netloc = f"[{address}]" if ":" in address else address
+    if parts.port:
+        netloc = f"{netloc}:{parts.port}"
+    return (
+        parts._replace(netloc=netloc).geturl(),
+        {"Host": f"{host}:{parts.port}" if parts.port else host},
+        {"sni_hostname": host},
+    )
+
+
+def make_client(transport=None):
+    return httpx.AsyncClient(
+        transport=transport,
+        timeout=httpx.Timeout(settings.WEBHOOK_TIMEOUT_SECONDS),
+        limits=httpx.Limits(
+            max_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.WEBHOOK_MAX_CONNECTIONS,
+        ),
+    )
+
+
+async def post(client, semaphore, target, secret, body, delivery_id):
+    """
+    POST one webhook to a ``pin_url`` target with retries. Returns
+    ``(attempts, status_code, error)``; ``error`` is None once delivered.
+    """
+    url, pinned_headers, extensions = target
+    status_code, error = None, None
+    for attempt in range(1, settings.WEBHOOK_MAX_ATTEMPTS + 1):
+        if attempt > 1:
+            await asyncio.sleep(retry_backoff(attempt - 1))
+        headers = {
+            **pinned_headers,
+            "Content-Type": "application/json",
+            "X-MarketPulse-Event": "alert.triggered",
+            "X-MarketPulse-Delivery": str(delivery_id),
+            SIGNATURE_HEADER: signature_header(secret, body),
+        }
+        async with semaphore:
+            try:
+                response = await client.post(
+                    url, content=body, headers=headers, extensions=extensions
+                )
+            except httpx.HTTPError as e:
+                status_code, error = None, str(e) or type(e).__name__
+                continue
+        status_code = response.status_code
+        if response.is_success:
+            return attempt, status_code, None
+        error = f"HTTP {status_code}"
+        if status_code < 500 and status_code not in RETRY_STATUSES:
+            break
+    return attempt, status_code, error
+
+
+async def blocked(error):
+    return 0, None, f"Blocked: {error}"
+
+
+async def post_all(deliveries, client=None):
+    """
+    Send ``(url, secret, body, delivery_id)`` deliveries concurrently and
+    return their results in order. Each URL is checked and pinned once;
+    blocked ones are never attempted.
+    """
+    urls = list(dict.fromkeys(delivery[0] for delivery in deliveries))
+    targets = dict(
+        zip(
+            urls,
+            await asyncio.gather(
+                *(pin_url(url) for url in urls), return_exceptions=True
+            ),
+        )
+    )
+    semaphores = defaultdict(
+        lambda: asyncio.Semaphore(settings.WEBHOOK_HOST_CONCURRENCY)
+    )
+    async with client or make_client() as client:
+        return await asyncio.gather(
+            *(
+                blocked(targets[url])
+                if isinstance(targets[url], Exception)
+                else post(
+                    client,
+                    semaphores[urlsplit(url).netloc],
+                    targets[url],
+                    secret,
+                    body,
+                    delivery_id,
+                )
+                for url, secret, body, delivery_id in deliveries
+            )
+        )
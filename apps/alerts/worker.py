@@ -0,0 +1,514 @@
+import json
+import logging
+import os
+import socket
+import time
+from collections import defaultdict, deque
+
+import numpy as np
+import redis
+from django.conf import settings
+from django.utils import timezone
+
+from apps.stocks.models import Stock
+from apps.stocks.streaming import quote_partition, quote_stream_key
+from MarketPulse.pipeline import record_latency
+from .evaluator import fire_alerts, from_cents, record_transitions
+from .index import ALERT_CHANGES_CHANNEL, AlertIndex
+from .models import Alert, AlertState
+from .scheduler import DeadlineScheduler
+from .sharding import HashRing, Membership
+from .tasks import notify_triggers
+
+logger = logging.getLogger(__name__)
+
+# Longest wait for a message before checking for due deadlines, in seconds
+MAX_POLL_SECONDS = 1.0
+
+# Most buffered alert changes handled together when the worker falls behind
+MAX_DRAIN_MESSAGES = 1000
+
+# Consumer group shared by every alert worker on each quote stream partition
+QUOTE_GROUP = "alert-workers"
+
+# Seconds between latency reports and between scans for abandoned entries
+REPORT_SECONDS = 60
+
+# First and longest wait before reconnecting after losing Redis, in seconds
+RECONNECT_SECONDS = 1
+MAX_RECONNECT_SECONDS = 30
+
+
+class LatencyTracker:
+    """
+    Tick-to-trigger latencies of the most recent triggering quotes.
+    """
+
+    def __init__(self, size=10000):
+        self.samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentiles(self):
+        if not self.samples:
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(np.array(self.samples) * 1000, [50, 95, 99])
+        return {
+            "count": len(self.samples),
+            "p50_ms": round(float(p50), 2),
+            "p95_ms": round(float(p95), 2),
+            "p99_ms": round(float(p99), 2),
+        }
+
+
+class AlertWorker:
+    """
+    Long-running evaluator matching alerts against each new quote.
+
+    Threshold alerts fire when a quote crosses them, and also when they are
+    loaded, created, re-enabled or edited while already met (the cooldown
+    keeps these from repeating). Duration alerts only
+    record the moments their condition starts or stops holding; the trigger
+    time is then known, so it is kept in a deadline heap and fired at expiry
+    (and again each cooldown while the condition still holds).
+
+    The worker subscribes to alert changes before loading its indexes, so
+    no change made while loading is missed (replayed changes are harmless).
+    Changes arrive over pub/sub, which drops them while disconnected, so the
+    indexes are also reloaded after every reconnect and every
+    ``ALERT_WORKER_RELOAD_SECONDS``.
+
+    Quotes arrive on Redis Streams partitioned by stock id (see
+    ``apps.stocks.streaming``), read through the ``alert-workers`` consumer
+    group. An entry is acknowledged only once handled; entries left pending
+    by a worker that died are claimed after
+    ``QUOTE_STREAM_CLAIM_IDLE_SECONDS`` by the partition's next owner.
+
+    Several workers split the partitions between them on a consistent-hash
+    ring (see ``sharding``); each loads and evaluates only the alerts of the
+    stocks in its partitions, and reloads when a worker joins or leaves.
+    Without a ring the worker owns every partition.
+    """
+
+    def __init__(self, worker_id=None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.ring = None
+        self.stock_ids = {}
+        self.index = None
+        self.durations = None
+        self.duration_hours = {}
+        self.cooldowns = {}
+        self.scheduler = DeadlineScheduler()
+        self.partitions = list(range(settings.QUOTE_STREAM_PARTITIONS))
+        self.latency = LatencyTracker()
+
+    def owns(self, symbol):
+        if self.ring is None:
+            return True
+        stock_id = self.stock_ids.get(symbol)
+        return stock_id is not None and quote_partition(stock_id) in self.partitions
+
+    def owned_stock_ids(self):
+        if self.ring is None:
+            return None
+        return [
+            stock_id
+            for stock_id in self.stock_ids.values()
+            if quote_partition(stock_id) in self.partitions
+        ]
+
+    def rebalance(self, members):
+        """
+        Rebuild the ring from the live members and reload if it changed.
+        """
+        if self.ring is not None and self.ring.members == members:
+            return False
+        self.ring = HashRing(members)
+        self.partitions = [
+            partition
+            for partition in range(settings.QUOTE_STREAM_PARTITIONS)
+            if self.ring.owner(partition) == self.worker_id
+        ]
+        self.load()
+        logger.info(
+            f"Alert worker {self.worker_id} owns {len(self.index)} threshold and "
+            f"{len(self.durations)} duration alerts in {len(self.partitions)} "
+            f"partitions of {len(members)} workers"
+        )
+        return True
+
+    def load(self, now=None):
+        """
+        Rebuild the indexes of the owned stocks from the database. Newly
+        indexed threshold alerts that are already met fire.
+        """
+        indexed = set(self.index.alerts) if self.index is not None else set()
+        self.stock_ids = dict(Stock.objects.values_list("symbol", "id"))
+        owned = self.owned_stock_ids()
+        self.index = AlertIndex.hydrate(stock_ids=owned)
+        self.durations = AlertIndex.hydrate("duration", stock_ids=owned)
+        self.duration_hours = {}
+        self.cooldowns = {}
+        self.scheduler = DeadlineScheduler()
+        active = Alert.objects.filter(is_active=True, alert_type="duration")
+        if owned is not None:
+            active = active.filter(stock_id__in=owned)
+        for alert_id, hours, cooldown in active.values_list(
+            "id", "duration_hours", "cooldown_minutes"
+        ):
+            self.duration_hours[alert_id] = hours
+            self.cooldowns[alert_id] = cooldown
+
+        # Reconcile stored states with the latest prices
+        states = AlertState.objects.filter(
+            alert__is_active=True, alert__alert_type="duration"
+        )
+        if owned is not None:
+            states = states.filter(alert__stock_id__in=owned)
+        since = dict(states.values_list("alert_id", "condition_since"))
+        entered, left = [], []
+        for alert_id in self.durations.alerts:
+            if not self.durations.is_met(alert_id):
+                if since.get(alert_id) is not None:
+                    left.append(alert_id)
+            elif since.get(alert_id) is None:
+                entered.append(alert_id)
+            else:
+                self.schedule(alert_id, since[alert_id])
+        self.enter(entered, now)
+        self.leave(left, now)
+        self.fire_met(
+            [alert_id for alert_id in self.index.alerts if alert_id not in indexed],
+            now,
+        )
+
+    def schedule(self, alert_id, since):
+        deadline = since + timezone.timedelta(hours=self.duration_hours[alert_id])
+        self.scheduler.schedule(alert_id, deadline)
+
+    def last_price(self, alert_id):
+        symbol = self.durations.alerts[alert_id][0]
+        return from_cents(self.durations.last_prices[symbol])
+
+    def fire_met(self, alert_ids, now=None):
+        """
+        Fire the indexed threshold alerts whose condition already holds at
+        their symbol's last price, as no crossing will fire them; returns
+        the created trigger ids.
+        """
+        by_price = defaultdict(list)
+        for alert_id in alert_ids:
+            if alert_id in self.index.alerts and self.index.is_met(alert_id):
+                symbol = self.index.alerts[alert_id][0]
+                by_price[from_cents(self.index.last_prices[symbol])].append(alert_id)
+
+        trigger_ids = []
+        for price, met_ids in by_price.items():
+            trigger_ids += fire_alerts(met_ids, price, now)
+        notify_triggers(trigger_ids)
+        return trigger_ids
+
+    def enter(self, alert_ids, now=None):
+        """
+        Start the duration clock of alerts whose condition became true.
+        """
+        if not alert_ids:
+            return
+        now = now or timezone.now()
+        record_transitions(
+            {alert_id: self.last_price(alert_id) for alert_id in alert_ids}, True, now
+        )
+        for alert_id in alert_ids:
+            self.schedule(alert_id, now)
+
+    def leave(self, alert_ids, now=None):
+        """
+        Cancel the deadline of alerts whose condition stopped being true.
+        """
+        if not alert_ids:
+            return
+        record_transitions(
+            {alert_id: self.last_price(alert_id) for alert_id in alert_ids},
+            False,
+            now,
+        )
+        for alert_id in alert_ids:
+            self.scheduler.cancel(alert_id)
+
+    def handle_change(self, change):
+        alert_id = change["id"]
+        if not change.get("deleted"):
+            self.stock_ids[change["symbol"]] = change["stock_id"]
+            if not self.owns(change["symbol"]):
+                # Another worker owns the alert's stock
+                change = {"id": alert_id, "deleted": True}
+        self.index.apply(change)
+        self.fire_met([alert_id])
+
+        is_duration = change.get("alert_type") == "duration"
+        if not is_duration and alert_id not in self.durations.alerts:
+            return
+        # Any edit restarts the duration clock from the current price
+        if alert_id in self.scheduler and not change.get("deleted"):
+            self.leave([alert_id])
+        self.scheduler.cancel(alert_id)
+        self.durations.apply(change)
+        if alert_id in self.durations.alerts:
+            self.duration_hours[alert_id] = change["duration_hours"]
+            self.cooldowns[alert_id] = change["cooldown_minutes"]
+            if self.durations.is_met(alert_id):
+                self.enter([alert_id])
+        else:
+            self.duration_hours.pop(alert_id, None)
+            self.cooldowns.pop(alert_id, None)
+
+    def handle_quote(self, quote, now=None):
+        """
+        Fire the threshold alerts crossed by a quote and record duration
+        alert transitions; returns the created trigger ids.
+
+        The price is only recorded once everything is written, so a quote
+        that failed midway crosses the same alerts when it is redelivered.
+        """
+        price = quote.get("price")
+        if price is None or not self.owns(quote["symbol"]):
+            return []
+        symbol = quote["symbol"]
+        trigger_ids = []
+        alert_ids = self.index.crossings(symbol, price)[0]
+        if alert_ids:
+            trigger_ids = fire_alerts(alert_ids, price, now)
+
+        # Transitions are written at the new price, so it is recorded first
+        # and restored if writing fails
+        previous = self.durations.last_prices.get(symbol)
+        entered, left = self.durations.transitions(symbol, price)
+        try:
+            self.enter(
+                [alert_id for alert_id in entered if alert_id not in self.scheduler],
+                now,
+            )
+            self.leave(left, now)
+            notify_triggers(trigger_ids)
+        except Exception:
+            if previous is None:
+                self.durations.last_prices.pop(symbol, None)
+            else:
+                self.durations.last_prices[symbol] = previous
+            raise
+        self.index.record(symbol, price)
+        return trigger_ids
+
+    def fire_due(self, now=None):
+        """
+        Fire duration alerts whose deadline passed; returns the trigger ids.
+        """
+        now = now or timezone.now()
+        due = self.scheduler.pop_due(now)
+        if not due:
+            return []
+
+        by_price = defaultdict(list)
+        for alert_id in due:
+            by_price[self.last_price(alert_id)].append(alert_id)
+            # Fire again after the cooldown while the condition still holds
+            cooldown = timezone.timedelta(minutes=self.cooldowns[alert_id])
+            self.scheduler.schedule(alert_id, now + cooldown)
+
+        trigger_ids = []
+        for price, alert_ids in by_price.items():
+            trigger_ids += fire_alerts(alert_ids, price, now)
+        notify_triggers(trigger_ids)
+        return trigger_ids
+
+    def handle_message(self, message):
+        if message["type"] != "message":
+            return
+        try:
+            self.handle_change(json.loads(message["data"]))
+        except Exception as e:
+            logger.error(f"Error handling message on {message['channel']}: {e}")
+
+    def handle_entries(self, entries):
+        """
+        Handle a batch of quote stream entries: only the newest quote of each
+        symbol is evaluated, as older quotes are already stale. Records the
+        tick-to-trigger latency of quotes that fired alerts.
+        """
+        quotes = {}
+        for _, fields in entries:
+            # Entries trimmed from the stream before being claimed are empty
+            if fields and fields.get("symbol"):
+                quotes[fields["symbol"]] = fields
+        for quote in quotes.values():
+            if self.handle_quote(quote):
+                self.latency.add(time.time() - float(quote["published_at"]))
+
+    def streams(self):
+        return [quote_stream_key(partition) for partition in self.partitions]
+
+    def ensure_groups(self, client):
+        for stream in self.streams():
+            try:
+                client.xgroup_create(stream, QUOTE_GROUP, id="$", mkstream=True)
+            except redis.ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def read_quotes(self, client, timeout):
+        """
+        Read new entries from the owned partitions, waiting up to
+        ``timeout`` seconds; returns ``(stream, entries)`` pairs.
+        """
+        streams = self.streams()
+        if not streams:
+            time.sleep(timeout)
+            return []
+        return client.xreadgroup(
+            QUOTE_GROUP,
+            self.worker_id,
+            {stream: ">" for stream in streams},
+            count=settings.QUOTE_STREAM_BATCH,
+            block=int(timeout * 1000) or None,
+        )
+
+    def consume(self, client, stream, entries):
+        """
+        Evaluate entries and acknowledge them; on failure they stay pending
+        and are claimed again by ``recover``.
+        """
+        if not entries:
+            return
+        self.handle_entries(entries)
+        client.xack(stream, QUOTE_GROUP, *(entry_id for entry_id, _ in entries))
+
+    def recover(self, client):
+        """
+        Claim and handle entries left unacknowledged by a dead worker.
+        """
+        idle_ms = settings.QUOTE_STREAM_CLAIM_IDLE_SECONDS * 1000
+        for stream in self.streams():
+            cursor = "0-0"
+            while True:
+                cursor, entries, *_ = client.xautoclaim(
+                    stream,
+                    QUOTE_GROUP,
+                    self.worker_id,
+                    idle_ms,
+                    start_id=cursor,
+                    count=settings.QUOTE_STREAM_BATCH,
+                )
+                self.consume(client, stream, entries)
+                if cursor == "0-0":
+                    break
+
+    def report_latency(self):
+        stats = self.latency.percentiles()
+        if not stats["count"]:
+            return
+        logger.info(
+            f"Alert worker {self.worker_id} tick-to-trigger latency over "
+            f"{stats['count']} triggers: p50 {stats['p50_ms']} ms, "
+            f"p95 {stats['p95_ms']} ms, p99 {stats['p99_ms']} ms"
+        )
+        record_latency(self.worker_id, stats)
+
+    def poll_timeout(self):
+        deadline = self.scheduler.next_deadline()
+        if deadline is None:
+            return MAX_POLL_SECONDS
+        remaining = (deadline - timezone.now()).total_seconds()
+        return min(max(remaining, 0), MAX_POLL_SECONDS)
+
+    def connect(self, client, membership):
+        """
+        Subscribe to alert changes, join the ring, reload the indexes and
+        claim abandoned entries; done at start and again after every
+        reconnect, as changes published meanwhile were lost.
+        """
+        pubsub = client.pubsub()
+        pubsub.subscribe(ALERT_CHANGES_CHANNEL)
+        if not self.rebalance(membership.heartbeat()):
+            self.load()
+        self.ensure_groups(client)
+        self.recover(client)
+        return pubsub
+
+    def run(self):
+        # A dedicated connection without a read timeout, as reads block
+        client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            decode_responses=True,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT,
+        )
+        membership = Membership(self.worker_id)
+        delay = RECONNECT_SECONDS
+        try:
+            while True:
+                try:
+                    pubsub = self.connect(client, membership)
+                    delay = RECONNECT_SECONDS
+                    try:
+                        self.serve(client, pubsub, membership)
+                    finally:
+                        pubsub.close()
+                except (redis.ConnectionError, redis.TimeoutError) as e:
+                    logger.error(
+                        f"Alert worker {self.worker_id} lost Redis, reconnecting "
+                        f"in {delay}s: {e}"
+                    )
+                    time.sleep(delay)
+                    delay = min(delay * 2, MAX_RECONNECT_SECONDS)
+        finally:
+            membership.leave()
+
+    def serve(self, client, pubsub, membership):
+        """
+        Handle alert changes, quotes and due deadlines until Redis fails.
+        """
+        next_heartbeat = time.monotonic() + settings.ALERT_WORKER_HEARTBEAT_SECONDS
+        next_report = time.monotonic() + REPORT_SECONDS
+        next_reload = time.monotonic() + settings.ALERT_WORKER_RELOAD_SECONDS
+        while True:
+            for _ in range(MAX_DRAIN_MESSAGES):
+                message = pubsub.get_message(timeout=0)
+                if message is None:
+                    break
+                self.handle_message(message)
+
+            for stream, entries in self.read_quotes(client, self.poll_timeout()):
+                try:
+                    self.consume(client, stream, entries)
+                except Exception as e:
+                    logger.error(f"Error handling quotes from {stream}: {e}")
+            try:
+                self.fire_due()
+            except Exception as e:
+                logger.error(f"Error firing due duration alerts: {e}")
+
+            if time.monotonic() >= next_heartbeat:
+                next_heartbeat = (
+                    time.monotonic() + settings.ALERT_WORKER_HEARTBEAT_SECONDS
+                )
+                try:
+                    if self.rebalance(membership.heartbeat()):
+                        self.ensure_groups(client)
+                        self.recover(client)
+                except Exception as e:
+                    logger.error(f"Error refreshing alert worker membership: {e}")
+
+            if time.monotonic() >= next_reload:
+                next_reload = time.monotonic() + settings.ALERT_WORKER_RELOAD_SECONDS
+                try:
+                    self.load()
+                except Exception as e:
+                    logger.error(f"Error reloading alert indexes: {e}")
+
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + REPORT_SECONDS
+                try:
+                    self.recover(client)
+                    self.report_latency()
+                except Exception as e:
+                    logger.error(f"Error recovering pending quotes: {e}")
@@ -0,0 +1,165 @@
+"""
+Async variants of the read-only stock views for the ASGI serving profile.
+
+They reuse the DRF view classes to build querysets, serializers and
+paginated payloads, but run every database round trip through Django's
+async ORM, so a worker's event loop keeps serving other requests while one
+waits on the database. Every view loads the token's user, so deleted and
+deactivated accounts are rejected as by the DRF views. Enabled with
+``ASYNC_READ_VIEWS``.
+"""
+
+import functools
+
+from django.contrib.auth import get_user_model
+from django.core.paginator import InvalidPage, Paginator
+from django.http import Http404, HttpResponse
+from rest_framework import exceptions
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .views import (
+    QuoteBatchView,
+    StockDetailView,
+    StockListView,
+    StockWatchlistQuoteView,
+    quote_batch_payload,
+)
+
+renderer = JSONRenderer()
+authenticator = JWTStatelessUserAuthentication()
+
+
+def render(data, status=200, headers=None):
+    return HttpResponse(
+        renderer.render(data),
+        status=status,
+        headers=headers,
+        content_type="application/json",
+    )
+
+
+def render_exception(exc):
+    """
+    Render an exception the way DRF's default exception handler does.
+    """
+    if isinstance(exc, Http404):
+        exc = exceptions.NotFound()
+    headers = {}
+    if isinstance(exc, (exceptions.NotAuthenticated, exceptions.AuthenticationFailed)):
+        headers["WWW-Authenticate"] = authenticator.authenticate_header(None)
+    data = exc.detail
+    if not isinstance(data, (list, dict)):
+        data = {"detail": data}
+    return render(data, status=exc.status_code, headers=headers)
+
+
+def async_api_view(view_func):
+    """
+    Render the returned data as JSON and API errors as DRF would.
+    """
+
+    @functools.wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        try:
+            return render(await view_func(request, *args, **kwargs))
+        except (exceptions.APIException, Http404) as exc:
+            return render_exception(exc)
+
+    return wrapper
+
+
+def build_view(view_class, request, **kwargs):
+    """
+    Instantiate a DRF view for an authenticated request without dispatching
+    it, so its queryset/serializer hooks can be reused.
+    """
+    drf_request = Request(request, authenticators=[authenticator])
+    result = authenticator.authenticate(drf_request)
+    if result is None:
+        raise exceptions.NotAuthenticated()
+    drf_request.user, drf_request.auth = result
+
+    view = view_class()
+    view.args = ()
+    view.kwargs = kwargs
+    view.request = drf_request
+    view.format_kwarg = None
+    view.headers = {}
+    return view
+
+
+async def load_user(view):
+    """
+    Replace the token user of a built view with the user row, rejecting
+    deleted and deactivated users as ``JWTAuthentication`` does.
+    """
+    user = await (
+        get_user_model()
+        .objects.filter(**{api_settings.USER_ID_FIELD: view.request.user.id})
+        .afirst()
+    )
+    if user is None:
+        raise AuthenticationFailed("User not found", code="user_not_found")
+    if not user.is_active:
+        raise AuthenticationFailed("User is inactive", code="user_inactive")
+    view.request.user = user
+    return view
+
+
+async def paginated(view):
+    """
+    Async equivalent of ``ListAPIView.list`` with page-number pagination.
+    """
+    queryset = view.get_queryset()
+    pagination = view.paginator
+    count = await queryset.acount()
+
+    # A range stands in for the rows so Django computes the page bounds
+    paginator = Paginator(range(count), pagination.get_page_size(view.request))
+    try:
+        page = paginator.page(pagination.get_page_number(view.request, paginator))
+    except InvalidPage:
+        raise exceptions.NotFound("Invalid page.")
+
+    rows = []
+    if count:
+        rows = [
+            row async for row in queryset[page.start_index() - 1 : page.end_index()]
+        ]
+
+    pagination.page = page
+    pagination.request = view.request
+    serializer = view.get_serializer(rows, many=True)
+    return pagination.get_paginated_response(serializer.data).data
+
+
+@async_api_view
+async def stock_list(request):
+    return await paginated(await load_user(build_view(StockListView, request)))
+
+
+@async_api_view
+async def stock_detail(request, symbol):
+    view = await load_user(build_view(StockDetailView, request, symbol=symbol))
+    stock = await view.get_queryset().filter(symbol=symbol.upper()).afirst()
+    if stock is None:
+        raise Http404
+    return view.get_serializer(stock).data
+
+
+@async_api_view
+async def quote_batch(request):
+    view = await load_user(build_view(QuoteBatchView, request))
+    symbols = view.get_symbols()
+    rows = [row async for row in view.get_rows(symbols)]
+    return quote_batch_payload(symbols, rows)
+
+
+@async_api_view
+async def watchlist_quotes(request):
+    view = await load_user(build_view(StockWatchlistQuoteView, request))
+    return await paginated(view)
@@ -0,0 +1,248 @@
+"""
+Technical indicators over a stock's price history, computed with NumPy
+array operations in one pass per series.
+
+Moving sums come from cumulative sums. The EMA and Wilder recurrences
+``y[t] = d * y[t-1] + (1 - d) * x[t]`` are solved in closed form over blocks
+short enough that ``d ** -n`` stays well inside float64, so even they need
+no Python loop per bar.
+"""
+
+import math
+import re
+
+import numpy as np
+from rest_framework import serializers
+
+from .models import StockPrice
+
+# name: default window
+INDICATOR_DEFAULTS = {"sma": 20, "ema": 20, "rsi": 14, "bbands": 20, "vwap": None}
+
+INDICATOR_PATTERN = re.compile(r"^(sma|ema|rsi|bbands|vwap)(\d*)$")
+
+MAX_INDICATOR_WINDOW = 500
+
+# Bars per window replayed before ``start`` so recursive indicators converge
+CONVERGENCE_WINDOWS = 3
+
+BBANDS_WIDTH = 2
+
+
+def parse_indicator(name):
+    """
+    Split a name such as ``"sma20"`` into ``("sma", 20)``; raises ValueError.
+    """
+    match = INDICATOR_PATTERN.match(name)
+    if match is None:
+        raise ValueError(f"Unknown indicator '{name}'")
+    kind, digits = match.groups()
+    if kind == "vwap":
+        if digits:
+            raise ValueError("vwap takes no window")
+        return kind, None
+    window = int(digits) if digits else INDICATOR_DEFAULTS[kind]
+    if not 2 <= window <= MAX_INDICATOR_WINDOW:
+        raise ValueError(
+            f"Window of '{name}' must be between 2 and {MAX_INDICATOR_WINDOW}"
+        )
+    return kind, window
+
+
+def lookback(kind, window):
+    """
+    Bars needed before the first returned bar.
+    """
+    if kind in ("sma", "bbands"):
+        return window - 1
+    if kind in ("ema", "rsi"):
+        return CONVERGENCE_WINDOWS * window
+    return 0
+
+
+def moving_sum(values, window):
+    """
+    Sums of each run of ``window`` values, aligned to the run's last value
+    (NaN before the first full run).
+    """
+    sums = np.full(len(values), np.nan)
+    if len(values) >= window:
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        sums[window - 1 :] = cumulative[window:] - cumulative[:-window]
+    return sums
+
+
+def sma(values, window):
+    return moving_sum(values, window) / window
+
+
+def smooth(values, decay, seed):
+    """
+    Solve ``y[t] = decay * y[t-1] + (1 - decay) * values[t]`` from
+    ``y[-1] = seed``.
+    """
+    result = np.empty(len(values))
+    # Longest block whose decay ** -n stays below 1e12
+    block = max(int(12 * math.log(10) / -math.log(decay)), 1) if decay else 1
+    previous = seed
+    for begin in range(0, len(values), block):
+        chunk = values[begin : begin + block]
+        powers = decay ** np.arange(1, len(chunk) + 1)
+        weighted = np.cumsum((1 - decay) * chunk / powers)
+        result[begin : begin + len(chunk)] = powers * (previous + weighted)
+        previous = result[begin + len(chunk) - 1]
+    return result
+
+
+def ema(values, window):
+    """
+    Exponential moving average seeded with the SMA of the first ``window``
+    values, like the incremental ``apps.alerts.rolling.EMA``.
+    """
+    result = np.full(len(values), np.nan)
+    if len(values) < window:
+        return result
+    seed = values[:window].mean()
+    result[window - 1] = seed
+    result[window:] = smooth(values[window:], 1 - 2 / (window + 1), seed)
+    return result
+
+
+def rsi(closes, window):
+    """
+    Wilder's RSI: gains and losses averaged over the first ``window`` changes,
+    then smoothed with ``1 / window``.
+    """
+    result = np.full(len(closes), np.nan)
+    changes = np.diff(closes)
+    if len(changes) < window:
+        return result
+    gains, losses = changes.clip(min=0), (-changes).clip(min=0)
+    decay = 1 - 1 / window
+    averages = []
+    for moves in (gains, losses):
+        seed = moves[:window].mean()
+        averages.append(
+            np.concatenate(([seed], smooth(moves[window:], decay, seed)))
+        )
+    average_gain, average_loss = averages
+    with np.errstate(divide="ignore", invalid="ignore"):
+        strength = 100 - 100 / (1 + average_gain / average_loss)
+    flat = np.where(average_gain > 0, 100.0, 50.0)
+    result[window:] = np.where(average_loss == 0, flat, strength)
+    return result
+
+
+def bbands(closes, window, width=BBANDS_WIDTH):
+    """
+    Bollinger bands: the SMA and ``width`` population standard deviations
+    around it.
+    """
+    # Centred first so the sum of squares keeps its precision
+    centred = closes - closes.mean() if len(closes) else closes
+    mean = sma(centred, window)
+    variance = np.maximum(sma(centred**2, window) - mean**2, 0)
+    deviation = width * np.sqrt(variance)
+    middle = mean + (closes.mean() if len(closes) else 0)
+    return {
+        "middle": middle,
+        "upper": middle + deviation,
+        "lower": middle - deviation,
+    }
+
+
+def vwap(highs, lows, closes, volumes):
+    """
+    Volume-weighted average typical price, anchored at the first bar.
+    """
+    typical = (highs + lows + closes) / 3
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.cumsum(typical * volumes) / np.cumsum(volumes)
+
+
+def compute_indicator(kind, window, series):
+    """
+    One indicator over ``series``, a dict of equal-length float arrays
+    (``high``, ``low``, ``close``, ``volume``).
+    """
+    if kind == "sma":
+        return sma(series["close"], window)
+    if kind == "ema":
+        return ema(series["close"], window)
+    if kind == "rsi":
+        return rsi(series["close"], window)
+    if kind == "bbands":
+        return bbands(series["close"], window)
+    return vwap(series["high"], series["low"], series["close"], series["volume"])
+
+
+def to_json_values(values):
+    """
+    A float array as a list, with NaN (not enough history) as None.
+    """
+    return [
+        round(value, 4) if math.isfinite(value) else None for value in values.tolist()
+    ]
+
+
+def load_series(stock, start, end, bars_before):
+    """
+    Price columns of ``stock`` between ``start`` and ``end`` (either may be
+    None), preceded by up to ``bars_before`` earlier bars.
+
+    Returns ``(timestamps, series, first)``, where ``first`` is the index of
+    the first bar inside the range.
+    """
+    columns = ("timestamp", "high", "low", "close_price", "volume")
+    rows = StockPrice.objects.filter(stock=stock).order_by("timestamp")
+    if start is not None:
+        rows = rows.filter(timestamp__gte=start)
+    if end is not None:
+        rows = rows.filter(timestamp__lte=end)
+    rows = list(rows.values_list(*columns))
+    earlier = []
+    if start is not None and bars_before:
+        earlier = list(
+            StockPrice.objects.filter(stock=stock, timestamp__lt=start)
+            .order_by("-timestamp")
+            .values_list(*columns)[:bars_before]
+        )[::-1]
+    rows = earlier + rows
+
+    timestamps = [row[0] for row in rows[len(earlier) :]]
+    values = np.array([row[1:] for row in rows], dtype=np.float64).reshape(-1, 4)
+    series = dict(zip(("high", "low", "close", "volume"), values.T))
+    return timestamps, series, len(earlier)
+
+
+def indicator_payload(stock, names, start, end):
+    """
+    Indicators ``names`` of ``stock`` over ``[start, end]`` as JSON-ready
+    columns aligned with ``timestamps``. Each indicator sees exactly its own
+    lookback before ``start``, so its values do not depend on the others
+    requested.
+    """
+    specs = {name: parse_indicator(name) for name in names}
+    needed = max(lookback(*spec) for spec in specs.values())
+    timestamps, series, first = load_series(stock, start, end, needed)
+
+    indicators = {}
+    for name, (kind, window) in specs.items():
+        offset = max(first - lookback(kind, window), 0)
+        values = compute_indicator(
+            kind, window, {column: array[offset:] for column, array in series.items()}
+        )
+        skip = first - offset
+        if isinstance(values, dict):
+            indicators[name] = {
+                line: to_json_values(array[skip:]) for line, array in values.items()
+            }
+        else:
+            indicators[name] = to_json_values(values[skip:])
+
+    timestamp_field = serializers.DateTimeField()
+    return {
+        "symbol": stock.symbol,
+        "timestamps": [timestamp_field.to_representation(ts) for ts in timestamps],
+        "indicators": indicators,
+    }
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:05
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def remove_duplicate_watchlist_rows(apps, schema_editor):
+    StockWatchlist = apps.get_model("stocks", "StockWatchlist")
+    keep_ids = (
+        StockWatchlist.objects.values("user", "stock")
+        .annotate(keep_id=Min("id"))
+        .values_list("keep_id", flat=True)
+    )
+    StockWatchlist.objects.exclude(id__in=list(keep_ids)).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stocks', '0002_rename_sector_stock_type_remove_stock_industry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            remove_duplicate_watchlist_rows, migrations.RunPython.noop
+        ),
+        migrations.AlterUniqueTogether(
+            name='stockwatchlist',
+            unique_together={('user', 'stock')},
+        ),
+        migrations.AddIndex(
+            model_name='stockprice',
+            index=models.Index(fields=['stock', '-timestamp'], name='stocks_stoc_stock_i_71a6f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockprice',
+            index=models.Index(fields=['timestamp'], name='stocks_stoc_timesta_7a363a_idx'),
+        ),
+    ]
@@ -1,7 +1,43 @@
 from django.db import models
+from django.db.models import OuterRef, Subquery
 from django.conf import settings
 
 
+LATEST_PRICE_COLUMNS = (
+    "price",
+    "volume",
+    "high",
+    "low",
+    "open_price",
+    "close_price",
+    "timestamp",
+)
+
+
+def latest_price_annotations(columns=LATEST_PRICE_COLUMNS, stock_ref="pk"):
+    """
+    Build ``latest_<column>`` annotations holding the values of the most recent
+    StockPrice row of the stock referenced by ``stock_ref``.
+
+    ``latest_timestamp`` is always included so callers can tell stocks
+    without prices apart from unannotated objects.
+    """
+    latest = StockPrice.objects.filter(stock=OuterRef(stock_ref)).order_by(
+        "-timestamp"
+    )
+    columns = set(columns) | {"timestamp"}
+    return {
+        f"latest_{column}": Subquery(latest.values(column)[:1])
+        for column in LATEST_PRICE_COLUMNS
+        if column in columns
+    }
+
+
+class StockQuerySet(models.QuerySet):
+    def with_latest_price(self, columns=LATEST_PRICE_COLUMNS):
+        return self.annotate(**latest_price_annotations(columns))
+
+
 class Stock(models.Model):
     """
     Model to store stock information.
@@ -14,6 +50,8 @@ class Stock(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = StockQuerySet.as_manager()
+
 
 class StockPrice(models.Model):
     """
@@ -1,8 +1,68 @@
+from django.conf import settings
 from rest_framework import serializers
-from .models import Stock, StockPrice, StockWatchlist
+from MarketPulse.fieldsets import SparseFieldsetSerializerMixin
+from .models import LATEST_PRICE_COLUMNS, Stock, StockPrice, StockWatchlist
 
 
-class StockSerializer(serializers.ModelSerializer):
+# Response keys of ``latest_price`` mapped to StockPrice columns
+LATEST_PRICE_KEYS = {
+    "price": "price",
+    "volume": "volume",
+    "high": "high",
+    "low": "low",
+    "open": "open_price",
+    "close": "close_price",
+    "timestamp": "timestamp",
+}
+
+
+def latest_price_values(stock):
+    """
+    Return the latest price columns of a stock as a dict, or None if the stock
+    has no prices. Uses ``with_latest_price()`` annotations when present and
+    falls back to a single (memoized) query otherwise.
+    """
+    if hasattr(stock, "latest_timestamp"):
+        if stock.latest_timestamp is None:
+            return None
+        return {
+            column: getattr(stock, f"latest_{column}")
+            for column in LATEST_PRICE_COLUMNS
+            if hasattr(stock, f"latest_{column}")
+        }
+
+    if not hasattr(stock, "_latest_price_row"):
+        stock._latest_price_row = stock.prices.order_by("-timestamp").first()
+    row = stock._latest_price_row
+    if row is None:
+        return None
+    return {column: getattr(row, column) for column in LATEST_PRICE_COLUMNS}
+
+
+# StockPrice columns needed to build a compact quote
+QUOTE_COLUMNS = ("price", "volume", "open_price", "close_price")
+
+
+def quote_from_values(values):
+    """
+    Build a compact quote from a row of ``latest_<column>`` values, or None for
+    stocks without prices.
+    """
+    if values.get("latest_timestamp") is None:
+        return None
+
+    open_price = values["latest_open_price"]
+    change = values["latest_close_price"] - open_price
+    return {
+        "price": values["latest_price"],
+        "change": float(change),
+        "change_percent": float(change / open_price * 100) if open_price > 0 else 0,
+        "volume": values["latest_volume"],
+        "timestamp": values["latest_timestamp"],
+    }
+
+
+class StockSerializer(SparseFieldsetSerializerMixin, serializers.ModelSerializer):
     """
     Serializer for stock information.
     """
@@ -46,7 +106,9 @@ class StockPriceSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at"]
 
 
-class StockWatchlistSerializer(serializers.ModelSerializer):
+class StockWatchlistSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for user's stock watchlist.
     """
@@ -59,7 +121,9 @@ class StockWatchlistSerializer(serializers.ModelSerializer):
         read_only_fields = ["added_at"]
 
 
-class StockWithLatestPriceSerializer(serializers.ModelSerializer):
+class StockWithLatestPriceSerializer(
+    SparseFieldsetSerializerMixin, serializers.ModelSerializer
+):
     """
     Serializer for stock with its latest price information.
     """
@@ -81,28 +145,61 @@ class StockWithLatestPriceSerializer(serializers.ModelSerializer):
         ]
 
     def get_latest_price(self, obj):
-        latest_price = obj.prices.first()
-        if latest_price:
+        latest = latest_price_values(obj)
+        if latest:
             return {
-                "price": latest_price.price,
-                "volume": latest_price.volume,
-                "high": latest_price.high,
-                "low": latest_price.low,
-                "open": latest_price.open_price,
-                "close": latest_price.close_price,
-                "timestamp": latest_price.timestamp,
+                key: latest[column]
+                for key, column in LATEST_PRICE_KEYS.items()
+                if column in latest
             }
         return None
 
     def get_price_change(self, obj):
-        latest_price = obj.prices.first()
-        if latest_price:
-            return float(latest_price.close_price - latest_price.open_price)
+        latest = latest_price_values(obj)
+        if latest:
+            return float(latest["close_price"] - latest["open_price"])
         return 0
 
     def get_price_change_percent(self, obj):
-        latest_price = obj.prices.first()
-        if latest_price and latest_price.open_price > 0:
-            change = latest_price.close_price - latest_price.open_price
-            return float((change / latest_price.open_price) * 100)
+        latest = latest_price_values(obj)
+        if latest and latest["open_price"] > 0:
+            change = latest["close_price"] - latest["open_price"]
+            return float((change / latest["open_price"]) * 100)
         return 0
+
+
+class WatchlistQuoteSerializer(serializers.ModelSerializer):
+    """
+    Serializer for watchlist entries with the stock's latest quote embedded.
+    """
+
+    symbol = serializers.CharField(source="stock.symbol", read_only=True)
+    name = serializers.CharField(source="stock.name", read_only=True)
+    quote = serializers.SerializerMethodField()
+
+    class Meta:
+        model = StockWatchlist
+        fields = ["id", "stock", "symbol", "name", "quote", "added_at"]
+
+    def get_quote(self, obj):
+        return quote_from_values(
+            {
+                f"latest_{column}": getattr(obj, f"latest_{column}", None)
+                for column in (*QUOTE_COLUMNS, "timestamp")
+            }
+        )
+
+
+class WatchlistBulkSerializer(serializers.Serializer):
+    """
+    Serializer for bulk watchlist add/remove requests.
+    """
+
+    symbols = serializers.ListField(
+        child=serializers.CharField(max_length=10),
+        allow_empty=False,
+        max_length=settings.WATCHLIST_BULK_MAX_SYMBOLS,
+    )
+
+    def validate_symbols(self, value):
+        return list(dict.fromkeys(symbol.strip().upper() for symbol in value))
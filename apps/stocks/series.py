@@ -0,0 +1,107 @@
+"""
+Close series of several stocks aligned on one timestamp index, and the
+correlation or covariance of their returns.
+
+Prices are fetched per stock at slightly different moments, so timestamps
+are first floored to an interval (a day by default). Each stock keeps its
+last close per interval, and the index is the union of the intervals any
+stock has a close in. All stocks are loaded with a single query and aligned
+with array operations; the matrix is computed from the same arrays.
+"""
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+import numpy as np
+from rest_framework import serializers
+
+from .models import StockPrice
+
+INTERVALS = {"1m": 60, "5m": 300, "15m": 900, "1h": 3600, "1d": 86400}
+
+MATRICES = ("correlation", "covariance")
+
+
+def aligned_closes(stock_ids, start, end, seconds):
+    """
+    Returns ``(intervals, closes)``: the interval starts in epoch seconds,
+    and a ``len(stock_ids) x len(intervals)`` array with NaN where a stock
+    has no close.
+    """
+    rows = StockPrice.objects.filter(stock_id__in=stock_ids)
+    if start is not None:
+        rows = rows.filter(timestamp__gte=start)
+    if end is not None:
+        rows = rows.filter(timestamp__lte=end)
+    rows = list(
+        rows.order_by("stock_id", "timestamp").values_list(
+            "stock_id", "timestamp", "close_price"
+        )
+    )
+    positions = {stock_id: position for position, stock_id in enumerate(stock_ids)}
+    stocks = np.array([positions[row[0]] for row in rows], np.int64)
+    buckets = np.array([int(row[1].timestamp()) // seconds for row in rows], np.int64)
+    closes = np.array([row[2] for row in rows], np.float64)
+
+    intervals, columns = np.unique(buckets, return_inverse=True)
+    # Rows are ordered by stock and time: keep the last of each stock interval
+    last = np.ones(len(rows), dtype=bool)
+    last[:-1] = (stocks[1:] != stocks[:-1]) | (columns[1:] != columns[:-1])
+    aligned = np.full((len(stock_ids), len(intervals)), np.nan)
+    aligned[stocks[last], columns[last]] = closes[last]
+    return intervals * seconds, aligned
+
+
+def return_matrix(closes, kind):
+    """
+    Correlation or covariance of simple returns between the intervals in
+    which every stock has a close. Returns ``(matrix, observations)``.
+    """
+    complete = closes[:, ~np.isnan(closes).any(axis=0)]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(complete, axis=1) / complete[:, :-1]
+        observations = returns.shape[1]
+        if observations < 2:
+            return None, observations
+        if kind == "covariance":
+            matrix = np.cov(returns)
+        else:
+            matrix = np.corrcoef(returns)
+    return np.atleast_2d(matrix), observations
+
+
+def to_json_rows(array, digits):
+    return [
+        [round(value, digits) if math.isfinite(value) else None for value in row]
+        for row in array.tolist()
+    ]
+
+
+def aligned_payload(stocks, start, end, interval, matrix=None):
+    """
+    ``stocks`` are in response order. Closes are columns keyed by symbol,
+    aligned with ``timestamps``; missing closes are None.
+    """
+    intervals, closes = aligned_closes(
+        [stock.id for stock in stocks], start, end, INTERVALS[interval]
+    )
+    symbols = [stock.symbol for stock in stocks]
+    timestamp_field = serializers.DateTimeField()
+    payload = {
+        "symbols": symbols,
+        "interval": interval,
+        "timestamps": [
+            timestamp_field.to_representation(
+                datetime.fromtimestamp(moment, dt_timezone.utc)
+            )
+            for moment in intervals.tolist()
+        ],
+        "closes": dict(zip(symbols, to_json_rows(closes, 4))),
+    }
+    if matrix is not None:
+        values, observations = return_matrix(closes, matrix)
+        payload[matrix] = {
+            "observations": observations,
+            "matrix": None if values is None else to_json_rows(values, 8),
+        }
+    return payload
@@ -0,0 +1,134 @@
+import logging
+import time
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from MarketPulse.redis_client import get_redis
+from MarketPulse.realtime import (
+    event_stream_response,
+    publish,
+    serve_websocket,
+    sse_events,
+    stream_error,
+    websocket_params,
+)
+from apps.accounts.authentication import authenticate_stream, authenticate_websocket
+from .models import StockWatchlist
+from .serializers import quote_from_values
+
+logger = logging.getLogger(__name__)
+
+
+def quote_channel(symbol):
+    return f"quotes:{symbol.upper()}"
+
+
+def quote_partition(stock_id):
+    return stock_id % settings.QUOTE_STREAM_PARTITIONS
+
+
+def quote_stream_key(partition):
+    return f"quotes:stream:{partition}"
+
+
+def append_quote(stock, price):
+    """
+    Append a price to its stock's partition of the durable quote stream read
+    by the alert workers (best effort, like ``publish``).
+    """
+    fields = {
+        "symbol": stock.symbol,
+        "stock_id": stock.id,
+        "price": str(price.price),
+        "published_at": repr(time.time()),
+    }
+    try:
+        get_redis().xadd(
+            quote_stream_key(quote_partition(stock.id)),
+            fields,
+            maxlen=settings.QUOTE_STREAM_MAXLEN,
+            approximate=True,
+        )
+    except Exception as e:
+        logger.error(f"Error appending {stock.symbol} to the quote stream: {e}")
+
+
+def publish_quote(stock, price):
+    """
+    Push a freshly ingested price to every client streaming the symbol, and
+    to the alert workers' quote stream.
+    """
+    quote = quote_from_values(
+        {
+            "latest_price": price.price,
+            "latest_volume": price.volume,
+            "latest_open_price": price.open_price,
+            "latest_close_price": price.close_price,
+            "latest_timestamp": price.timestamp,
+        }
+    )
+    publish(quote_channel(stock.symbol), {"symbol": stock.symbol, **quote})
+    append_quote(stock, price)
+
+
+async def resolve_symbols(user_id, raw_symbols):
+    """
+    Symbols requested explicitly (comma-separated), or the user's watchlist.
+    """
+    if raw_symbols:
+        symbols = [
+            symbol.strip().upper()
+            for symbol in raw_symbols.split(",")
+            if symbol.strip()
+        ]
+    else:
+        symbols = [
+            symbol
+            async for symbol in StockWatchlist.objects.filter(
+                user_id=user_id
+            ).values_list("stock__symbol", flat=True)
+        ]
+    return list(dict.fromkeys(symbols))[: settings.QUOTE_BATCH_MAX_SYMBOLS]
+
+
+async def quote_stream(request):
+    """
+    Server-Sent Events stream of price updates for ``?symbols=`` or, when no
+    symbols are given, the authenticated user's watchlist.
+    """
+    user_id = await authenticate_stream(request)
+    if user_id is None:
+        return JsonResponse(
+            {"detail": "Authentication credentials were not provided."}, status=401
+        )
+    error = stream_error(request)
+    if error is not None:
+        return error
+
+    symbols = await resolve_symbols(user_id, request.GET.get("symbols"))
+    channels = [quote_channel(symbol) for symbol in symbols]
+    return event_stream_response(sse_events(channels, "quote"))
+
+
+async def quote_websocket(scope, receive, send):
+    """
+    Raw ASGI WebSocket handler pushing price updates as JSON text frames.
+
+    Query string: ``ticket`` (from ``POST /api/v1/stream/ticket/``) or
+    ``token`` (access token), and optional ``symbols``; defaults to the
+    user's watchlist.
+    """
+    message = await receive()
+    if message["type"] != "websocket.connect":
+        return
+
+    params = websocket_params(scope)
+    user_id = await authenticate_websocket(params)
+    if user_id is None:
+        await send({"type": "websocket.close", "code": 4401})
+        return
+
+    symbols = await resolve_symbols(user_id, params.get("symbols"))
+    channels = [quote_channel(symbol) for symbol in symbols]
+    await serve_websocket(receive, send, channels)
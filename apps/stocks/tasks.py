@@ -1,16 +1,40 @@
 import logging
+import time
 import requests
 from decimal import Decimal
 from django.conf import settings
+from django.db.models import Q
 from django.utils import timezone
 from celery import shared_task
+from MarketPulse.pipeline import (
+    Lease,
+    defer_when_busy,
+    overloaded,
+    record_skip,
+    single_flight,
+)
 from .models import Stock, StockPrice
+from .streaming import publish_quote
 from apps.alerts.tasks import process_alerts
 logger = logging.getLogger(__name__)
 
 
 @shared_task
-def fetch_single_stock_data(symbol):
+def fetch_single_stock_data(symbol, lease_token=None):
+    """
+    Fetch data for a single stock symbol, then release its in-flight lease.
+    """
+    try:
+        fetch_stock_data(symbol)
+    finally:
+        if lease_token:
+            try:
+                Lease(f"fetch:{symbol}", token=lease_token).release()
+            except Exception as e:
+                logger.error(f"Error releasing fetch lease for {symbol}: {e}")
+
+
+def fetch_stock_data(symbol):
     """
     Fetch data for a single stock symbol.
     """
@@ -76,9 +100,13 @@ def fetch_single_stock_data(symbol):
                 if key != "stock":
                     setattr(existing_price, key, value)
             existing_price.save()
+            price = existing_price
         else:
             # Create new record
-            StockPrice.objects.create(**price_data)
+            price = StockPrice.objects.create(**price_data)
+
+        # Push the update to streaming clients
+        publish_quote(stock, price)
 
         logger.info(f"Successfully fetched data for {symbol}")
 
@@ -89,9 +117,15 @@ def fetch_single_stock_data(symbol):
 
 
 @shared_task
+@single_flight("fetch_stock_data_batch", settings.PERIODIC_TASK_LEASE_SECONDS)
 def fetch_stock_data_batch():
     """
-    Fetch data for a batch of popular stocks.
+    Fetch data for a batch of popular stocks, skipping symbols whose
+    previous fetch is still in flight.
+
+    While the ingest queue is behind, symbols nobody watches or alerts on
+    are only fetched every ``PIPELINE_UNWATCHED_REFRESH_EVERY`` cycles, and
+    no evaluation is queued while the alerts queue is behind.
     """
     # Predefined list of popular stocks for mvp
     # TODO In a real application, this could be dynamic or fetched from a database or config
@@ -108,20 +142,54 @@ def fetch_stock_data_batch():
         "INTC",
     ]
 
-    for symbol in popular_stocks:
+    symbols = popular_stocks
+    cycle = int(time.time() // 60)
+    if cycle % settings.PIPELINE_UNWATCHED_REFRESH_EVERY and overloaded("ingest"):
+        watched = watched_symbols()
+        symbols = [symbol for symbol in popular_stocks if symbol in watched]
+        record_skip("fetch_single_stock_data", len(popular_stocks) - len(symbols))
+
+    for symbol in symbols:
         try:
-            fetch_single_stock_data.delay(symbol)
+            lease = Lease(f"fetch:{symbol}", settings.FETCH_LEASE_SECONDS)
+            if not lease.acquire():
+                record_skip("fetch_single_stock_data")
+                continue
+            # A fetch still queued when its lease lapses is stale; drop it
+            fetch_single_stock_data.apply_async(
+                (symbol, lease.token), expires=settings.FETCH_LEASE_SECONDS
+            )
         except Exception as e:
             logger.error(f"Error scheduling fetch for {symbol}: {e}")
-    process_alerts.delay()
+
+    # Each evaluation reads the newest prices, so a stale one can be dropped
+    if overloaded("alerts"):
+        record_skip("process_alerts")
+    else:
+        process_alerts.apply_async(expires=settings.PIPELINE_MAX_TASK_AGE_SECONDS)
+
+
+def watched_symbols():
+    """
+    Symbols on any watchlist or with an active alert.
+    """
+    return set(
+        Stock.objects.filter(
+            Q(watchlists__isnull=False) | Q(alerts__is_active=True)
+        ).values_list("symbol", flat=True)
+    )
 
 
 @shared_task
+@single_flight("cleanup_old_price_data", settings.PERIODIC_TASK_LEASE_SECONDS)
 def cleanup_old_price_data():
     """
     Clean up old price data to prevent database bloat.
     Keep only last 30 days of data.
     """
+    if defer_when_busy(cleanup_old_price_data):
+        return
+
     from datetime import timedelta
 
     cutoff_date = timezone.now() - timedelta(days=30)
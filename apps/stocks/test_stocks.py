@@ -1,4 +1,11 @@
+import json
+import time
+from types import SimpleNamespace
+
+import fakeredis
 import pytest
+from asgiref.sync import async_to_sync
+from django.test import AsyncRequestFactory
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
@@ -7,7 +14,15 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
+import numpy as np
+from apps.accounts import authentication
+from apps.alerts.rolling import make_indicator
+from apps.stocks import async_views, indicators, tasks, views
+from apps.stocks.downsampling import lttb, minmax
 from apps.stocks.models import Stock, StockPrice, StockWatchlist
+from MarketPulse import pipeline
+from MarketPulse.pipeline import Lease, single_flight, skipped_counts
+from MarketPulse.realtime import Broadcaster, Subscription
 
 
 User = get_user_model()
@@ -217,8 +232,10 @@ def test_add_duplicate_stock_to_watchlist(authenticated_client: APIClient, watch
     
     response = authenticated_client.post(url, payload, format="json")
     
-    # The implementation allows duplicate watchlist items, so we expect a 201 Created
-    assert response.status_code == status.HTTP_201_CREATED
+    # Adding an already watched stock returns the existing entry
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["id"] == watchlist_item.id
+    assert StockWatchlist.objects.count() == 1
 
 
 def test_add_stock_to_watchlist_unauthenticated(api_client: APIClient, stock: Stock):
@@ -288,3 +305,644 @@ def test_remove_another_users_watchlist_item(authenticated_client: APIClient):
     # Should return 404 because the watchlist item doesn't belong to the authenticated user
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert StockWatchlist.objects.count() == 1
+
+
+def test_list_stocks_sparse_fieldset(authenticated_client: APIClient, stock: Stock, stock_price: StockPrice):
+    url = reverse("stocks:stock-list")
+
+    response = authenticated_client.get(url, {"fields": "symbol,latest_price.price"})
+
+    assert response.status_code == status.HTTP_200_OK
+    result = response.data['results'][0]
+    assert set(result) == {"symbol", "latest_price"}
+    assert result["symbol"] == stock.symbol
+    assert result["latest_price"] == {"price": stock_price.price}
+
+
+def test_retrieve_stock_exclude_fields(authenticated_client: APIClient, stock: Stock, stock_price: StockPrice):
+    url = reverse("stocks:stock-detail", kwargs={"symbol": stock.symbol})
+
+    response = authenticated_client.get(url, {"exclude": "latest_price,price_change_percent"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert "latest_price" not in response.data
+    assert "price_change_percent" not in response.data
+    assert response.data["price_change"] == float(stock_price.close_price - stock_price.open_price)
+
+
+def test_retrieve_stock_latest_price_uses_most_recent_timestamp(authenticated_client: APIClient, stock: Stock, stock_price: StockPrice):
+    newer = StockPrice.objects.create(
+        stock=stock,
+        price=Decimal("160.00"),
+        volume=500,
+        high=Decimal("161.00"),
+        low=Decimal("159.00"),
+        open_price=Decimal("159.50"),
+        close_price=Decimal("160.00"),
+        timestamp=timezone.now(),
+    )
+    url = reverse("stocks:stock-detail", kwargs={"symbol": stock.symbol})
+
+    response = authenticated_client.get(url)
+
+    assert response.data["latest_price"]["price"] == newer.price
+
+
+def test_list_watchlist_sparse_nested_fieldset(authenticated_client: APIClient, watchlist_item: StockWatchlist):
+    url = reverse("stocks:watchlist")
+
+    response = authenticated_client.get(url, {"fields": "id,stock_details.symbol"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data['results'][0] == {
+        "id": watchlist_item.id,
+        "stock_details": {"symbol": watchlist_item.stock.symbol},
+    }
+
+
+def test_quote_batch(authenticated_client: APIClient, stock: Stock, stock_price: StockPrice):
+    Stock.objects.create(symbol="MSFT", name="Microsoft Corporation", type="Technology")
+    url = reverse("stocks:quote-batch")
+
+    response = authenticated_client.get(url, {"symbols": "aapl,MSFT,NOPE,AAPL"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.data["quotes"]) == {"AAPL", "MSFT"}
+    assert response.data["quotes"]["AAPL"]["price"] == stock_price.price
+    assert response.data["quotes"]["AAPL"]["change"] == float(stock_price.close_price - stock_price.open_price)
+    assert response.data["quotes"]["MSFT"] is None
+    assert response.data["missing"] == ["NOPE"]
+
+
+def test_quote_batch_single_query(authenticated_client: APIClient, stock: Stock, stock_price: StockPrice, django_assert_num_queries):
+    url = reverse("stocks:quote-batch")
+
+    # One query for the user and one for the quotes
+    with django_assert_num_queries(2):
+        response = authenticated_client.get(url, {"symbols": "AAPL,MSFT,GOOGL"})
+
+    assert response.status_code == status.HTTP_200_OK
+
+
+def test_quote_batch_requires_symbols(authenticated_client: APIClient, settings):
+    settings.QUOTE_BATCH_MAX_SYMBOLS = 2
+    url = reverse("stocks:quote-batch")
+
+    assert authenticated_client.get(url).status_code == status.HTTP_400_BAD_REQUEST
+    response = authenticated_client.get(url, {"symbols": "A,B,C"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "symbols" in response.data
+
+
+def test_quote_batch_unauthenticated(api_client: APIClient):
+    url = reverse("stocks:quote-batch")
+
+    response = api_client.get(url, {"symbols": "AAPL"})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_quote_batch_rejects_deactivated_users(authenticated_client: APIClient, user: User):
+    token = str(RefreshToken.for_user(user).access_token)
+    user.is_active = False
+    user.save()
+    url = reverse("stocks:quote-batch") + "?symbols=AAPL"
+    request = AsyncRequestFactory().get(url, headers={"Authorization": f"Bearer {token}"})
+
+    response = authenticated_client.get(url)
+    async_response = async_to_sync(async_views.quote_batch)(request)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert async_response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_bulk_add_watchlist(authenticated_client: APIClient, watchlist_item: StockWatchlist):
+    Stock.objects.create(symbol="MSFT", name="Microsoft Corporation", type="Technology")
+    url = reverse("stocks:watchlist-bulk")
+
+    response = authenticated_client.post(url, {"symbols": ["aapl", "MSFT", "NOPE"]}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"symbols": ["AAPL", "MSFT"], "missing": ["NOPE"]}
+    assert StockWatchlist.objects.count() == 2
+
+
+def test_bulk_remove_watchlist(authenticated_client: APIClient, watchlist_item: StockWatchlist):
+    url = reverse("stocks:watchlist-bulk")
+
+    response = authenticated_client.delete(url, {"symbols": ["AAPL", "MSFT"]}, format="json")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data == {"removed": 1}
+    assert StockWatchlist.objects.count() == 0
+
+
+def test_bulk_watchlist_requires_symbols(authenticated_client: APIClient):
+    url = reverse("stocks:watchlist-bulk")
+
+    response = authenticated_client.post(url, {"symbols": []}, format="json")
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "symbols" in response.data
+
+
+def test_watchlist_quotes(authenticated_client: APIClient, watchlist_item: StockWatchlist, stock_price: StockPrice, django_assert_max_num_queries):
+    other = Stock.objects.create(symbol="MSFT", name="Microsoft Corporation", type="Technology")
+    StockWatchlist.objects.create(user=watchlist_item.user, stock=other)
+    url = reverse("stocks:watchlist-quotes")
+
+    with django_assert_max_num_queries(3):
+        response = authenticated_client.get(url)
+
+    assert response.status_code == status.HTTP_200_OK
+    quotes = {item["symbol"]: item["quote"] for item in response.data['results']}
+    assert quotes["AAPL"]["price"] == stock_price.price
+    assert quotes["MSFT"] is None
+
+
+@pytest.mark.django_db(transaction=True)
+def test_watchlist_quotes_reject_deactivated_users(authenticated_client: APIClient, user: User, watchlist_item: StockWatchlist):
+    token = str(RefreshToken.for_user(user).access_token)
+    user.is_active = False
+    user.save()
+    url = reverse("stocks:watchlist-quotes")
+    request = AsyncRequestFactory().get(url, headers={"Authorization": f"Bearer {token}"})
+
+    response = authenticated_client.get(url)
+    async_response = async_to_sync(async_views.watchlist_quotes)(request)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert async_response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert json.loads(async_response.content) == response.json()
+
+
+def test_quote_stream_unauthenticated(api_client: APIClient):
+    url = reverse("stocks:quote-stream")
+
+    response = api_client.get(url)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_quote_stream_requires_asgi(api_client: APIClient, user: User):
+    url = reverse("stocks:quote-stream")
+    token = str(RefreshToken.for_user(user).access_token)
+
+    response = api_client.get(
+        url, {"symbols": "AAPL"}, headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_quote_stream_rejects_query_tokens_and_deactivated_users(api_client: APIClient, user: User):
+    url = reverse("stocks:quote-stream")
+    token = str(RefreshToken.for_user(user).access_token)
+
+    response = api_client.get(url, {"token": token, "symbols": "AAPL"})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    user.is_active = False
+    user.save()
+    response = api_client.get(
+        url, {"symbols": "AAPL"}, headers={"Authorization": f"Bearer {token}"}
+    )
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.mark.django_db(transaction=True)
+def test_quote_stream_tickets_are_single_use(api_client: APIClient, user: User, monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(authentication, "get_redis", lambda: client)
+    url = reverse("stocks:quote-stream")
+    ticket = authentication.issue_stream_ticket(user.id)
+
+    response = api_client.get(url, {"ticket": ticket, "symbols": "AAPL"})
+
+    assert response.status_code == status.HTTP_501_NOT_IMPLEMENTED
+
+    response = api_client.get(url, {"ticket": ticket, "symbols": "AAPL"})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+def test_broadcaster_fans_out_and_drops_oldest():
+    hub = Broadcaster(queue_size=2)
+    first = Subscription(["quotes:AAPL"], maxsize=2)
+    second = Subscription(["quotes:AAPL", "quotes:MSFT"], maxsize=2)
+
+    assert hub._register(first) == ["quotes:AAPL"]
+    assert hub._register(second) == ["quotes:MSFT"]
+
+    for price in ("1", "2", "3"):
+        hub.dispatch("quotes:AAPL", price)
+
+    assert first.dropped == 1
+    assert [first.queue.get_nowait()[1] for _ in range(2)] == ["2", "3"]
+    assert hub._unregister(first) == []
+    assert hub._unregister(second) == ["quotes:AAPL", "quotes:MSFT"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_stock_views_match_sync_views(authenticated_client: APIClient, user: User, stock: Stock, stock_price: StockPrice):
+    token = str(RefreshToken.for_user(user).access_token)
+    factory = AsyncRequestFactory()
+
+    for url, async_view, kwargs in [
+        (reverse("stocks:stock-list"), async_views.stock_list, {}),
+        (reverse("stocks:stock-detail", kwargs={"symbol": "aapl"}), async_views.stock_detail, {"symbol": "aapl"}),
+        (reverse("stocks:quote-batch") + "?symbols=AAPL,NOPE", async_views.quote_batch, {}),
+        (reverse("stocks:watchlist-quotes"), async_views.watchlist_quotes, {}),
+    ]:
+        request = factory.get(url, headers={"Authorization": f"Bearer {token}"})
+
+        response = async_to_sync(async_view)(request, **kwargs)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert json.loads(response.content) == authenticated_client.get(url).json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_stock_views_reject_deactivated_users(authenticated_client: APIClient, user: User, stock: Stock):
+    token = str(RefreshToken.for_user(user).access_token)
+    user.is_active = False
+    user.save()
+    factory = AsyncRequestFactory()
+
+    for url, async_view, kwargs in [
+        (reverse("stocks:stock-list"), async_views.stock_list, {}),
+        (reverse("stocks:stock-detail", kwargs={"symbol": "aapl"}), async_views.stock_detail, {"symbol": "aapl"}),
+    ]:
+        request = factory.get(url, headers={"Authorization": f"Bearer {token}"})
+
+        response = async_to_sync(async_view)(request, **kwargs)
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert json.loads(response.content) == authenticated_client.get(url).json()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_async_stock_views_errors():
+    factory = AsyncRequestFactory()
+
+    response = async_to_sync(async_views.quote_batch)(factory.get("/api/v1/quotes/"))
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.headers["WWW-Authenticate"].startswith("Bearer")
+
+    request = factory.get("/api/v1/stocks/", headers={"Authorization": "Bearer nope"})
+    response = async_to_sync(async_views.stock_list)(request)
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(pipeline, "get_redis", lambda: client)
+    return client
+
+
+def test_single_flight_skips_cycles_while_lease_is_held(fake_redis):
+    runs = []
+
+    @single_flight("cycle", ttl=60)
+    def cycle():
+        runs.append(1)
+        return cycle()
+
+    # The nested call is an overlapping cycle and must be skipped
+    assert cycle() is None
+    assert runs == [1]
+    assert skipped_counts() == {"cycle": 1}
+    assert not fake_redis.exists("lease:cycle")
+
+
+def test_single_flight_coalesces_skipped_cycles_into_one_rerun(fake_redis):
+    runs = []
+
+    @single_flight("cycle", ttl=60, coalesce=True)
+    def cycle():
+        runs.append(1)
+        if len(runs) == 1:
+            cycle()
+            cycle()
+
+    cycle()
+
+    assert len(runs) == 2
+    assert skipped_counts() == {"cycle": 2}
+
+
+def test_lease_release_requires_owner_token(fake_redis):
+    lease = Lease("fetch:AAPL", ttl=60)
+    assert lease.acquire()
+    assert not Lease("fetch:AAPL", ttl=60).acquire()
+
+    assert not Lease("fetch:AAPL", token="other").release()
+    assert Lease("fetch:AAPL", token=lease.token).release()
+    assert Lease("fetch:AAPL", ttl=60).acquire()
+
+
+def test_fetch_batch_skips_symbols_already_in_flight(fake_redis, monkeypatch, settings):
+    settings.STOCK_API_KEY = ""
+    fetched = []
+    monkeypatch.setattr(
+        tasks.fetch_single_stock_data,
+        "apply_async",
+        lambda args, **kwargs: fetched.append(args),
+    )
+    monkeypatch.setattr(tasks.process_alerts, "apply_async", lambda **kwargs: None)
+
+    tasks.fetch_stock_data_batch()
+    tasks.fetch_stock_data_batch()
+    assert len(fetched) == 10
+    assert skipped_counts() == {"fetch_single_stock_data": 10}
+
+    symbol, token = fetched[0]
+    tasks.fetch_single_stock_data(symbol, token)
+    tasks.fetch_stock_data_batch()
+    assert fetched[-1][0] == symbol and len(fetched) == 11
+
+
+def enqueue_message(client, queue: str, enqueued_at: float):
+    message = {"body": "", "headers": {"enqueued_at": enqueued_at}, "properties": {}}
+    client.lpush(queue, json.dumps(message))
+
+
+def test_pipeline_health_reports_queue_backlog(api_client: APIClient, fake_redis, settings):
+    settings.PIPELINE_MAX_TASK_AGE_SECONDS = 60
+    enqueue_message(fake_redis, "notify", time.time() - 30)
+    response = api_client.get(reverse("pipeline-health"))
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["queues"]["notify"]["depth"] == 1
+    assert response.json()["queues"]["ingest"]["oldest_age_seconds"] is None
+
+    enqueue_message(fake_redis, "ingest", time.time() - 300)
+    response = api_client.get(reverse("pipeline-health"))
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.json()["queues"]["ingest"]["overloaded"]
+    assert response.json()["queues"]["ingest"]["oldest_age_seconds"] >= 300
+
+
+def test_fetch_batch_sheds_unwatched_symbols_when_ingest_is_behind(fake_redis, watchlist_item: StockWatchlist, monkeypatch, settings):
+    settings.PIPELINE_MAX_QUEUE_DEPTH = 0
+    settings.PIPELINE_UNWATCHED_REFRESH_EVERY = 5
+    enqueue_message(fake_redis, "ingest", time.time())
+    enqueue_message(fake_redis, "alerts", time.time())
+    fetched, evaluated = [], []
+    monkeypatch.setattr(
+        tasks.fetch_single_stock_data,
+        "apply_async",
+        lambda args, **kwargs: fetched.append(args[0]),
+    )
+    monkeypatch.setattr(
+        tasks.process_alerts, "apply_async", lambda **kwargs: evaluated.append(1)
+    )
+    monkeypatch.setattr(tasks, "time", SimpleNamespace(time=lambda: 60.0))
+
+    tasks.fetch_stock_data_batch()
+
+    assert fetched == ["AAPL"]
+    assert evaluated == []
+    assert skipped_counts() == {"fetch_single_stock_data": 9, "process_alerts": 1}
+
+
+def test_cleanup_is_deferred_while_pipeline_is_behind(fake_redis, stock_price: StockPrice, monkeypatch, settings):
+    settings.PIPELINE_MAX_QUEUE_DEPTH = 0
+    enqueue_message(fake_redis, "alerts", time.time())
+    deferred = []
+    monkeypatch.setattr(
+        tasks.cleanup_old_price_data,
+        "apply_async",
+        lambda **kwargs: deferred.append(kwargs),
+    )
+    stock_price.timestamp = timezone.now() - timedelta(days=60)
+    stock_price.save()
+
+    tasks.cleanup_old_price_data()
+
+    assert deferred == [{"countdown": settings.PIPELINE_MAINTENANCE_DEFER_SECONDS}]
+    assert StockPrice.objects.filter(pk=stock_price.pk).exists()
+
+
+def add_daily_prices(stock: Stock, closes, first_day) -> None:
+    StockPrice.objects.bulk_create(
+        StockPrice(
+            stock=stock,
+            price=Decimal(str(close)),
+            volume=1000 + day,
+            high=Decimal(str(close + 1)),
+            low=Decimal(str(close - 1)),
+            open_price=Decimal(str(close)),
+            close_price=Decimal(str(close)),
+            timestamp=first_day + timedelta(days=day),
+        )
+        for day, close in enumerate(closes)
+    )
+
+
+def test_vectorized_indicators_match_incremental_indicators():
+    closes = np.round(100 + np.cumsum(np.random.default_rng(3).normal(0, 1, 300)), 2)
+    for name, spec in (("sma", "sma:20"), ("ema", "ema:20"), ("rsi", "rsi:14")):
+        window = int(spec.split(":")[1])
+        incremental = make_indicator(spec)
+        expected = []
+        for close in closes:
+            expected.append(incremental.peek(close))
+            incremental.push(close)
+        vectorized = indicators.compute_indicator(name, window, {"close": closes})
+        expected = np.array([np.nan if value is None else value for value in expected])
+        np.testing.assert_allclose(vectorized, expected, rtol=1e-9, equal_nan=True)
+
+
+def test_stock_indicators(authenticated_client: APIClient, stock: Stock):
+    first_day = timezone.now().replace(hour=16, minute=0, second=0, microsecond=0)
+    first_day -= timedelta(days=30)
+    closes = [100 + day for day in range(30)]
+    add_daily_prices(stock, closes, first_day)
+    url = reverse("stocks:stock-indicators", kwargs={"symbol": "aapl"})
+
+    start = (first_day + timedelta(days=10)).date().isoformat()
+    response = authenticated_client.get(url, {"names": "sma5,bbands,vwap", "start": start})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data["timestamps"]) == 20
+    # The first SMA in range averages the four bars before start too
+    assert response.data["indicators"]["sma5"][0] == sum(closes[6:11]) / 5
+    assert set(response.data["indicators"]["bbands"]) == {"middle", "upper", "lower"}
+    assert response.data["indicators"]["vwap"][0] == closes[10]
+
+
+def test_stock_indicators_rejects_unknown_names(authenticated_client: APIClient, stock: Stock):
+    url = reverse("stocks:stock-indicators", kwargs={"symbol": "AAPL"})
+
+    response = authenticated_client.get(url, {"names": "sma20,macd"})
+
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "names" in response.data
+
+
+def test_stock_indicators_caches_closed_windows(authenticated_client: APIClient, stock: Stock, monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(views, "get_redis", lambda: client)
+    first_day = timezone.now() - timedelta(days=20)
+    add_daily_prices(stock, [100 + day for day in range(20)], first_day)
+    url = reverse("stocks:stock-indicators", kwargs={"symbol": "AAPL"})
+    payload = {"names": "ema5", "end": (timezone.now() - timedelta(days=3)).date().isoformat()}
+
+    first = authenticated_client.get(url, payload)
+    StockPrice.objects.filter(stock=stock).update(close_price=Decimal("1.00"))
+    second = authenticated_client.get(url, payload)
+
+    assert second.data == first.data
+    assert len(client.keys("indicators:*")) == 1
+    # Windows still open are always recomputed
+    authenticated_client.get(url, {"names": "ema5"})
+    assert len(client.keys("indicators:*")) == 1
+
+
+def test_lttb_keeps_endpoints_and_spikes():
+    closes = np.full(1000, 100.0)
+    closes[[250, 600]] = [180.0, 20.0]
+    timestamps = 60.0 * np.arange(1000)
+
+    kept = lttb(timestamps, closes, 20)
+
+    assert len(kept) == 20
+    assert kept[0] == 0 and kept[-1] == 999
+    assert {250, 600} <= set(kept.tolist())
+    assert (np.diff(kept) > 0).all()
+    assert lttb(timestamps[:10], closes[:10], 20).tolist() == list(range(10))
+
+
+def test_minmax_keeps_each_bucket_extremes_in_time_order():
+    closes = np.array([3.0, 1.0, 2.0, 5.0, 4.0, 4.0, 0.0, 9.0])
+
+    assert minmax(closes, 4).tolist() == [1, 3, 6, 7]
+    assert minmax(closes, 8).tolist() == list(range(8))
+
+
+def test_stock_price_history_downsampled(authenticated_client: APIClient, stock: Stock):
+    first_day = timezone.now() - timedelta(days=300)
+    closes = np.round(100 + np.cumsum(np.random.default_rng(9).normal(0, 1, 300)), 2)
+    add_daily_prices(stock, closes.tolist(), first_day)
+    url = reverse("stocks:stock-prices", kwargs={"symbol": stock.symbol})
+
+    response = authenticated_client.get(url, {"points": 50})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["method"] == "lttb"
+    assert response.data["source_points"] == 300
+    assert len(response.data["timestamps"]) == len(response.data["close"]) == 50
+    assert response.data["close"][0] == closes[0]
+    assert response.data["close"][-1] == closes[-1]
+
+    payload = {"points": 50, "method": "minmax", "start": (first_day + timedelta(days=200)).isoformat()}
+    response = authenticated_client.get(url, payload)
+    assert response.data["source_points"] == 100
+    assert len(response.data["close"]) == 50
+    assert max(response.data["close"]) == closes[200:].max()
+    assert min(response.data["close"]) == closes[200:].min()
+
+
+def test_stock_price_history_downsampled_range_is_bounded(authenticated_client: APIClient, stock: Stock, settings):
+    settings.PRICE_HISTORY_DEFAULT_DAYS = 50
+    settings.PRICE_HISTORY_MAX_DAYS = 100
+    first_day = timezone.now() - timedelta(days=300)
+    add_daily_prices(stock, [100.0 + day for day in range(300)], first_day)
+    url = reverse("stocks:stock-prices", kwargs={"symbol": stock.symbol})
+
+    payload = {"points": 10, "end": (first_day + timedelta(days=249)).isoformat()}
+    response = authenticated_client.get(url, payload)
+
+    assert response.status_code == status.HTTP_200_OK
+    # Days 199 to 249: the default window before end
+    assert response.data["source_points"] == 51
+    assert response.data["close"][0] == 299.0
+
+    response = authenticated_client.get(url, {"points": 10, "start": first_day.isoformat()})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert "start" in response.data
+
+
+def test_stock_price_history_rejects_invalid_points(authenticated_client: APIClient, stock: Stock):
+    url = reverse("stocks:stock-prices", kwargs={"symbol": stock.symbol})
+
+    for payload in ({"points": "many"}, {"points": 2}, {"points": 10**6}, {"points": 10, "method": "mean"}):
+        response = authenticated_client.get(url, payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def add_two_stock_history(stock: Stock) -> tuple:
+    msft = Stock.objects.create(symbol="MSFT", name="Microsoft", type="Technology", is_active=True)
+    midnight = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    first_day = midnight - timedelta(days=30)
+    rng = np.random.default_rng(11)
+    aapl_closes = np.round(100 + np.cumsum(rng.normal(0, 1, 30)), 2)
+    msft_closes = np.round(200 + np.cumsum(rng.normal(0, 2, 30)), 2)
+    # Fetched at different times of day, and MSFT misses day 10
+    add_daily_prices(stock, aapl_closes.tolist(), first_day + timedelta(hours=14))
+    add_daily_prices(msft, msft_closes.tolist(), first_day + timedelta(hours=15, minutes=30))
+    StockPrice.objects.filter(stock=msft, timestamp__date=(first_day + timedelta(days=10)).date()).delete()
+    return aapl_closes, msft_closes
+
+
+def test_aligned_series_with_correlation(authenticated_client: APIClient, stock: Stock):
+    aapl_closes, msft_closes = add_two_stock_history(stock)
+    url = reverse("stocks:aligned-series")
+
+    response = authenticated_client.get(url, {"symbols": "msft,AAPL", "matrix": "correlation"})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.data["symbols"] == ["MSFT", "AAPL"]
+    assert len(response.data["timestamps"]) == 30
+    assert response.data["closes"]["AAPL"] == aapl_closes.tolist()
+    assert response.data["closes"]["MSFT"][10] is None
+    assert response.data["closes"]["MSFT"][11] == msft_closes[11]
+
+    complete = np.delete(np.vstack([msft_closes, aapl_closes]), 10, axis=1)
+    returns = np.diff(complete, axis=1) / complete[:, :-1]
+    assert response.data["correlation"]["observations"] == 28
+    assert np.allclose(response.data["correlation"]["matrix"], np.corrcoef(returns))
+
+
+def test_aligned_series_caches_closed_ranges(authenticated_client: APIClient, stock: Stock, monkeypatch):
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(views, "get_redis", lambda: client)
+    add_two_stock_history(stock)
+    url = reverse("stocks:aligned-series")
+    payload = {
+        "symbols": "AAPL,MSFT",
+        "matrix": "covariance",
+        "end": (timezone.now() - timedelta(days=3)).date().isoformat(),
+    }
+
+    first = authenticated_client.get(url, payload)
+    StockPrice.objects.update(close_price=Decimal("1.00"))
+    second = authenticated_client.get(url, payload)
+
+    assert len(first.data["timestamps"]) == 28
+    assert first.data["covariance"]["observations"] == 26
+    assert second.data == first.data
+    assert len(client.keys("series:*")) == 1
+
+
+def test_aligned_series_rejects_invalid_requests(authenticated_client: APIClient, stock: Stock):
+    url = reverse("stocks:aligned-series")
+
+    for payload in (
+        {"symbols": "AAPL,NOPE"},
+        {"symbols": "AAPL", "interval": "2d"},
+        {"symbols": "AAPL", "matrix": "beta"},
+        {},
+    ):
+        response = authenticated_client.get(url, payload)
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
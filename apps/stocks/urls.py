@@ -1,17 +1,44 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, streaming, views
 
 app_name = "stocks"
 
+# Read-only views are served by their async variants in the ASGI profile
+if settings.ASYNC_READ_VIEWS:
+    stock_list = async_views.stock_list
+    stock_detail = async_views.stock_detail
+    quote_batch = async_views.quote_batch
+    watchlist_quotes = async_views.watchlist_quotes
+else:
+    stock_list = views.StockListView.as_view()
+    stock_detail = views.StockDetailView.as_view()
+    quote_batch = views.QuoteBatchView.as_view()
+    watchlist_quotes = views.StockWatchlistQuoteView.as_view()
+
 urlpatterns = [
-    path("stocks/", views.StockListView.as_view(), name="stock-list"),
-    path("stocks/<str:symbol>/", views.StockDetailView.as_view(), name="stock-detail"),
+    path("stocks/", stock_list, name="stock-list"),
+    path("stocks/<str:symbol>/", stock_detail, name="stock-detail"),
     path(
         "stocks/<str:symbol>/prices/",
         views.StockPriceHistoryView.as_view(),
         name="stock-prices",
     ),
+    path(
+        "stocks/<str:symbol>/indicators/",
+        views.StockIndicatorView.as_view(),
+        name="stock-indicators",
+    ),
+    path("quotes/", quote_batch, name="quote-batch"),
+    path("series/", views.AlignedSeriesView.as_view(), name="aligned-series"),
+    path("stream/quotes/", streaming.quote_stream, name="quote-stream"),
     path("watchlist/", views.StockWatchlistView.as_view(), name="watchlist"),
+    path(
+        "watchlist/bulk/",
+        views.StockWatchlistBulkView.as_view(),
+        name="watchlist-bulk",
+    ),
+    path("watchlist/quotes/", watchlist_quotes, name="watchlist-quotes"),
     path(
         "watchlist/<int:pk>/",
         views.StockWatchlistDetailView.as_view(),
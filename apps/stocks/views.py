@@ -1,52 +1,302 @@
-from rest_framework import generics, permissions
+import json
+import logging
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.views import APIView
 from django.shortcuts import get_object_or_404
-from .models import Stock, StockPrice, StockWatchlist
+from MarketPulse.fieldsets import SparseFieldsetViewMixin
+from MarketPulse.redis_client import get_redis
+from .downsampling import DOWNSAMPLING_METHODS, downsample
+from .indicators import indicator_payload, parse_indicator
+from .models import (
+    LATEST_PRICE_COLUMNS,
+    Stock,
+    StockPrice,
+    StockWatchlist,
+    latest_price_annotations,
+)
+from .series import INTERVALS, MATRICES, aligned_payload
 from .serializers import (
+    LATEST_PRICE_KEYS,
+    QUOTE_COLUMNS,
+    quote_from_values,
     StockPriceSerializer,
     StockWatchlistSerializer,
     StockWithLatestPriceSerializer,
+    WatchlistBulkSerializer,
+    WatchlistQuoteSerializer,
 )
 
+logger = logging.getLogger(__name__)
+
+
+class StockWithLatestPriceMixin(SparseFieldsetViewMixin):
+    """
+    Builds the active stock queryset, annotating only the latest price
+    columns the requested fieldset renders.
+    """
+
+    def get_queryset(self):
+        queryset = self.sparse_queryset(Stock.objects.filter(is_active=True))
+        columns = self.latest_price_columns()
+        if columns:
+            queryset = queryset.with_latest_price(columns)
+        return queryset
+
+    def latest_price_columns(self):
+        columns = set()
+
+        subtree = self.field_subtree("latest_price")
+        if subtree is True:
+            columns.update(LATEST_PRICE_COLUMNS)
+        elif subtree is not None:
+            columns.add("timestamp")
+            columns.update(
+                LATEST_PRICE_KEYS[key] for key in subtree if key in LATEST_PRICE_KEYS
+            )
+
+        if self.wants_field("price_change", "price_change_percent"):
+            columns.update({"timestamp", "open_price", "close_price"})
+
+        return columns
+
 
-class StockListView(generics.ListAPIView):
+class StockListView(StockWithLatestPriceMixin, generics.ListAPIView):
     """
     View to list all stocks with their latest prices.
     """
 
-    queryset = Stock.objects.filter(is_active=True)
     serializer_class = StockWithLatestPriceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
 
-class StockDetailView(generics.RetrieveAPIView):
+class StockDetailView(StockWithLatestPriceMixin, generics.RetrieveAPIView):
     """
     View to get detailed information about a specific stock.
     """
 
-    queryset = Stock.objects.filter(is_active=True)
     serializer_class = StockWithLatestPriceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_object(self):
         symbol = self.kwargs.get("symbol").upper()
-        return get_object_or_404(Stock, symbol=symbol, is_active=True)
+        return get_object_or_404(self.get_queryset(), symbol=symbol)
 
 
-class StockPriceHistoryView(generics.ListAPIView):
+def parse_moment(raw, end_of_day=False):
+    """
+    Parse an ISO date or datetime query parameter into an aware datetime.
+    A bare date means the start of the day, or its end for ``end_of_day``.
+    """
+    # Dates first: parse_datetime also accepts them, as midnight
+    day = parse_date(raw)
+    if day is not None:
+        moment = datetime.combine(day, time.max if end_of_day else time.min)
+    else:
+        moment = parse_datetime(raw)
+        if moment is None:
+            raise ValueError(raw)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class DateRangeMixin:
+    """
+    Reads the optional ``start`` and ``end`` query parameters.
+    """
+
+    def get_range(self):
+        moments = []
+        for param in ("start", "end"):
+            raw = self.request.query_params.get(param)
+            if not raw:
+                moments.append(None)
+                continue
+            try:
+                moments.append(parse_moment(raw, end_of_day=param == "end"))
+            except ValueError:
+                raise ValidationError({param: "Expected an ISO date or datetime."})
+        start, end = moments
+        if start is not None and end is not None and start > end:
+            raise ValidationError({"start": "start must not be after end."})
+        return start, end
+
+
+class StockPriceHistoryView(DateRangeMixin, generics.ListAPIView):
     """
     View to get historical price data for a stock.
+
+    With ``?points=N`` the closes between ``start`` and ``end`` are instead
+    downsampled server-side to at most N points for charting (``method`` is
+    ``lttb``, the default, or ``minmax``), so the payload is bounded by the
+    chart rather than by the time range. The range itself is bounded too:
+    ``start`` defaults to ``PRICE_HISTORY_DEFAULT_DAYS`` before ``end`` (or
+    now), and may be at most ``PRICE_HISTORY_MAX_DAYS`` before it.
     """
 
     serializer_class = StockPriceSerializer
     permission_classes = [permissions.IsAuthenticated]
 
-    def get_queryset(self):
+    def get_stock(self):
         symbol = self.kwargs.get("symbol")
-        stock = get_object_or_404(Stock, symbol=symbol.upper(), is_active=True)
+        return get_object_or_404(Stock, symbol=symbol.upper(), is_active=True)
+
+    def get_queryset(self):
+        stock = self.get_stock()
         return StockPrice.objects.filter(stock=stock).order_by("-timestamp")[:100]
 
+    def list(self, request, *args, **kwargs):
+        if "points" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        points, method = self.get_points()
+        start, end = self.get_window()
+        stock = self.get_stock()
+
+        rows = StockPrice.objects.filter(stock=stock, timestamp__gte=start)
+        rows = rows.order_by("timestamp")
+        if end is not None:
+            rows = rows.filter(timestamp__lte=end)
+        rows = list(rows.values_list("timestamp", "close_price"))
+        timestamps = np.array([row[0].timestamp() for row in rows], np.float64)
+        closes = np.array([row[1] for row in rows], np.float64)
+        kept = downsample(method, timestamps, closes, points)
+
+        timestamp_field = serializers.DateTimeField()
+        return Response(
+            {
+                "symbol": stock.symbol,
+                "method": method,
+                "source_points": len(rows),
+                "timestamps": [
+                    timestamp_field.to_representation(rows[index][0])
+                    for index in kept
+                ],
+                "close": [float(rows[index][1]) for index in kept],
+            }
+        )
+
+    def get_window(self):
+        start, end = self.get_range()
+        until = end or timezone.now()
+        if start is None:
+            start = until - timedelta(days=settings.PRICE_HISTORY_DEFAULT_DAYS)
+        maximum = settings.PRICE_HISTORY_MAX_DAYS
+        if until - start > timedelta(days=maximum):
+            raise ValidationError(
+                {"start": f"The range may span at most {maximum} days."}
+            )
+        return start, end
+
+    def get_points(self):
+        raw = self.request.query_params.get("points")
+        maximum = settings.PRICE_HISTORY_MAX_POINTS
+        try:
+            points = int(raw)
+        except (TypeError, ValueError):
+            raise ValidationError({"points": "Expected an integer."})
+        if not 3 <= points <= maximum:
+            raise ValidationError({"points": f"Must be between 3 and {maximum}."})
+        method = self.request.query_params.get("method", "lttb").lower()
+        if method not in DOWNSAMPLING_METHODS:
+            raise ValidationError(
+                {"method": f"Expected one of {', '.join(DOWNSAMPLING_METHODS)}."}
+            )
+        return points, method
+
+
+def window_closed(end):
+    """
+    Whether a range ending at ``end`` ended before today, so its prices no
+    longer change.
+    """
+    today = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    return end is not None and end < today
+
+
+def cached_payload(key, build, seconds):
+    """
+    The payload cached in Redis under ``key``, or ``build()`` stored there for
+    ``seconds``. A None ``key`` always builds; Redis errors are ignored.
+    """
+    if key is None:
+        return build()
+    try:
+        cached = get_redis().get(key)
+        if cached is not None:
+            return json.loads(cached)
+    except Exception as e:
+        logger.error(f"Error reading cached {key}: {e}")
+
+    payload = build()
+    try:
+        get_redis().set(key, json.dumps(payload), ex=seconds)
+    except Exception as e:
+        logger.error(f"Error caching {key}: {e}")
+    return payload
+
+
+class StockIndicatorView(DateRangeMixin, APIView):
+    """
+    View to get technical indicators over a stock's price history.
+
+    Indicators are computed server-side with NumPy. Windows that ended
+    before today never change, so their results are cached in Redis.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request, symbol):
+        stock = get_object_or_404(Stock, symbol=symbol.upper(), is_active=True)
+        names = self.get_names()
+        start, end = self.get_range()
+
+        key = None
+        if window_closed(end):
+            key = (
+                f"indicators:{stock.id}:{','.join(names)}:"
+                f"{start.isoformat() if start else ''}:{end.isoformat()}"
+            )
+        return Response(
+            cached_payload(
+                key,
+                lambda: indicator_payload(stock, names, start, end),
+                settings.INDICATOR_CACHE_SECONDS,
+            )
+        )
+
+    def get_names(self):
+        raw = self.request.query_params.get("names", "")
+        names = list(
+            dict.fromkeys(
+                name.strip().lower() for name in raw.split(",") if name.strip()
+            )
+        )
+        if not names:
+            raise ValidationError({"names": "At least one indicator is required."})
+        if len(names) > settings.INDICATOR_MAX_NAMES:
+            raise ValidationError(
+                {
+                    "names": f"At most {settings.INDICATOR_MAX_NAMES} "
+                    "indicators are allowed per request."
+                }
+            )
+        for name in names:
+            try:
+                parse_indicator(name)
+            except ValueError as e:
+                raise ValidationError({"names": str(e)})
+        return names
 
-class StockWatchlistView(generics.ListCreateAPIView):
+
+class StockWatchlistView(SparseFieldsetViewMixin, generics.ListCreateAPIView):
     """
     View to manage user's stock watchlist.
     """
@@ -55,10 +305,83 @@ class StockWatchlistView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return StockWatchlist.objects.filter(user=self.request.user)
+        queryset = StockWatchlist.objects.filter(user=self.request.user)
+        if self.wants_field("stock_details"):
+            queryset = queryset.select_related("stock")
+        return self.sparse_queryset(queryset)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        # Adding a stock that is already watched returns the existing entry
+        serializer.instance, created = StockWatchlist.objects.get_or_create(
+            user=request.user, stock=serializer.validated_data["stock"]
+        )
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
+
+class StockWatchlistBulkView(APIView):
+    """
+    View to add (POST) or remove (DELETE) many watchlist symbols at once.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        symbols = self.get_symbols(request)
+        stocks = dict(
+            Stock.objects.filter(symbol__in=symbols, is_active=True).values_list(
+                "symbol", "id"
+            )
+        )
+
+        StockWatchlist.objects.bulk_create(
+            [
+                StockWatchlist(user=request.user, stock_id=stock_id)
+                for stock_id in stocks.values()
+            ],
+            ignore_conflicts=True,
+        )
 
-    def perform_create(self, serializer):
-        serializer.save(user=self.request.user)
+        return Response(
+            {
+                "symbols": [symbol for symbol in symbols if symbol in stocks],
+                "missing": [symbol for symbol in symbols if symbol not in stocks],
+            }
+        )
+
+    def delete(self, request):
+        symbols = self.get_symbols(request)
+        removed = StockWatchlist.objects.filter(
+            user=request.user, stock__symbol__in=symbols
+        ).delete()[0]
+
+        return Response({"removed": removed})
+
+    def get_symbols(self, request):
+        serializer = WatchlistBulkSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return serializer.validated_data["symbols"]
+
+
+class StockWatchlistQuoteView(generics.ListAPIView):
+    """
+    View to list the user's watchlist with latest quotes in constant queries.
+    """
+
+    serializer_class = WatchlistQuoteSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        return (
+            StockWatchlist.objects.filter(user=self.request.user)
+            .select_related("stock")
+            .annotate(**latest_price_annotations(QUOTE_COLUMNS, stock_ref="stock"))
+            .order_by("-added_at", "id")
+        )
 
 
 class StockWatchlistDetailView(generics.DestroyAPIView):
@@ -71,3 +394,108 @@ class StockWatchlistDetailView(generics.DestroyAPIView):
 
     def get_queryset(self):
         return StockWatchlist.objects.filter(user=self.request.user)
+
+
+def parse_symbols(raw, maximum):
+    """
+    Unique upper-cased symbols of a comma-separated query parameter.
+    """
+    symbols = list(
+        dict.fromkeys(
+            symbol.strip().upper() for symbol in raw.split(",") if symbol.strip()
+        )
+    )
+    if not symbols:
+        raise ValidationError({"symbols": "At least one symbol is required."})
+    if len(symbols) > maximum:
+        raise ValidationError(
+            {"symbols": f"At most {maximum} symbols are allowed per request."}
+        )
+    return symbols
+
+
+def quote_batch_payload(symbols, rows):
+    quotes = {row["symbol"]: quote_from_values(row) for row in rows}
+    return {
+        "quotes": quotes,
+        "missing": [symbol for symbol in symbols if symbol not in quotes],
+    }
+
+
+class QuoteBatchView(APIView):
+    """
+    View to get the latest quotes for many symbols in one request. All
+    symbols are resolved with a single query.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        symbols = self.get_symbols()
+        return Response(quote_batch_payload(symbols, self.get_rows(symbols)))
+
+    def get_rows(self, symbols):
+        return (
+            Stock.objects.filter(symbol__in=symbols, is_active=True)
+            .with_latest_price(QUOTE_COLUMNS)
+            .values(
+                "symbol",
+                "latest_timestamp",
+                *(f"latest_{column}" for column in QUOTE_COLUMNS),
+            )
+        )
+
+    def get_symbols(self):
+        return parse_symbols(
+            self.request.query_params.get("symbols", ""),
+            settings.QUOTE_BATCH_MAX_SYMBOLS,
+        )
+
+
+class AlignedSeriesView(DateRangeMixin, APIView):
+    """
+    View to get the closes of several stocks aligned on one timestamp index,
+    optionally with the correlation or covariance matrix of their returns.
+
+    Everything is computed from a single price query. Ranges that ended
+    before today are cached in Redis.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        symbols = parse_symbols(
+            request.query_params.get("symbols", ""), settings.SERIES_MAX_SYMBOLS
+        )
+        start, end = self.get_range()
+        interval = request.query_params.get("interval", "1d")
+        if interval not in INTERVALS:
+            raise ValidationError(
+                {"interval": f"Expected one of {', '.join(INTERVALS)}."}
+            )
+        matrix = request.query_params.get("matrix") or None
+        if matrix is not None and matrix not in MATRICES:
+            raise ValidationError({"matrix": f"Expected one of {', '.join(MATRICES)}."})
+
+        found = Stock.objects.filter(symbol__in=symbols, is_active=True)
+        stocks = {stock.symbol: stock for stock in found.only("id", "symbol")}
+        missing = [symbol for symbol in symbols if symbol not in stocks]
+        if missing:
+            raise ValidationError(
+                {"symbols": f"Unknown symbols: {', '.join(missing)}."}
+            )
+        stocks = [stocks[symbol] for symbol in symbols]
+
+        key = None
+        if window_closed(end):
+            key = (
+                f"series:{','.join(symbols)}:{interval}:{matrix or ''}:"
+                f"{start.isoformat() if start else ''}:{end.isoformat()}"
+            )
+        return Response(
+            cached_payload(
+                key,
+                lambda: aligned_payload(stocks, start, end, interval, matrix),
+                settings.SERIES_CACHE_SECONDS,
+            )
+        )